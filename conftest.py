@@ -0,0 +1,18 @@
+import pytest
+
+from hair_salon_lab1_task9 import Client
+
+
+def _make_client(
+    last_name: str,
+    haircut_counter: int = 0,
+    discount: int = 0,
+    first_name: str = "Иван",
+) -> Client:
+    return Client(first_name, last_name, "Иванович", haircut_counter, discount)
+
+
+@pytest.fixture
+def make_client():
+    """Фабрика клиентов для тестов: make_client("Иванов", 3, discount=5)."""
+    return _make_client
@@ -1,5 +1,5 @@
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class ClientShort:
     """Базовый класс с краткой информацией о клиенте"""
@@ -10,10 +10,22 @@ class ClientShort:
         self._validate_name(father_name, "father_name")
         self._validate_haircut_counter(haircut_counter)
 
+        self._assign(last_name, first_name, father_name, haircut_counter)
+
+    def _assign(self, last_name: str, first_name: str, father_name: str, haircut_counter: int):
+        """Запись уже проверенных полей"""
         self.__last_name = last_name
         self.__first_name = first_name
         self.__father_name = father_name
         self.__haircut_counter = haircut_counter
+        self._hash_cache = None
+
+    @staticmethod
+    def from_trusted(last_name: str, first_name: str, father_name: str, haircut_counter: int) -> "ClientShort":
+        """Создание без валидации — для уже проверенных данных (полей Client, строк хранилища)"""
+        short = ClientShort.__new__(ClientShort)
+        short._assign(last_name, first_name, father_name, haircut_counter)
+        return short
 
     # Статические методы валидации
     @staticmethod
@@ -49,6 +61,12 @@ class ClientShort:
     def get_haircut_counter(self) -> int:
         return self.__haircut_counter
 
+    # Сеттеры
+    def set_haircut_counter(self, haircut_counter):
+        self._validate_haircut_counter(haircut_counter)
+        self.__haircut_counter = haircut_counter
+        self._hash_cache = None
+
     def to_string(self) -> str:
         """Возвращает в формате 'Фамилия И.О., 1'"""
         return f"{self.__last_name.title()} {self.__first_name[0].upper()}.{self.__father_name[0].upper()}., {self.__haircut_counter}"
@@ -64,12 +82,25 @@ class ClientShort:
     # Методы сравнения
     def __eq__(self, other) -> bool:
         if not isinstance(other, ClientShort):
+            return NotImplemented
+        # Краткая версия не равна полному клиенту (как и Client не равен ClientShort)
+        if isinstance(other, Client) != isinstance(self, Client):
             return False
         return (self.__last_name == other.__last_name and
                 self.__first_name == other.__first_name and
                 self.__father_name == other.__father_name and
                 self.__haircut_counter == other.__haircut_counter)
 
+    def _hash_fields(self) -> tuple:
+        """Поля, участвующие в __eq__ и __hash__"""
+        return (self.__last_name, self.__first_name, self.__father_name, self.__haircut_counter)
+
+    def __hash__(self) -> int:
+        """Хэш согласован с __eq__ и кэшируется до изменения полей"""
+        if self._hash_cache is None:
+            self._hash_cache = hash(self._hash_fields())
+        return self._hash_cache
+
 
 class Client(ClientShort):
     """Класс клиента с полной информацией, наследует от ClientShort"""
@@ -128,6 +159,12 @@ class Client(ClientShort):
 
         self.__discount = data['discount']
 
+        # ID необязателен: новому клиенту его назначает репозиторий
+        client_id = data.get('id')
+        if client_id is not None:
+            self._validate_id(client_id)
+        self.__id = client_id
+
     @staticmethod
     def _validate_discount(discount):
         """Валидация скидки"""
@@ -136,16 +173,44 @@ class Client(ClientShort):
         if discount < 0 or discount > 100:
             raise ValueError("discount должен быть в диапазоне от 0 до 100")
 
+    @staticmethod
+    def _validate_id(client_id):
+        """Валидация ID"""
+        if not isinstance(client_id, int) or isinstance(client_id, bool):
+            raise ValueError("id должен быть целым числом")
+        if client_id < 0:
+            raise ValueError("id не может быть отрицательным")
+
     # Геттеры
     def get_discount(self) -> int:
         return self.__discount
 
+    def get_id(self) -> Optional[int]:
+        return self.__id
+
     # Сеттеры
     def set_discount(self, discount):
         self._validate_discount(discount)
         self.__discount = discount
+        self._hash_cache = None
+
+    def set_id(self, client_id: int):
+        # ID не участвует в __eq__ и __hash__, кэш хэша не сбрасывается
+        self._validate_id(client_id)
+        self.__id = client_id
 
     # Методы преобразования
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь в формате хранилищ (JSON/YAML/БД); обратно — Client(data)"""
+        return {
+            'id': self.__id,
+            'first_name': self.get_first_name(),
+            'last_name': self.get_last_name(),
+            'father_name': self.get_father_name(),
+            'haircut_counter': self.get_haircut_counter(),
+            'discount': self.__discount,
+        }
+
     def to_string(self) -> str:
         """Возвращает строку в формате: 'Годящев Д.М., 5, 0'"""
         base_string = super().to_string()
@@ -153,8 +218,8 @@ class Client(ClientShort):
 
 
     def to_short_version(self) -> ClientShort:
-        """Создает краткую версию клиента (без скидки)"""
-        return ClientShort(
+        """Создает краткую версию клиента (без скидки); поля уже проверены"""
+        return ClientShort.from_trusted(
             self.get_last_name(),
             self.get_first_name(),
             self.get_father_name(),
@@ -173,10 +238,26 @@ class Client(ClientShort):
     # Методы сравнения
     def __eq__(self, other) -> bool:
         if not isinstance(other, Client):
-            return False
+            return NotImplemented
         return (super().__eq__(other) and self.__discount == other.__discount)
 
+    def _hash_fields(self) -> tuple:
+        return super()._hash_fields() + (self.__discount,)
+
+    # __eq__ переопределён, поэтому хэш нужно объявить явно
+    __hash__ = ClientShort.__hash__
+
     # Статические фабричные методы
+    @staticmethod
+    def from_trusted(last_name: str, first_name: str, father_name: str, haircut_counter: int,
+                     discount: int, client_id: Optional[int] = None) -> "Client":
+        """Создание без валидации — для уже проверенных данных (строк хранилища, отчёта проверки)"""
+        client = Client.__new__(Client)
+        client._assign(last_name, first_name, father_name, haircut_counter)
+        client.__discount = discount
+        client.__id = client_id
+        return client
+
     @classmethod
     def from_json(cls, json_str: str) -> 'Client':
         """Создание клиента из JSON строки"""
@@ -1,37 +1,720 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Callable, List, Optional
+from collections import Counter
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import atexit
+import bisect
+import functools
+import heapq
+import importlib
+import itertools
 import json
+import operator
 import os
+import random
+import select
+import threading
+import time
+import weakref
 
-import psycopg2
-from psycopg2 import sql
-import yaml
+from hair_salon_lab1_task9 import Client, ClientShort
+from hair_salon_lab2_fuzzy import FuzzyNameIndex
 
-from hair_salon_lab1_task9 import Client
+
+# Реестр хранилищ: имя -> модули-зависимости. Зависимости импортируются
+# только при первом обращении к своему хранилищу, поэтому, например,
+# работа с ClientRepJson не тянет за собой psycopg2 и yaml.
+BACKENDS: Dict[str, Tuple[str, ...]] = {
+    "json": (),
+    "yaml": ("yaml",),
+    "postgres": ("psycopg2", "psycopg2.sql", "psycopg2.extras"),
+}
+_loaded_backends: Dict[str, Dict[str, ModuleType]] = {}
+
+
+def register_backend(name: str, modules: Iterable[str]) -> None:
+    """Зарегистрировать хранилище и список модулей, нужных для его работы."""
+    BACKENDS[name] = tuple(modules)
+    _loaded_backends.pop(name, None)
+
+
+def load_backend(name: str) -> Dict[str, ModuleType]:
+    """Импортировать (один раз) зависимости хранилища и вернуть их по имени."""
+    modules = _loaded_backends.get(name)
+    if modules is None:
+        if name not in BACKENDS:
+            raise ValueError(f"Неизвестное хранилище: {name}")
+        modules = {m: importlib.import_module(m) for m in BACKENDS[name]}
+        _loaded_backends[name] = modules
+    return modules
+
+
+class _LazyModule:
+    """Модуль-зависимость хранилища; настоящий импорт — при первом обращении к атрибуту."""
+
+    def __init__(self, backend: str, module_name: str) -> None:
+        self._backend = backend
+        self._module_name = module_name
+
+    def __getattr__(self, attr: str) -> Any:
+        module = load_backend(self._backend)[self._module_name]
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._module_name!r} ({self._backend})>"
+
+
+psycopg2 = _LazyModule("postgres", "psycopg2")
+sql = _LazyModule("postgres", "psycopg2.sql")
+extras = _LazyModule("postgres", "psycopg2.extras")
+yaml = _LazyModule("yaml", "yaml")
+
+
+class ClientView:
+    """
+    Ленивое представление клиента только для чтения поверх сырой строки
+    (id, first_name, last_name, father_name, haircut_counter, discount).
+
+    Повторяет геттеры, to_string, to_short_version и сравнение Client,
+    но не создаёт и не валидирует Client до первого изменения:
+    сеттеры материализуют настоящий Client и работают уже с ним.
+    """
+
+    __slots__ = ("_row", "_client")
+
+    def __init__(self, row: Tuple[Any, ...]) -> None:
+        self._row = tuple(row)
+        self._client: Optional[Client] = None
+
+    # Геттеры
+    def get_id(self) -> int:
+        return self._row[0]
+
+    def get_first_name(self) -> str:
+        return self._row[1]
+
+    def get_last_name(self) -> str:
+        return self._row[2]
+
+    def get_father_name(self) -> str:
+        return self._row[3]
+
+    def get_haircut_counter(self) -> int:
+        return self._row[4]
+
+    def get_discount(self) -> int:
+        return self._row[5]
+
+    # Материализация
+    def to_client(self) -> Client:
+        """Настоящий (провалидированный) Client; создаётся один раз."""
+        if self._client is None:
+            self._client = Client(self.to_dict())
+        return self._client
+
+    def _sync_from_client(self) -> None:
+        c = self._client
+        self._row = (
+            c.get_id(),
+            c.get_first_name(),
+            c.get_last_name(),
+            c.get_father_name(),
+            c.get_haircut_counter(),
+            c.get_discount(),
+        )
+
+    # Сеттеры: изменение переводит представление на настоящий Client
+    def set_haircut_counter(self, haircut_counter) -> None:
+        self.to_client().set_haircut_counter(haircut_counter)
+        self._sync_from_client()
+
+    def set_discount(self, discount) -> None:
+        self.to_client().set_discount(discount)
+        self._sync_from_client()
+
+    def set_id(self, client_id: int) -> None:
+        self.to_client().set_id(client_id)
+        self._sync_from_client()
+
+    # Методы преобразования
+    def to_dict(self) -> dict:
+        return {
+            "first_name": self._row[1],
+            "last_name": self._row[2],
+            "father_name": self._row[3],
+            "haircut_counter": self._row[4],
+            "discount": self._row[5],
+            "id": self._row[0],
+        }
+
+    def to_string(self) -> str:
+        """Возвращает строку в формате: 'Годящев Д.М., 5, 0'"""
+        _, first, last, father, haircut, discount = self._row
+        return f"{last.title()} {first[0].upper()}.{father[0].upper()}., {haircut}, {discount}"
+
+    def to_short_version(self) -> ClientShort:
+        return ClientShort.from_trusted(self._row[2], self._row[1], self._row[3], self._row[4])
+
+    # Строковые представления
+    def __str__(self) -> str:
+        return self.to_string()
+
+    def __repr__(self) -> str:
+        _, first, last, father, haircut, discount = self._row
+        return (f"ClientView(last_name='{last}', first_name='{first}', "
+                f"father_name='{father}', haircut_counter={haircut}, "
+                f"discount={discount})")
+
+    # Сравнение — как у Client: по ФИО, числу стрижек и скидке, без ID
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Client, ClientView)):
+            return NotImplemented
+        return (
+            self.get_last_name() == other.get_last_name()
+            and self.get_first_name() == other.get_first_name()
+            and self.get_father_name() == other.get_father_name()
+            and self.get_haircut_counter() == other.get_haircut_counter()
+            and self.get_discount() == other.get_discount()
+        )
+
+    def __hash__(self) -> int:
+        # Тот же набор полей, что и в Client._hash_fields, — равные объекты
+        # Client и ClientView попадают в один слот словаря/множества
+        _, first, last, father, haircut, discount = self._row
+        return hash((last, first, father, haircut, discount))
+
+
+# Результат чтения ClientRepDB: Client или, при lazy=True, ClientView
+ClientLike = Union[Client, ClientView]
+
+
+def _check_increment(by: int) -> None:
+    if not isinstance(by, int) or by <= 0:
+        raise ValueError("by должен быть положительным целым числом")
+
+
+def _unique_key(client: Client) -> Tuple[str, int]:
+    """Ключ уникальности клиента в хранилищах: (фамилия, количество стрижек)."""
+    return client.get_last_name(), client.get_haircut_counter()
+
+
+def _collect_by_ids(
+    ids: Iterable[int],
+    by_id: Dict[int, Client],
+) -> Tuple[List[Client], List[int]]:
+    """
+    Раскладывает найденных клиентов в порядке запрошенных ID.
+
+    Возвращает (клиенты, отсутствующие ID); повторяющийся ID
+    даёт повторяющегося клиента, но в списке отсутствующих встречается один раз.
+    """
+    found: List[Client] = []
+    missing: List[int] = []
+    seen_missing = set()
+    for client_id in ids:
+        client = by_id.get(client_id)
+        if client is not None:
+            found.append(client)
+        elif client_id not in seen_missing:
+            seen_missing.add(client_id)
+            missing.append(client_id)
+    return found, missing
+
+
+def _trusted_args(client: Client) -> Tuple[Any, ...]:
+    """Поля проверенного клиента в порядке аргументов Client.from_trusted."""
+    return (
+        client.get_last_name(),
+        client.get_first_name(),
+        client.get_father_name(),
+        client.get_haircut_counter(),
+        client.get_discount(),
+        client.get_id(),
+    )
+
+
+def _build_clients_chunk(
+    start: int,
+    records: List[dict],
+    as_rows: bool = False,
+) -> Tuple[List[Any], List[Tuple[int, str]]]:
+    """
+    Проверяет часть записей. Возвращает (клиенты, ошибки), где ошибка —
+    (номер записи в файле, текст). as_rows=True (в процессе пула) вместо
+    клиентов отдаёт кортежи _trusted_args: их передача в родительский
+    процесс намного дешевле сериализации объектов Client.
+    """
+    built: List[Any] = []
+    errors: List[Tuple[int, str]] = []
+    for offset, record in enumerate(records):
+        try:
+            client = Client(record)
+        except (ValueError, TypeError) as exc:
+            errors.append((start + offset, str(exc)))
+            continue
+        built.append(_trusted_args(client) if as_rows else client)
+    return built, errors
+
+
+def _build_clients_parallel(
+    records: List[dict],
+    workers: int,
+    chunk_size: int,
+) -> Tuple[List[Client], List[Tuple[int, str]]]:
+    """Параллельная валидация записей порциями с сохранением исходного порядка."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    starts = range(0, len(records), chunk_size)
+    chunks = [records[i:i + chunk_size] for i in starts]
+
+    clients: List[Client] = []
+    errors: List[Tuple[int, str]] = []
+    build_rows = functools.partial(_build_clients_chunk, as_rows=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map отдаёт результаты в порядке порций, поэтому порядок items сохраняется;
+        # записи уже проверены в пуле, здесь клиенты создаются без валидации
+        for rows, part_errors in pool.map(build_rows, starts, chunks):
+            clients.extend(Client.from_trusted(*row) for row in rows)
+            errors.extend(part_errors)
+    return clients, errors
+
+
+# Ключи сортировки для sort_by (и слияния отсортированных частей)
+SORT_KEYS: Dict[str, Callable[[Client], Any]] = {
+    "id": lambda x: x.get_id(),
+    "haircut": lambda x: x.get_haircut_counter(),
+    "discount": lambda x: x.get_discount(),
+    "last_name": lambda x: x.get_last_name(),
+}
+
+
+# Правило скидки программы лояльности: ступени (минимум стрижек, скидка %),
+# по возрастанию порога. Ниже первой ступени скидка 0.
+DiscountTiers = Tuple[Tuple[int, int], ...]
+
+DISCOUNT_TIERS: DiscountTiers = ((5, 5), (10, 10), (20, 15), (50, 20))
+
+
+def _check_tiers(tiers: Iterable[Tuple[int, int]]) -> DiscountTiers:
+    tiers = tuple(sorted((int(t), int(d)) for t, d in tiers))
+    for threshold, discount in tiers:
+        if threshold < 0 or not 0 <= discount <= 100:
+            raise ValueError(f"Некорректная ступень скидки: ({threshold}, {discount})")
+    return tiers
+
+
+def discount_for(haircut_counter: int, tiers: DiscountTiers = DISCOUNT_TIERS) -> int:
+    """Скидка по количеству стрижек согласно ступеням tiers."""
+    pos = bisect.bisect_right([t for t, _ in tiers], haircut_counter)
+    return tiers[pos - 1][1] if pos else 0
+
+
+class RWLock:
+    """
+    Блокировка «читатели — писатель»: читать могут несколько потоков
+    одновременно, писать — только один и без читателей. Ожидающий писатель
+    не пропускает новых читателей, иначе при постоянном чтении запись
+    не дождалась бы очереди.
+
+    Повторный захват тем же потоком разрешён: писатель может снова писать
+    и читать, читатель — снова читать. Захват записи при удерживаемом
+    чтении — взаимоблокировка, поэтому он сразу завершается RuntimeError.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        # поток -> глубина захвата чтения
+        self._readers: Dict[int, int] = {}
+        self._writer: Optional[int] = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth -= 1
+                return
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+                return
+            del self._readers[me]
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Нельзя начать запись, удерживая блокировку чтения")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _reads(method: Callable) -> Callable:
+    """Метод только читает репозиторий: выполняется под блокировкой чтения."""
+
+    @functools.wraps(method)
+    def wrapper(self: "ClientRepBase", *args: Any, **kwargs: Any) -> Any:
+        with self._read_locked():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _writes(method: Callable) -> Callable:
+    """Метод изменяет репозиторий: выполняется под монопольной блокировкой."""
+
+    @functools.wraps(method)
+    def wrapper(self: "ClientRepBase", *args: Any, **kwargs: Any) -> Any:
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class FlushMetrics:
+    """Метрики отложенной записи."""
+
+    def __init__(self) -> None:
+        self.flushes = 0
+        self.mutations = 0
+        # Сколько изменений не потребовали собственной записи файла
+        self.coalesced_writes = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def avg_flush_ms(self) -> float:
+        return self.total_flush_ms / self.flushes if self.flushes else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Записей файла: {self.flushes}, изменений: {self.mutations}, "
+            f"объединено: {self.coalesced_writes}, ошибок: {self.errors}, "
+            f"время записи ср/макс: {self.avg_flush_ms:.1f}/{self.max_flush_ms:.1f} мс"
+        )
+
+
+# Живые WriteBehindFlusher: при выходе из программы все дописываются.
+# Множество слабое, поэтому забытый репозиторий не удерживается до выхода
+_WRITE_BEHIND_FLUSHERS: "weakref.WeakSet[WriteBehindFlusher]" = weakref.WeakSet()
+# Как часто простаивающий поток проверяет, жив ли ещё его flusher
+_WRITE_BEHIND_IDLE_POLL = 1.0
+
+
+@atexit.register
+def _close_write_behind_flushers() -> None:
+    for flusher in list(_WRITE_BEHIND_FLUSHERS):
+        flusher.close()
+
+
+class WriteBehindFlusher:
+    """
+    Фоновая отложенная запись: изменения только помечают состояние
+    «грязным», а поток записывает его не чаще раза в interval_ms
+    (или сразу, когда накопилось max_pending изменений).
+    Несколько изменений между записями объединяются в одну.
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[], None],
+        interval_ms: int = 200,
+        max_pending: int = 100,
+        guard: Optional[Callable[[], ContextManager]] = None,
+    ) -> None:
+        """
+        guard — внешняя блокировка (например, чтения репозитория), которую
+        flush() берёт раньше собственной: так порядок захвата одинаков
+        у фонового потока и у вызывающих flush() под этой блокировкой.
+        """
+        self._write_fn = write_fn
+        self._guard = guard
+        self.interval = interval_ms / 1000
+        self.max_pending = max_pending
+        self.metrics = FlushMetrics()
+        self._cond = threading.Condition()
+        # Запись целиком — под отдельной блокировкой, чтобы flush() и поток не пересекались
+        self._write_lock = threading.Lock()
+        self._pending = 0
+        self._dirty_since: Optional[float] = None
+        self._closed = False
+        # Поток держит flusher (а через write_fn и репозиторий) только по слабой
+        # ссылке, пока записывать нечего: брошенный без close() репозиторий
+        # собирается сборщиком мусора, а поток завершается
+        self._thread = threading.Thread(
+            target=self._run, args=(weakref.ref(self), self._cond),
+            name="write-behind", daemon=True,
+        )
+        self._thread.start()
+        _WRITE_BEHIND_FLUSHERS.add(self)
+
+    def mark_dirty(self) -> None:
+        with self._cond:
+            self._pending += 1
+            self.metrics.mutations += 1
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            if self._pending == 1 or self._pending >= self.max_pending:
+                self._cond.notify()
+
+    def _wait_time(self) -> Optional[float]:
+        """Сколько ждать до записи (None — записывать нечего). Под self._cond."""
+        if self._dirty_since is None:
+            return None
+        if self._pending >= self.max_pending:
+            return 0.0
+        return self._dirty_since + self.interval - time.monotonic()
+
+    @staticmethod
+    def _run(ref: "weakref.ReferenceType[WriteBehindFlusher]", cond: threading.Condition) -> None:
+        while True:
+            with cond:
+                flusher = ref()
+                if flusher is None or flusher._closed:
+                    return
+                wait = flusher._wait_time()
+                if wait is None:
+                    del flusher
+                    cond.wait(_WRITE_BEHIND_IDLE_POLL)
+                    continue
+                # Есть незаписанные изменения: flusher удерживается до записи
+                if wait > 0:
+                    cond.wait(wait)
+                    continue
+            flusher.flush()
+
+    def flush(self) -> None:
+        """Немедленно записать накопленные изменения (если они есть)."""
+        if self._guard is not None:
+            with self._guard():
+                self._flush()
+        else:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._write_lock:
+            with self._cond:
+                pending = self._pending
+                if not pending:
+                    return
+                self._pending = 0
+                self._dirty_since = None
+                # Поток, ждущий срока записи, больше не должен удерживать flusher
+                self._cond.notify_all()
+
+            started = time.perf_counter()
+            try:
+                self._write_fn()
+            except Exception as exc:  # noqa: BLE001
+                # Изменения не потеряны: состояние снова помечается грязным
+                with self._cond:
+                    self._pending += pending
+                    if self._dirty_since is None:
+                        self._dirty_since = time.monotonic()
+                self.metrics.errors += 1
+                print(f"Ошибка отложенной записи: {exc}")
+                return
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.metrics.flushes += 1
+            self.metrics.coalesced_writes += pending - 1
+            self.metrics.last_flush_ms = elapsed
+            self.metrics.max_flush_ms = max(self.metrics.max_flush_ms, elapsed)
+            self.metrics.total_flush_ms += elapsed
+
+    def close(self) -> None:
+        """Остановить поток и записать всё, что осталось (вызывается и при выходе)."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+        _WRITE_BEHIND_FLUSHERS.discard(self)
 
 
 class ClientRepBase(ABC):
-    def __init__(self, file_path: str) -> None:
+    # Индекс триграмм ФИО для fuzzy_search: строится при первом поиске.
+    # Хранилища, не держащие клиентов в памяти, хранят в нём только ФИО.
+    _fuzzy_index: Optional[FuzzyNameIndex] = None
+    _fuzzy_keep_clients = True
+    # Могут ли читающие операции выполняться параллельно (см. _read_locked)
+    _shared_reads = True
+
+    def __init__(
+        self,
+        file_path: str,
+        load_workers: int = 1,
+        chunk_size: int = 10000,
+    ) -> None:
+        """
+        load_workers > 1 включает параллельную загрузку: записи делятся на
+        порции по chunk_size и проверяются в пуле процессов. В любом режиме
+        некорректные записи не прерывают загрузку, а попадают в load_errors.
+
+        Репозиторий можно разделять между потоками: читающие операции
+        выполняются параллельно под self.lock.read(), изменяющие — монопольно
+        под self.lock.write(). Несколько вызовов подряд делаются атомарными
+        тем же способом: with repo.lock.write(): ...
+        """
+        self.lock = RWLock()
+        # Запись файла целиком: снимок и запись идут в одном порядке
+        self._file_lock = threading.RLock()
+        # Число незавершённых обходов iter_all текущего списка (см. _mutable_items)
+        self._share_lock = threading.Lock()
+        self._share_count = 0
         self.file_path = file_path
-        self.items: List[Client] = []
+        self.load_workers = load_workers
+        self.chunk_size = chunk_size
+        self.items = []
+        # Отчёт о некорректных записях последней загрузки: (номер записи, ошибка)
+        self.load_errors: List[Tuple[int, str]] = []
+        self._flusher: Optional[WriteBehindFlusher] = None
         self.read_all()
 
+    # Список клиентов. При замене списка сбрасывается индекс уникальности;
+    # изменения на месте отмечаются через _index_added / _index_removed
+    # и делаются только через _mutable_items().
+    @property
+    def items(self) -> List[Client]:
+        return self._items
+
+    @items.setter
+    def items(self, clients: List[Client]) -> None:
+        with self._share_lock:
+            self._items = clients
+            self._share_count = 0
+        self._unique_keys: Optional[Counter] = None
+        self._fuzzy_index = None
+
+    def _mutable_items(self) -> List[Client]:
+        """
+        Список для изменения на месте (под блокировкой записи). Если его
+        сейчас обходит iter_all, обход остаётся на старом списке,
+        а изменения идут в копию — копирование только в этом случае.
+        """
+        with self._share_lock:
+            if self._share_count:
+                self._items = list(self._items)
+                self._share_count = 0
+            return self._items
+
+    def _read_locked(self) -> ContextManager:
+        """Блокировка для читающих операций (монопольная, если _shared_reads ложно)."""
+        return self.lock.read() if self._shared_reads else self.lock.write()
+
     # a. Чтение всех значений из файла / хранилища
+    @_writes
     def read_all(self) -> None:
+        # Иначе перечитывание файла потеряло бы ещё не записанные изменения
+        if self._flusher is not None:
+            self._flusher.flush()
         if not os.path.exists(self.file_path):
             self.items = []
+            self.load_errors = []
             return
-        raw = self._load_from_storage()
-        self.items = [Client(d) for d in (raw or [])]
+        raw = self._load_from_storage() or []
+        if self.load_workers > 1 and len(raw) > self.chunk_size:
+            self.items, self.load_errors = _build_clients_parallel(
+                raw, self.load_workers, self.chunk_size
+            )
+        else:
+            self.items, self.load_errors = _build_clients_chunk(0, raw)
 
     # b. Запись всех значений в файл / хранилище
+    @_reads
     def write_all(self, file_name: Optional[str] = None) -> None:
-        data = [c.to_dict() for c in self.items]
-        self._dump_to_storage(data, file_name=file_name)
+        # Параллельные записи файла не пересекаются и не перезаписывают
+        # более свежий снимок более старым
+        with self._file_lock:
+            data = [c.to_dict() for c in self.items]
+            self._dump_to_storage(data, file_name=file_name)
+
+    # b'. Отложенная запись
+    def enable_write_behind(self, interval_ms: int = 200, max_pending: int = 100) -> WriteBehindFlusher:
+        """
+        Включает режим write-behind: add / replace / delete меняют self.items
+        сразу, а файл переписывается фоновым потоком не чаще раза в interval_ms
+        (или после max_pending изменений). Метрики — в flusher.metrics.
+        """
+        if self._flusher is None:
+            self._flusher = WriteBehindFlusher(
+                self.write_all, interval_ms, max_pending, guard=self._read_locked,
+            )
+        return self._flusher
+
+    def flush(self) -> None:
+        """Записать отложенные изменения немедленно."""
+        if self._flusher is not None:
+            self._flusher.flush()
+
+    def close(self) -> None:
+        """Дописать отложенные изменения и остановить фоновую запись."""
+        if self._flusher is not None:
+            self._flusher.close()
+            self._flusher = None
+
+    def _persist(self) -> None:
+        """Сохранить изменения: сразу или через фоновую запись."""
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+        else:
+            self.write_all()
 
     # c. Получить объект по ID
+    @_reads
     def get_by_id(self, client_id: int) -> Optional[Client]:
         if client_id >= 0:
             for client in self.items:
@@ -39,7 +722,22 @@ class ClientRepBase(ABC):
                     return client
         return None
 
+    # c'. Получить несколько объектов по списку ID за один проход
+    @_reads
+    def get_many_by_ids(self, ids: Iterable[int]) -> Tuple[List[Client], List[int]]:
+        """
+        Возвращает (клиенты в порядке ids, ID которых нет в хранилище).
+        Вместо N линейных поисков строится один индекс id -> клиент.
+        """
+        ids = list(ids)
+        if not ids:
+            return [], []
+        wanted = set(ids)
+        by_id = {c.get_id(): c for c in self.items if c.get_id() in wanted}
+        return _collect_by_ids(ids, by_id)
+
     # d. Пагинация: k-я страница по n элементов
+    @_reads
     def get_k_n_short_list(self, k: int, n: int) -> List[Client]:
         if len(self.items) >= n > 0 and (k <= len(self.items) // n + 1) and k > 0:
             start = n * (k - 1)
@@ -47,64 +745,279 @@ class ClientRepBase(ABC):
             return self.items[start:end]
         return []
 
+    # d'. Первые k клиентов по полю без полной сортировки
+    @_reads
+    def top_k(
+        self,
+        field: str,
+        k: int,
+        reverse: bool = False,
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+        filters: Optional[Iterable[SqlFilter]] = None,
+    ) -> List[Client]:
+        """
+        k клиентов с наименьшими (reverse=True — наибольшими) значениями field.
+        Отбор через кучу размера k: O(n log k) вместо O(n log n) у сортировки.
+        filters — те же условия (поле, оператор, значение), что и для ClientRepDB.
+        """
+        if k <= 0:
+            return []
+        key_fn = _field_getter(field)
+        clients: Iterable[Client] = self.iter_all()
+        predicate = _filters_to_predicate(filters)
+        if predicate is not None:
+            clients = (c for c in clients if predicate(c))
+        if filter_fn is not None:
+            clients = (c for c in clients if filter_fn(c))
+        select_k = heapq.nlargest if reverse else heapq.nsmallest
+        return select_k(k, clients, key=key_fn)
+
+    # d''. Страница в кратком виде (ClientShort: ФИО и количество стрижек)
+    @_reads
+    def get_short_list(self, k: int, n: int) -> List[ClientShort]:
+        """То же, что get_k_n_short_list, но без скидки и без повторной валидации полей."""
+        return [c.to_short_version() for c in self.get_k_n_short_list(k, n)]
+
+    @_reads
+    def iter_short(self) -> Iterator[ClientShort]:
+        """Обход всех клиентов в кратком виде (порядок — как у iter_all)."""
+        return (c.to_short_version() for c in self.iter_all())
+
     # e. Сортировка по выбранному полю (по умолчанию по фамилии)
+    @_writes
     def sort_by(self, param: str = "last_name") -> None:
-        key_map = {
-            "id": lambda x: x.get_id(),
-            "haircut": lambda x: x.get_haircut_counter(),
-            "discount": lambda x: x.get_discount(),
-            "last_name": lambda x: x.get_last_name(),
-        }
-        key_fn = key_map.get(param, key_map["last_name"])
-        self.items.sort(key=key_fn)
+        key_fn = SORT_KEYS.get(param, SORT_KEYS["last_name"])
+        self._mutable_items().sort(key=key_fn)
+
+    def _uniqueness_index(self) -> Counter:
+        """Хэш-индекс (фамилия, количество стрижек) -> число клиентов; строится лениво."""
+        if self._unique_keys is None:
+            self._unique_keys = Counter(_unique_key(c) for c in self.items)
+        return self._unique_keys
+
+    def _index_added(self, client: Client) -> None:
+        if self._unique_keys is not None:
+            self._unique_keys[_unique_key(client)] += 1
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.add(client)
+
+    def _index_removed(self, client: Client) -> None:
+        if self._unique_keys is not None:
+            self._unique_keys[_unique_key(client)] -= 1
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.remove(client.get_id())
 
     def _is_unique(self, client: Client) -> bool:
         """Проверка уникальности клиента по (фамилия, количество стрижек)."""
-        for c in self.items:
-            if (
-                c.get_last_name() == client.get_last_name()
-                and c.get_haircut_counter() == client.get_haircut_counter()
-            ):
-                return False
-        return True
+        return self._uniqueness_index()[_unique_key(client)] <= 0
 
     # f. Добавить объект (сформировать новый ID)
+    @_writes
     def add(self, client: Client) -> Optional[int]:
         if self._is_unique(client):
             new_id = self._generate_new_id()
             client.set_id(new_id)
-            self.items.append(client)
-            self.write_all()
+            self._mutable_items().append(client)
+            self._index_added(client)
+            self._persist()
             return new_id
         return None
 
+    # f'. Пакетное добавление: одна проверка уникальности и одна запись файла
+    @_writes
+    def add_many(self, clients: Iterable[Client]) -> List[Optional[int]]:
+        """
+        Добавляет клиентов пачкой. Возвращает ID для каждого клиента
+        (None — если клиент не уникален в хранилище или внутри пачки).
+        """
+        next_id = self._generate_new_id()
+        ids: List[Optional[int]] = []
+        for client in clients:
+            if not self._is_unique(client):
+                ids.append(None)
+                continue
+            client.set_id(next_id)
+            self._mutable_items().append(client)
+            self._index_added(client)
+            ids.append(next_id)
+            next_id += 1
+
+        if any(i is not None for i in ids):
+            self._persist()
+        return ids
+
     # g. Заменить по ID
+    @_writes
     def replace_by_id(self, client_id: int, new_client: Client) -> bool:
         if client_id >= 0 and self._is_unique(new_client):
             for i, c in enumerate(self.items):
                 if c.get_id() == client_id:
                     new_client.set_id(client_id)
-                    self.items[i] = new_client
-                    self.write_all()
+                    self._mutable_items()[i] = new_client
+                    self._index_removed(c)
+                    self._index_added(new_client)
+                    self._persist()
                     return True
         return False
 
     # h. Удалить по ID
+    @_writes
     def delete_by_id(self, client_id: int) -> bool:
         for i, c in enumerate(self.items):
             if c.get_id() == client_id:
-                del self.items[i]
-                self.write_all()
+                del self._mutable_items()[i]
+                self._index_removed(c)
+                self._persist()
                 return True
         return False
 
+    # h'. Программа лояльности: пакетное обновление за один проход и одну запись
+    @_writes
+    def increment_haircuts(
+        self,
+        ids: Iterable[int],
+        by: int = 1,
+        tiers: Optional[Iterable[Tuple[int, int]]] = None,
+    ) -> int:
+        """
+        Увеличивает haircut_counter клиентам ids на by и, если заданы tiers,
+        сразу пересчитывает им скидку. Клиенты, для которых новое значение
+        нарушило бы уникальность (фамилия, количество стрижек), пропускаются.
+        Возвращает число обновлённых клиентов.
+        """
+        _check_increment(by)
+        tiers = _check_tiers(tiers) if tiers is not None else None
+        targets = self._without_collisions(self._select_for_update(set(ids)), by)
+        self._apply_increment(targets, by, tiers)
+        if targets:
+            self._persist()
+        return len(targets)
+
+    @_writes
+    def recalculate_discounts(
+        self,
+        tiers: Iterable[Tuple[int, int]] = DISCOUNT_TIERS,
+        ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        """Пересчёт скидки по ступеням tiers (всем или только ids); число изменённых."""
+        tiers = _check_tiers(tiers)
+        wanted = set(ids) if ids is not None else None
+        changed = 0
+        for client in self.items:
+            if wanted is not None and client.get_id() not in wanted:
+                continue
+            discount = discount_for(client.get_haircut_counter(), tiers)
+            if client.get_discount() != discount:
+                client.set_discount(discount)
+                changed += 1
+        if changed:
+            self._persist()
+        return changed
+
+    def _select_for_update(self, ids: set) -> List[Client]:
+        return [c for c in self.items if c.get_id() in ids]
+
+    def _key_count(self, key: Tuple[str, int]) -> int:
+        return self._uniqueness_index()[key]
+
+    def _without_collisions(self, targets: List[Client], by: int) -> List[Client]:
+        """
+        Клиенты из targets, которых можно сдвинуть на by стрижек без дубликатов.
+        Освобождаемые ключи сдвигаемых клиентов учитываются, поэтому цепочка
+        (Иванов, 3), (Иванов, 4) сдвигается целиком.
+        """
+        def shifted(client: Client) -> Tuple[str, int]:
+            return client.get_last_name(), client.get_haircut_counter() + by
+
+        moving = targets
+        while True:
+            old_keys = Counter(_unique_key(c) for c in moving)
+            new_keys = Counter(shifted(c) for c in moving)
+            allowed = [
+                c for c in moving
+                if new_keys[shifted(c)] == 1
+                and self._key_count(shifted(c)) - old_keys[shifted(c)] <= 0
+            ]
+            if len(allowed) == len(moving):
+                return allowed
+            moving = allowed
+
+    def _apply_increment(
+        self,
+        targets: List[Client],
+        by: int,
+        tiers: Optional[DiscountTiers],
+    ) -> None:
+        for client in targets:
+            self._index_removed(client)
+            client.set_haircut_counter(client.get_haircut_counter() + by)
+            if tiers is not None:
+                client.set_discount(discount_for(client.get_haircut_counter(), tiers))
+        for client in targets:
+            self._index_added(client)
+
     # i. Кол-во элементов
+    @_reads
     def get_count(self) -> int:
         return len(self.items)
 
     def _generate_new_id(self) -> int:
         return max((c.get_id() for c in self.items), default=0) + 1
 
+    # j. Нечёткий поиск по ФИО (опечатки в фамилии и т.п.)
+    @_reads
+    def fuzzy_search(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = 0.3,
+    ) -> List[Tuple[Client, float]]:
+        """
+        До limit пар (клиент, сходство 0..1), ФИО которых ближе всего к query
+        по триграммам (при равном сходстве — по расстоянию редактирования).
+        Сравнение идёт с фамилией, именем, отчеством и ФИО целиком.
+        """
+        index = self._fuzzy_name_index()
+        matches = index.search(query, limit, min_similarity)
+        if self._fuzzy_keep_clients:
+            return [(index.client(client_id), score) for client_id, score in matches]
+        found = ((self.get_by_id(client_id), score) for client_id, score in matches)
+        return [(client, score) for client, score in found if client is not None]
+
+    def _fuzzy_name_index(self) -> FuzzyNameIndex:
+        """Индекс строится лениво и дальше поддерживается _index_added / _index_removed."""
+        if self._fuzzy_index is None:
+            index = FuzzyNameIndex(keep_clients=self._fuzzy_keep_clients)
+            for client in self.iter_all():
+                index.add(client)
+            self._fuzzy_index = index
+        return self._fuzzy_index
+
+    def iter_all(self) -> Iterator[Client]:
+        """
+        Последовательный обход клиентов (для потоковой выгрузки) без копии списка.
+        Список фиксируется при первом next(); изменения, сделанные во время
+        обхода, уходят в копию (_mutable_items), и обход их не видит.
+        """
+        with self._read_locked():
+            items = self._share_items()
+        try:
+            yield from items
+        finally:
+            self._release_items(items)
+
+    def _share_items(self) -> List[Client]:
+        """Текущий список для обхода; до _release_items он не меняется на месте."""
+        with self._share_lock:
+            self._share_count += 1
+            return self._items
+
+    def _release_items(self, items: List[Client]) -> None:
+        with self._share_lock:
+            if self._items is items:
+                self._share_count -= 1
+
+    @_reads
     def print_all(self) -> None:
         """Вывод всех клиентов."""
         if not self.items:
@@ -129,8 +1042,13 @@ class ClientRepBase(ABC):
 
 
 class ClientRepJson(ClientRepBase):
-    def __init__(self, file_path: str = "clients.json") -> None:
-        super().__init__(file_path)
+    def __init__(
+        self,
+        file_path: str = "clients.json",
+        load_workers: int = 1,
+        chunk_size: int = 10000,
+    ) -> None:
+        super().__init__(file_path, load_workers=load_workers, chunk_size=chunk_size)
 
     def _load_from_storage(self) -> List[dict]:
         with open(self.file_path, "r", encoding="utf-8") as f:
@@ -147,12 +1065,19 @@ class ClientRepJson(ClientRepBase):
 
 
 class ClientRepYaml(ClientRepBase):
-    def __init__(self, file_path: str = "clients.yaml") -> None:
-        super().__init__(file_path)
+    def __init__(
+        self,
+        file_path: str = "clients.yaml",
+        load_workers: int = 1,
+        chunk_size: int = 10000,
+    ) -> None:
+        super().__init__(file_path, load_workers=load_workers, chunk_size=chunk_size)
 
     def _load_from_storage(self) -> List[dict]:
         with open(self.file_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+            # C-реализация безопасного загрузчика заметно быстрее, если libyaml доступна
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+            data = yaml.load(f, Loader=loader)
             return data or []
 
     def _dump_to_storage(
@@ -180,6 +1105,8 @@ class DatabaseConnection:
     def __init__(self, dsn: str) -> None:
         self.dsn = dsn
         self.conn = psycopg2.connect(dsn)
+        # Значения SET текущей сессии (statement_timeout и т.п.), см. ClientRepDB
+        self.session_settings: Dict[str, Any] = {}
 
     @classmethod
     def get_instance(cls, dsn: str) -> "DatabaseConnection":
@@ -195,22 +1122,858 @@ class DatabaseConnection:
         """Вернуть объект соединения psycopg2."""
         return self.conn
 
+    def open_dedicated(self):
+        """Новое отдельное соединение с той же БД (закрывает вызывающий)."""
+        return psycopg2.connect(self.dsn)
+
     def close(self) -> None:
-        """Закрыть соединение и сбросить одиночку."""
+        """Закрыть соединение и сбросить одиночку (если это она)."""
         if self.conn is not None:
             self.conn.close()
             self.conn = None
-        DatabaseConnection._instance = None
+        if DatabaseConnection._instance is self:
+            DatabaseConnection._instance = None
+
+
+class ReplicaConnection:
+    """
+    Соединение с репликой только для чтения. Интерфейс как у DatabaseConnection
+    (get_connection, session_settings); подключение — при первом запросе.
+    """
+
+    def __init__(self, dsn: str, connect_timeout: int = 2) -> None:
+        self.dsn = dsn
+        self.connect_timeout = connect_timeout
+        self.conn = None
+        self.session_settings: Dict[str, Any] = {}
+        # Число выполняющихся на реплике операций (для стратегии least_busy)
+        self.in_flight = 0
+        # До этого момента (time.monotonic) реплика считается недоступной
+        self.down_until = 0.0
+
+    def get_connection(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = self.open_dedicated()
+            self.session_settings = {}
+        return self.conn
+
+    def open_dedicated(self):
+        """Новое отдельное соединение с репликой (закрывает вызывающий)."""
+        conn = psycopg2.connect(self.dsn, connect_timeout=self.connect_timeout)
+        conn.set_session(readonly=True)
+        return conn
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# Стратегии выбора реплики для чтения
+REPLICA_STRATEGIES = ("round_robin", "least_busy")
+
+
+class ReplicaRouter:
+    """
+    Выбирает реплику для операции чтения ClientRepDB.
+
+    round_robin — по очереди, least_busy — с наименьшим числом выполняющихся
+    операций. Реплика, к которой не удалось подключиться (или на которой
+    оборвалось соединение), пропускается retry_after секунд; если доступных
+    реплик нет, acquire() возвращает None и чтение идёт на primary.
+    """
+
+    def __init__(
+        self,
+        dsns: Iterable[str],
+        strategy: str = "round_robin",
+        retry_after: float = 5.0,
+        connect_timeout: int = 2,
+    ) -> None:
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия выбора реплики: {strategy}")
+        self.replicas = [ReplicaConnection(dsn, connect_timeout) for dsn in dsns]
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _candidates(self) -> List[ReplicaConnection]:
+        now = time.monotonic()
+        alive = [r for r in self.replicas if r.down_until <= now]
+        if self.strategy == "least_busy":
+            return sorted(alive, key=lambda r: r.in_flight)
+        start = self._next % len(self.replicas) if self.replicas else 0
+        self._next += 1
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [r for r in ordered if r in alive]
+
+    def acquire(self) -> Optional[ReplicaConnection]:
+        with self._lock:
+            candidates = self._candidates()
+        for replica in candidates:
+            try:
+                replica.get_connection()
+            except psycopg2.Error:
+                self.mark_down(replica)
+                continue
+            with self._lock:
+                replica.in_flight += 1
+            return replica
+        return None
+
+    def release(self, replica: ReplicaConnection, failed: bool = False) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+        if failed:
+            self.mark_down(replica)
+
+    def mark_down(self, replica: ReplicaConnection) -> None:
+        replica.down_until = time.monotonic() + self.retry_after
+        try:
+            replica.close()
+        except psycopg2.Error:
+            pass
+
+    def close(self) -> None:
+        for replica in self.replicas:
+            replica.close()
+
+
+# Канал NOTIFY, в который триггер clients_notify_trg пишет изменения clients
+CHANGES_CHANNEL = "clients_changes"
+
+# Обработчик изменения: (операция, id, строка как dict или None)
+ChangeHandler = Callable[[str, Optional[int], Optional[dict]], None]
+
+
+class ClientChangeListener:
+    """
+    Слушает LISTEN clients_changes в отдельном соединении и потоке
+    и передаёт каждое изменение зарегистрированным обработчикам.
+
+    Операции: INSERT / UPDATE (с полной строкой), DELETE (только id),
+    TRUNCATE и RESYNC — после переподключения, когда уведомления
+    могли быть потеряны и локальное состояние нужно перечитать целиком.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANGES_CHANNEL, poll_timeout: float = 1.0) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+        self._handlers: List[ChangeHandler] = []
+        self._conn = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def add_handler(self, handler: ChangeHandler) -> None:
+        self._handlers.append(handler)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """LISTEN выполняется синхронно: после start() уведомления уже не теряются."""
+        if self.running:
+            return
+        self._connect()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="clients-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> None:
+        self._conn = psycopg2.connect(self.dsn)
+        self._conn.autocommit = True
+        with self._conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._conn], [], [], self.poll_timeout)
+                if not ready:
+                    continue
+                self._conn.poll()
+                while self._conn.notifies:
+                    notify = self._conn.notifies.pop(0)
+                    payload = json.loads(notify.payload)
+                    self._dispatch(payload["op"], payload.get("id"), payload.get("row"))
+            except (psycopg2.OperationalError, psycopg2.InterfaceError, OSError):
+                if self._stop.is_set():
+                    break
+                self._reconnect()
+
+    def _reconnect(self) -> None:
+        try:
+            if self._conn is not None:
+                self._conn.close()
+            self._connect()
+        except psycopg2.OperationalError:
+            self._stop.wait(self.poll_timeout)
+            return
+        self._dispatch("RESYNC", None, None)
+
+    def _dispatch(self, op: str, client_id: Optional[int], row: Optional[dict]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(op, client_id, row)
+            except Exception as exc:  # noqa: BLE001
+                print(f"Ошибка обработки уведомления {op} {client_id}: {exc}")
+
+
+# Простой фильтр для переноса в SQL: (поле, оператор, значение),
+# например ("discount", ">=", 10).
+SqlFilter = Tuple[str, str, Any]
+
+_FILTER_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "father_name",
+    "haircut_counter",
+    "discount",
+)
+# SQL-оператор -> его аналог в Python (для тех же фильтров над файлами)
+_FILTER_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Столбцы краткого представления в порядке аргументов ClientShort —
+# проекция для get_short_list / iter_short
+SHORT_FIELDS = ("last_name", "first_name", "father_name", "haircut_counter")
+
+
+@functools.lru_cache(maxsize=None)
+def _short_columns() -> sql.Composable:
+    """
+    Список столбцов SHORT_FIELDS для SQL. Строится при первом запросе:
+    импорт модуля не должен загружать psycopg2.
+    """
+    return sql.SQL(", ").join(map(sql.Identifier, SHORT_FIELDS))
+
+
+def _build_where(filters: Optional[Iterable[SqlFilter]]) -> Tuple[sql.Composable, list]:
+    """
+    Собирает WHERE-часть запроса из простых фильтров.
+    Поля и операторы проверяются по белому списку, значения идут параметрами.
+    """
+    conditions = []
+    params: list = []
+    for field, op, value in filters or ():
+        if field not in _FILTER_FIELDS:
+            raise ValueError(f"Неизвестное поле фильтра: {field}")
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Неподдерживаемый оператор фильтра: {op}")
+        conditions.append(
+            sql.SQL("{} {} %s").format(sql.Identifier(field), sql.SQL(op))
+        )
+        params.append(value)
+
+    if not conditions:
+        return sql.SQL(""), params
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions), params
+
+
+def _freeze(value: Any) -> Any:
+    """Хэшируемая форма значения фильтра (списки — в кортежи и т.п.)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    hash(value)
+    return value
+
+
+def _filters_key(filters: List[SqlFilter]) -> Optional[Tuple[Any, ...]]:
+    """
+    Ключ кэша для набора фильтров: порядок условий не важен (они
+    объединяются через AND). None — если значение не удаётся заморозить.
+    """
+    try:
+        frozen = [(field, op, _freeze(value)) for field, op, value in filters]
+    except TypeError:
+        return None
+    return tuple(sorted(frozen, key=repr))
+
+
+def _check_field(field: str) -> None:
+    if field not in _FILTER_FIELDS:
+        raise ValueError(f"Неизвестное поле: {field}")
+
+
+def _field_getter(field: str) -> Callable[[Client], Any]:
+    """Геттер Client для имени столбца: "discount" -> c.get_discount()."""
+    _check_field(field)
+    return operator.methodcaller(f"get_{field}")
+
+
+def _filters_to_predicate(
+    filters: Optional[Iterable[SqlFilter]],
+) -> Optional[Callable[[Client], bool]]:
+    """Те же простые фильтры, что и для SQL, в виде предиката для файловых хранилищ."""
+    checks = []
+    for field, op, value in filters or ():
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Неподдерживаемый оператор фильтра: {op}")
+        checks.append((_field_getter(field), _FILTER_OPS[op], value))
+    if not checks:
+        return None
+    return lambda c: all(compare(get(c), value) for get, compare, value in checks)
+
+
+def _select_page(
+    clients: Iterable[Client],
+    k: int,
+    n: int,
+    filter_fn: Optional[Callable[[Client], bool]] = None,
+    sort_key: Optional[Callable[[Client], Any]] = None,
+    reverse: bool = False,
+) -> List[Client]:
+    """
+    k-я страница по n элементов из потока клиентов.
+
+    Без сортировки фильтр применяется лениво, и поток читается только
+    до конца нужной страницы. С сортировкой отбирается лишь префикс
+    из k*n элементов (куча, O(m log(k*n))) — результат тот же,
+    что у полной устойчивой сортировки.
+    """
+    start = (k - 1) * n
+    end = start + n
+    stream = iter(clients)
+    try:
+        if filter_fn is not None:
+            stream = (c for c in stream if filter_fn(c))
+        if sort_key is None:
+            return list(itertools.islice(stream, start, end))
+        select_k = heapq.nlargest if reverse else heapq.nsmallest
+        return select_k(end, stream, key=sort_key)[start:end]
+    finally:
+        close = getattr(clients, "close", None)
+        if close is not None:
+            close()
+
+
+def _discount_case(tiers: DiscountTiers, counter: sql.Composable) -> sql.Composable:
+    """CASE-выражение SQL, считающее ту же скидку, что и discount_for."""
+    if not tiers:
+        return sql.Literal(0)
+    whens = sql.SQL(" ").join(
+        sql.SQL("WHEN {} >= {} THEN {}").format(counter, sql.Literal(threshold), sql.Literal(discount))
+        for threshold, discount in reversed(tiers)
+    )
+    return sql.SQL("CASE {} ELSE 0 END").format(whens)
+
+
+# Ошибки операций ClientRepDB, которые выбрасывает политика запросов
+class DBOperationError(Exception):
+    """Операция ClientRepDB не выполнена (таймаут, отмена или исчерпаны повторы)."""
+
+    def __init__(self, operation: str, message: str) -> None:
+        super().__init__(f"{operation}: {message}")
+        self.operation = operation
+
+
+class QueryTimeoutError(DBOperationError):
+    """Общий предок всех таймаутов."""
+
+
+class StatementTimeoutError(QueryTimeoutError):
+    """Запрос прерван сервером по statement_timeout."""
+
+
+class LockTimeoutError(QueryTimeoutError):
+    """Блокировку не удалось получить за lock_timeout (после всех повторов)."""
+
+
+class DeadlineExceededError(QueryTimeoutError):
+    """Истёк дедлайн операции; выполнявшийся запрос отменён клиентом."""
+
+
+class RetriesExhaustedError(DBOperationError):
+    """Переходная ошибка (deadlock, serialization failure) повторилась retries раз."""
+
+
+# SQLSTATE: query_canceled (statement_timeout или отмена), lock_not_available
+# (lock_timeout) и ошибки, после которых транзакцию можно просто повторить
+QUERY_CANCELED = "57014"
+LOCK_NOT_AVAILABLE = "55P03"
+TRANSIENT_SQLSTATES = ("40001", "40P01", LOCK_NOT_AVAILABLE)
+
+
+class QueryPolicy:
+    """
+    Ограничения на операции ClientRepDB (None — без ограничения):
+    statement_timeout_ms / lock_timeout_ms — серверные таймауты сессии;
+    deadline_ms — общий бюджет операции с учётом повторов, по его
+    истечении выполняющийся запрос отменяется со стороны клиента
+    (операции с дедлайном идут на отдельном соединении потока, поэтому
+    отмена не задевает запросы других потоков);
+    retries — число повторов при переходных ошибках, задержка между ними
+    растёт экспоненциально от backoff_ms до max_backoff_ms (со случайным разбросом).
+    """
+
+    FIELDS = ("statement_timeout_ms", "lock_timeout_ms", "deadline_ms", "retries", "backoff_ms", "max_backoff_ms")
+
+    def __init__(
+        self,
+        statement_timeout_ms: Optional[int] = None,
+        lock_timeout_ms: Optional[int] = None,
+        deadline_ms: Optional[int] = None,
+        retries: int = 0,
+        backoff_ms: int = 50,
+        max_backoff_ms: int = 1000,
+    ) -> None:
+        self.statement_timeout_ms = statement_timeout_ms
+        self.lock_timeout_ms = lock_timeout_ms
+        self.deadline_ms = deadline_ms
+        self.retries = retries
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+
+    def replace(self, **changes: Any) -> "QueryPolicy":
+        unknown = set(changes) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры политики: {', '.join(sorted(unknown))}")
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(changes)
+        return QueryPolicy(**values)
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка (в секундах) перед повтором номер attempt."""
+        delay_ms = min(self.max_backoff_ms, self.backoff_ms * 2 ** (attempt - 1))
+        return delay_ms * random.uniform(0.5, 1.0) / 1000
+
+
+class QueryMetrics:
+    """Метрики операций ClientRepDB."""
+
+    def __init__(self) -> None:
+        self.calls: Counter = Counter()
+        self.retries = 0
+        self.statement_timeouts = 0
+        self.lock_timeouts = 0
+        self.deadlines_exceeded = 0
+        self.failures = 0
+        self.replica_reads = 0
+        self.replica_fallbacks = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.calls[operation] += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def __str__(self) -> str:
+        calls = sum(self.calls.values())
+        avg = self.total_ms / calls if calls else 0.0
+        return (
+            f"Операций: {calls}, повторов: {self.retries}, таймаутов запроса: "
+            f"{self.statement_timeouts}, таймаутов блокировки: {self.lock_timeouts}, "
+            f"дедлайнов: {self.deadlines_exceeded}, ошибок: {self.failures}, "
+            f"чтений с реплик: {self.replica_reads}, переключений на другую "
+            f"реплику/primary: {self.replica_fallbacks}, "
+            f"время ср/макс: {avg:.1f}/{self.max_ms:.1f} мс"
+        )
+
+
+class _CancelTimer:
+    """
+    Отмена выполняющегося запроса (connection.cancel) в момент deadline.
+    Соединение должно принадлежать только этой операции (_ThreadConnection
+    или отдельное соединение обхода). stop() гарантирует, что отмена
+    не сработает после завершения операции, и сообщает, успела ли она сработать.
+    """
+
+    def __init__(self, deadline: Optional[float]) -> None:
+        self._deadline = deadline
+        self._conn: Any = None
+        self._lock = threading.Lock()
+        self._done = False
+        self.fired = False
+        self._timer: Optional[threading.Timer] = None
+
+    def start(self, conn: Any) -> None:
+        if self._deadline is None:
+            return
+        self._conn = conn
+        self._timer = threading.Timer(max(self._deadline - time.monotonic(), 0), self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self) -> None:
+        with self._lock:
+            if self._done:
+                return
+            self.fired = True
+            self._conn.cancel()
+
+    def stop(self) -> bool:
+        with self._lock:
+            self._done = True
+        if self._timer is not None:
+            self._timer.cancel()
+        return self.fired
+
+
+class _ThreadConnection:
+    """
+    Соединение потока для операций с дедлайном: connection.cancel() по
+    дедлайну отменяет только запрос этой операции, а не чужой запрос на
+    общем соединении. Интерфейс как у DatabaseConnection / ReplicaConnection.
+    """
+
+    def __init__(self, source: Any) -> None:
+        self.source = source
+        self.conn = None
+        self.session_settings: Dict[str, Any] = {}
+
+    def get_connection(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = self.source.open_dedicated()
+            self.session_settings = {}
+        return self.conn
+
+    def open_dedicated(self):
+        return self.source.open_dedicated()
+
+
+def _set_local_timeouts(cur: Any, policy: QueryPolicy) -> None:
+    """SET LOCAL statement_timeout / lock_timeout: действуют до конца текущей транзакции."""
+    wanted = {
+        "statement_timeout": policy.statement_timeout_ms,
+        "lock_timeout": policy.lock_timeout_ms,
+    }
+    statements = [
+        sql.SQL("SET LOCAL {} TO {}").format(sql.Identifier(name), sql.Literal(value))
+        for name, value in wanted.items()
+        if value is not None
+    ]
+    if statements:
+        cur.execute(sql.SQL("; ").join(statements))
+
+
+def _db_operation(method: Callable) -> Callable:
+    """Метод ClientRepDB выполняется под текущей QueryPolicy репозитория."""
+
+    @functools.wraps(method)
+    def wrapper(self: "ClientRepDB", *args: Any, **kwargs: Any) -> Any:
+        # Одноразовые итераторы (генераторы ID, клиентов) фиксируются,
+        # чтобы повтор операции получил те же данные
+        args = tuple(list(a) if isinstance(a, Iterator) else a for a in args)
+        kwargs = {k: list(v) if isinstance(v, Iterator) else v for k, v in kwargs.items()}
+        return self._run_operation(method.__name__, lambda: method(self, *args, **kwargs))
+
+    return wrapper
+
+
+# Операции ClientRepDB, которые при наличии реплик выполняются на них
+READ_OPERATIONS = frozenset((
+    "get_by_id",
+    "get_many_by_ids",
+    "top_k",
+    "get_k_n_short_list",
+    "get_count",
+    "get_all",
+    "fuzzy_search",
+    "get_short_list",
+))
+
+
+# Стратегии подсчёта для ClientRepDB.get_count:
+#   exact   — SELECT COUNT(*) (полный проход по таблице);
+#   counter — точное значение из таблицы clients_count, которую ведут триггеры
+#             (создаются initialize_database(counter=True));
+#   approx  — оценка планировщика pg_class.reltuples (после ANALYZE/VACUUM);
+#   cached  — COUNT(*) один раз, затем кэш до первой записи через репозиторий.
+COUNT_STRATEGIES = ("exact", "counter", "approx", "cached")
 
 
 class ClientRepDB:
-    def __init__(self, db: DatabaseConnection) -> None:
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        count_strategy: str = "exact",
+        policy: Optional[QueryPolicy] = None,
+        replicas: Optional[ReplicaRouter] = None,
+        read_your_writes: bool = False,
+        pin_seconds: float = 5.0,
+        count_cache_ttl: float = 5.0,
+    ) -> None:
+        """
+        replicas — реплики для операций чтения (READ_OPERATIONS, iter_all).
+        read_your_writes — после записи чтения из этого потока pin_seconds
+        секунд идут на primary, чтобы не увидеть отставшую реплику.
+        count_cache_ttl — сколько секунд живёт значение стратегии "cached".
+        Записи через этот объект сбрасывают кэш сразу, а изменения других
+        процессов и узлов становятся видны не позже чем через count_cache_ttl
+        (или сразу, если кэш сбрасывает ClientChangeListener).
+        """
+        if count_strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия подсчёта: {count_strategy}")
         # Делегируем работу с соединением объекту-одиночке
         self.db = db
+        self.count_strategy = count_strategy
+        self.count_cache_ttl = count_cache_ttl
+        # Ключ фильтров -> (количество, время подсчёта по time.monotonic)
+        self._count_cache: Dict[Any, Tuple[int, float]] = {}
+        # Счётчик для уникальных имён серверных курсоров iter_all
+        self._cursor_ids = itertools.count(1)
+        # Политика запросов: по умолчанию для репозитория, уточняется в using()
+        self.policy = policy or QueryPolicy()
+        self.metrics = QueryMetrics()
+        self.replicas = replicas
+        self.read_your_writes = read_your_writes
+        self.pin_seconds = pin_seconds
+        # Поток: политика из using(), выбранная реплика, закрепление за primary
+        self._local = threading.local()
 
     @property
     def conn(self) -> psycopg2.extensions.connection:
-        return self.db.get_connection()
+        return self._target().get_connection()
+
+    def _target(self) -> Any:
+        """Соединение текущей операции: выбранная реплика или primary."""
+        return getattr(self._local, "target", None) or self.db
+
+    # Разделение чтения и записи
+    @contextmanager
+    def primary(self) -> Iterator["ClientRepDB"]:
+        """Все операции внутри блока (в этом потоке) выполняются на primary."""
+        previous = getattr(self._local, "force_primary", False)
+        self._local.force_primary = True
+        try:
+            yield self
+        finally:
+            self._local.force_primary = previous
+
+    def _routes_to_replica(self, name: str) -> bool:
+        if self.replicas is None or name not in READ_OPERATIONS:
+            return False
+        if getattr(self._local, "force_primary", False):
+            return False
+        return time.monotonic() >= getattr(self._local, "pinned_until", 0.0)
+
+    # Таймауты, отмена и повторы
+    @contextmanager
+    def using(self, **changes: Any) -> Iterator["ClientRepDB"]:
+        """
+        Переопределить политику для операций внутри блока (в этом потоке):
+        with repo.using(statement_timeout_ms=200, deadline_ms=300): ...
+        """
+        previous = getattr(self._local, "policy", None)
+        self._local.policy = self._current_policy().replace(**changes)
+        try:
+            yield self
+        finally:
+            self._local.policy = previous
+
+    def _current_policy(self) -> QueryPolicy:
+        return getattr(self._local, "policy", None) or self.policy
+
+    def _apply_session_timeouts(self, policy: QueryPolicy, target: Any = None) -> None:
+        """SET statement_timeout / lock_timeout, только если значение сессии другое."""
+        target = target or self._target()
+        wanted = {
+            "statement_timeout": policy.statement_timeout_ms,
+            "lock_timeout": policy.lock_timeout_ms,
+        }
+        settings = target.session_settings
+        changes = {name: value for name, value in wanted.items() if settings.get(name) != value}
+        if not changes:
+            return
+        conn = target.get_connection()
+        statements = sql.SQL("; ").join(
+            sql.SQL("SET {} TO {}").format(
+                sql.Identifier(name),
+                sql.Literal(value) if value is not None else sql.SQL("DEFAULT"),
+            )
+            for name, value in changes.items()
+        )
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(statements)
+        settings.update(changes)
+
+    def _thread_connection(self, target: Any) -> _ThreadConnection:
+        """Отдельное соединение текущего потока с target (primary или репликой)."""
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(id(target))
+        if connection is None or connection.source is not target:
+            connection = connections[id(target)] = _ThreadConnection(target)
+        return connection
+
+    @contextmanager
+    def _commit(self) -> Iterator[None]:
+        """Фиксация изменений операции; внутри run_in_transaction — по её завершении."""
+        if getattr(self._local, "transaction", False):
+            yield
+            return
+        with self.conn:
+            yield
+
+    def run_in_transaction(self, name: str, call: Callable[[], Any]) -> Any:
+        """
+        Выполнить call (несколько операций репозитория) одной транзакцией
+        на primary: вложенные операции не фиксируются по отдельности,
+        а повторы по QueryPolicy применяются к call целиком.
+        """
+        def transaction() -> Any:
+            if getattr(self._local, "transaction", False):
+                return call()
+            self._local.transaction = True
+            try:
+                with self.conn:
+                    return call()
+            finally:
+                self._local.transaction = False
+
+        with self.primary():
+            return self._run_operation(name, transaction)
+
+    @contextmanager
+    def _stream_connection(self, target: Any) -> Iterator[Any]:
+        """
+        Соединение потока для обхода серверным курсором. После обхода оно
+        не закрывается, а ждёт следующего обхода этого потока: постраничные
+        чтения через iter_all не открывают по соединению на каждый вызов.
+        Вложенные обходы одного потока получают разные соединения.
+        """
+        pools = getattr(self._local, "stream_connections", None)
+        if pools is None:
+            pools = self._local.stream_connections = {}
+        idle = pools.setdefault(id(target), [])
+        conn = None
+        while idle and conn is None:
+            conn = idle.pop()
+            if conn.closed:
+                conn = None
+        if conn is None:
+            conn = target.open_dedicated()
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                idle.append(conn)
+
+    def _rollback_quietly(self) -> None:
+        try:
+            self.conn.rollback()
+        except psycopg2.Error:
+            pass
+
+    def _run_operation(self, name: str, call: Callable[[], Any]) -> Any:
+        # Вложенные операции (get_count внутри другой операции и т.п.)
+        # выполняются в рамках внешней: без своих повторов и таймера
+        if getattr(self._local, "active", False):
+            return call()
+
+        policy = self._current_policy()
+        started = time.monotonic()
+        deadline = started + policy.deadline_ms / 1000 if policy.deadline_ms is not None else None
+        read_replica = self._routes_to_replica(name)
+        attempt = 0
+        self._local.active = True
+        try:
+            while True:
+                attempt += 1
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.metrics.count("deadlines_exceeded")
+                    raise DeadlineExceededError(name, f"дедлайн {policy.deadline_ms} мс истёк")
+
+                replica = self.replicas.acquire() if read_replica else None
+                replica_failed = False
+                target = replica or self.db
+                if deadline is not None:
+                    target = self._thread_connection(target)
+                self._local.target = target
+                cancel = _CancelTimer(deadline)
+                try:
+                    # Соединение берётся внутри try: сбой подключения к реплике
+                    # обрабатывается как и прочие её ошибки
+                    cancel.start(self.conn)
+                    self._apply_session_timeouts(policy)
+                    result = call()
+                except psycopg2.Error as exc:
+                    cancelled = cancel.stop()
+                    self._rollback_quietly()
+                    code = getattr(exc, "pgcode", None)
+                    if replica is not None and not cancelled and code is None and isinstance(
+                        exc, (psycopg2.OperationalError, psycopg2.InterfaceError)
+                    ):
+                        # Реплика недоступна: чтение на другой реплике или primary,
+                        # это не считается повтором
+                        replica_failed = True
+                        self.metrics.count("replica_fallbacks")
+                        attempt -= 1
+                        continue
+                    if cancelled:
+                        self.metrics.count("deadlines_exceeded")
+                        raise DeadlineExceededError(
+                            name, f"запрос отменён по дедлайну {policy.deadline_ms} мс"
+                        ) from exc
+                    if code == QUERY_CANCELED:
+                        self.metrics.count("statement_timeouts")
+                        raise StatementTimeoutError(
+                            name, f"statement_timeout {policy.statement_timeout_ms} мс"
+                        ) from exc
+                    if code not in TRANSIENT_SQLSTATES:
+                        self.metrics.count("failures")
+                        raise
+                    if code == LOCK_NOT_AVAILABLE:
+                        self.metrics.count("lock_timeouts")
+
+                    delay = policy.backoff(attempt)
+                    fits = deadline is None or time.monotonic() + delay < deadline
+                    if attempt <= policy.retries and fits:
+                        self.metrics.count("retries")
+                        time.sleep(delay)
+                        continue
+                    self.metrics.count("failures")
+                    if code == LOCK_NOT_AVAILABLE:
+                        raise LockTimeoutError(
+                            name, f"блокировка не получена, попыток: {attempt}"
+                        ) from exc
+                    raise RetriesExhaustedError(name, f"{exc.pgerror or exc}, попыток: {attempt}") from exc
+                else:
+                    cancel.stop()
+                    self.metrics.record(name, (time.monotonic() - started) * 1000)
+                    if replica is not None:
+                        self.metrics.count("replica_reads")
+                    elif self.read_your_writes and name not in READ_OPERATIONS:
+                        self._local.pinned_until = time.monotonic() + self.pin_seconds
+                    return result
+                finally:
+                    if replica is not None:
+                        self.replicas.release(replica, failed=replica_failed)
+                    self._local.target = None
+        finally:
+            self._local.active = False
 
     # Преобразование строки из БД в dict для Client(d).
     def _row_to_dict(self, row: Any) -> dict:
@@ -223,7 +1986,14 @@ class ClientRepDB:
             "id": row[0],
         }
 
+    # Строка БД -> Client, либо ленивое ClientView для чтения без валидации.
+    def _make_client(self, row: Any, lazy: bool = False) -> ClientLike:
+        if lazy:
+            return ClientView(row)
+        return Client(self._row_to_dict(row))
+
     # a. Получить объект по ID
+    @_db_operation
     def get_by_id(self, client_id: int) -> Optional[Client]:
         if client_id < 0:
             return None
@@ -243,10 +2013,121 @@ class ClientRepDB:
         if row is None:
             return None
 
-        return Client(self._row_to_dict(row))
+        return Client(self._row_to_dict(row))
+
+    # a'. Получить несколько объектов по списку ID одним запросом
+    @_db_operation
+    def get_many_by_ids(self, ids: Iterable[int]) -> Tuple[List[Client], List[int]]:
+        """
+        Возвращает (клиенты в порядке ids, ID которых нет в таблице).
+        Все ID запрашиваются одним SELECT ... WHERE id = ANY(%s).
+        """
+        ids = list(ids)
+        wanted = sorted({i for i in ids if i >= 0})
+        if not wanted:
+            return _collect_by_ids(ids, {})
+
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, first_name, last_name, father_name,
+                       haircut_counter, discount
+                FROM clients
+                WHERE id = ANY(%s)
+                """,
+                (wanted,),
+            )
+            rows = cur.fetchall()
+
+        by_id = {r[0]: Client(self._row_to_dict(r)) for r in rows}
+        return _collect_by_ids(ids, by_id)
+
+    # a''. Первые k клиентов по полю: ORDER BY ... LIMIT k по индексу
+    @_db_operation
+    def top_k(
+        self,
+        field: str,
+        k: int,
+        reverse: bool = False,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        lazy: bool = False,
+    ) -> List[ClientLike]:
+        """
+        k клиентов с наименьшими (reverse=True — наибольшими) значениями field.
+        При индексе по field PostgreSQL читает только k записей индекса.
+        """
+        if k <= 0:
+            return []
+        _check_field(field)
+        where, params = _build_where(filters)
+        direction = sql.SQL("DESC" if reverse else "ASC")
+        query = (
+            sql.SQL(
+                """
+                SELECT id, first_name, last_name, father_name,
+                       haircut_counter, discount
+                FROM clients
+                """
+            )
+            + where
+            + sql.SQL(" ORDER BY {} {}, id LIMIT %s").format(sql.Identifier(field), direction)
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(query, params + [k])
+            rows = cur.fetchall()
+
+        return [self._make_client(r, lazy) for r in rows]
+
+    # a'''. Нечёткий поиск по ФИО: pg_trgm и GIN-индексы по триграммам
+    @_db_operation
+    def fuzzy_search(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = 0.3,
+        lazy: bool = False,
+    ) -> List[Tuple[ClientLike, float]]:
+        """
+        До limit пар (клиент, сходство 0..1) с тем же смыслом, что и
+        ClientRepBase.fuzzy_search. Кандидатов отбирает оператор % по
+        GIN-индексам TRIGRAM_INDEXES (порог — min_similarity), сортировка —
+        по наибольшему similarity() среди полей. pg_trgm и индексы создаёт
+        ensure_clients_table (initialize_database).
+        """
+        if not 0 <= min_similarity <= 1:
+            raise ValueError("min_similarity должно быть в диапазоне [0, 1]")
+        if limit <= 0 or not query.strip():
+            return []
+
+        expressions = [sql.SQL(e) for e in TRIGRAM_INDEXES.values()]
+        score = sql.SQL("GREATEST({})").format(
+            sql.SQL(", ").join(sql.SQL("similarity({}, %(q)s)").format(e) for e in expressions)
+        )
+        matches = sql.SQL(" OR ").join(sql.SQL("{} %% %(q)s").format(e) for e in expressions)
+        statement = sql.SQL(
+            """
+            SELECT id, first_name, last_name, father_name,
+                   haircut_counter, discount, {score} AS score
+            FROM clients
+            WHERE {matches}
+            ORDER BY score DESC, id
+            LIMIT %(limit)s
+            """
+        ).format(score=score, matches=matches)
+        with self.conn.cursor() as cur:
+            # Порог оператора % — только для текущей транзакции
+            cur.execute(
+                "SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                (str(min_similarity),),
+            )
+            cur.execute(statement, {"q": query, "limit": limit})
+            rows = cur.fetchall()
+
+        return [(self._make_client(r[:6], lazy), float(r[6])) for r in rows]
 
     # b. get_k_n_short_list: Получить список k по счету n объектов
-    def get_k_n_short_list(self, k: int, n: int) -> List[Client]:
+    @_db_operation
+    def get_k_n_short_list(self, k: int, n: int, lazy: bool = False) -> List[ClientLike]:
         if n <= 0 or k <= 0:
             return []
 
@@ -265,12 +2146,40 @@ class ClientRepDB:
             )
             rows = cur.fetchall()
 
-        return [Client(self._row_to_dict(r)) for r in rows]
+        return [self._make_client(r, lazy) for r in rows]
+
+    # b'. Страница в кратком виде: читаются только столбцы ClientShort
+    @_db_operation
+    def get_short_list(
+        self,
+        k: int,
+        n: int,
+        filters: Optional[Iterable[SqlFilter]] = None,
+    ) -> List[ClientShort]:
+        """
+        k-я страница по n клиентов (в порядке id) как ClientShort.
+        Из БД приходят только SHORT_FIELDS, объекты создаются без повторной
+        валидации — значения проверены при записи.
+        """
+        if n <= 0 or k <= 0:
+            return []
+        where, params = _build_where(filters)
+        query = (
+            sql.SQL("SELECT {} FROM clients").format(_short_columns())
+            + where
+            + sql.SQL(" ORDER BY id LIMIT %s OFFSET %s")
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(query, params + [n, (k - 1) * n])
+            rows = cur.fetchall()
+
+        return [ClientShort.from_trusted(*r) for r in rows]
 
     # c. Добавить объект в список (при добавлении сформировать новый ID)
+    @_db_operation
     def add(self, client: Client) -> int:
         # ID генерируется автоматически в БД (SERIAL)
-        with self.conn:
+        with self._commit():
             with self.conn.cursor() as cur:
                 cur.execute(
                     """
@@ -290,14 +2199,53 @@ class ClientRepDB:
                 )
                 new_id = cur.fetchone()[0]
 
+        self._invalidate_count()
         return new_id
 
+    # c'. Пакетное добавление одним INSERT ... VALUES в одной транзакции
+    @_db_operation
+    def add_many(self, clients: Iterable[Client]) -> List[int]:
+        clients = list(clients)
+        if not clients:
+            return []
+
+        rows = [
+            (
+                c.get_first_name(),
+                c.get_last_name(),
+                c.get_father_name(),
+                c.get_haircut_counter(),
+                c.get_discount(),
+            )
+            for c in clients
+        ]
+        with self._commit():
+            with self.conn.cursor() as cur:
+                # RETURNING при fetch=True отдаёт ID в порядке строк VALUES
+                result = extras.execute_values(
+                    cur,
+                    """
+                    INSERT INTO clients
+                        (first_name, last_name, father_name,
+                         haircut_counter, discount)
+                    VALUES %s
+                    RETURNING id
+                    """,
+                    rows,
+                    page_size=1000,
+                    fetch=True,
+                )
+
+        self._invalidate_count()
+        return [r[0] for r in result]
+
     # d. Заменить элемент списка по ID
+    @_db_operation
     def replace_by_id(self, client_id: int, new_client: Client) -> bool:
         if client_id < 0:
             return False
 
-        with self.conn:
+        with self._commit():
             with self.conn.cursor() as cur:
                 cur.execute(
                     """
@@ -320,14 +2268,16 @@ class ClientRepDB:
                 )
                 updated = cur.rowcount > 0
 
+        self._invalidate_count()
         return updated
 
     # e. Удалить элемент списка по ID
+    @_db_operation
     def delete_by_id(self, client_id: int) -> bool:
         if client_id < 0:
             return False
 
-        with self.conn:
+        with self._commit():
             with self.conn.cursor() as cur:
                 cur.execute(
                     "DELETE FROM clients WHERE id = %s",
@@ -335,38 +2285,358 @@ class ClientRepDB:
                 )
                 deleted = cur.rowcount > 0
 
+        self._invalidate_count()
+        return deleted
+
+    # e'. Удалить несколько элементов одним запросом
+    @_db_operation
+    def delete_many_by_ids(self, ids: Iterable[int]) -> int:
+        ids = [i for i in ids if i >= 0]
+        if not ids:
+            return 0
+
+        with self._commit():
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM clients WHERE id = ANY(%s)", (ids,))
+                deleted = cur.rowcount
+
+        self._invalidate_count()
         return deleted
 
+    # e''. Программа лояльности: одно UPDATE ... WHERE id = ANY(...)
+    @_db_operation
+    def increment_haircuts(
+        self,
+        ids: Iterable[int],
+        by: int = 1,
+        tiers: Optional[Iterable[Tuple[int, int]]] = None,
+    ) -> int:
+        """
+        Увеличивает haircut_counter клиентам ids на by одним запросом и,
+        если заданы tiers, там же пересчитывает скидку по новому значению.
+        Клиенты, для которых новое значение нарушило бы уникальность
+        (фамилия, количество стрижек), пропускаются — правило то же, что
+        у ClientRepBase._without_collisions: рекурсивный CTE идёт от свободных
+        ключей вниз по цепочке, поэтому (Иванов, 3), (Иванов, 4) сдвигается
+        целиком. Возвращает число обновлённых строк.
+        """
+        _check_increment(by)
+        ids = [i for i in set(ids) if i >= 0]
+        if not ids:
+            return 0
+
+        step = sql.Literal(by)
+        counter = sql.SQL("haircut_counter + {}").format(step)
+        assignments = [sql.SQL("haircut_counter = ") + counter]
+        if tiers is not None:
+            assignments.append(sql.SQL("discount = ") + _discount_case(_check_tiers(tiers), counter))
+        # targets — выбранные клиенты (строки блокируются), кроме делящих
+        # старый ключ с другим выбранным; movable — те, чей новый ключ свободен,
+        # или занят ровно одной строкой, которая сама сдвигается
+        query = sql.SQL(
+            """
+            WITH RECURSIVE targets AS (
+                SELECT t.id, t.last_name, t.haircut_counter
+                FROM clients AS t
+                WHERE t.id = ANY(%s)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM clients AS o
+                      WHERE o.id = ANY(%s) AND o.id <> t.id
+                        AND o.last_name = t.last_name
+                        AND o.haircut_counter = t.haircut_counter
+                  )
+                FOR UPDATE
+            ), movable AS (
+                SELECT t.id, t.last_name, t.haircut_counter
+                FROM targets AS t
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM clients AS c
+                    WHERE c.last_name = t.last_name
+                      AND c.haircut_counter = t.haircut_counter + {step}
+                )
+                UNION
+                SELECT t.id, t.last_name, t.haircut_counter
+                FROM targets AS t
+                JOIN movable AS m
+                  ON m.last_name = t.last_name
+                 AND m.haircut_counter = t.haircut_counter + {step}
+                WHERE (
+                    SELECT COUNT(*) FROM clients AS c
+                    WHERE c.last_name = t.last_name
+                      AND c.haircut_counter = t.haircut_counter + {step}
+                ) = 1
+            )
+            UPDATE clients SET {assignments}
+            WHERE id IN (SELECT id FROM movable)
+            """
+        ).format(step=step, assignments=sql.SQL(", ").join(assignments))
+
+        with self._commit():
+            with self.conn.cursor() as cur:
+                cur.execute(query, (ids, ids))
+                updated = cur.rowcount
+
+        self._invalidate_count()
+        return updated
+
+    @_db_operation
+    def recalculate_discounts(
+        self,
+        tiers: Iterable[Tuple[int, int]] = DISCOUNT_TIERS,
+        ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        """
+        Пересчёт скидки по ступеням tiers одним UPDATE (всем клиентам
+        или только ids). Строки, где скидка не меняется, не переписываются.
+        """
+        case = _discount_case(_check_tiers(tiers), sql.SQL("haircut_counter"))
+        query = sql.SQL("UPDATE clients SET discount = {case} WHERE discount IS DISTINCT FROM {case}").format(
+            case=case
+        )
+        params: list = []
+        if ids is not None:
+            ids = [i for i in ids if i >= 0]
+            if not ids:
+                return 0
+            query += sql.SQL(" AND id = ANY(%s)")
+            params.append(ids)
+
+        with self._commit():
+            with self.conn.cursor() as cur:
+                cur.execute(query, params)
+                updated = cur.rowcount
+
+        self._invalidate_count()
+        return updated
+
     # f. get_count: Получить количество элементов
-    def get_count(self) -> int:
+    @_db_operation
+    def get_count(self, filters: Optional[Iterable[SqlFilter]] = None) -> int:
+        """
+        Количество клиентов с учётом стратегии self.count_strategy.
+
+        filters — простые условия (поле, оператор, значение), которые
+        уходят в COUNT(*) ... WHERE; при индексе по полю PostgreSQL
+        считает их index-only scan'ом, не читая таблицу.
+        Стратегии counter и approx применимы только без фильтров.
+        """
+        filters = list(filters or ())
+
+        if self.count_strategy == "cached":
+            key = _filters_key(filters)
+            if key is None:
+                # Значение фильтра не приводится к ключу — считаем без кэша
+                return self._count_exact(filters)
+            now = time.monotonic()
+            cached = self._count_cache.get(key)
+            if cached is None or now - cached[1] > self.count_cache_ttl:
+                cached = (self._count_exact(filters), now)
+                self._count_cache[key] = cached
+            return cached[0]
+
+        if not filters:
+            if self.count_strategy == "counter":
+                return self._count_from_counter()
+            if self.count_strategy == "approx":
+                approx = self._count_approx()
+                if approx is not None:
+                    return approx
+
+        return self._count_exact(filters)
+
+    def _count_exact(self, filters: List[SqlFilter]) -> int:
+        where, params = _build_where(filters)
+        query = sql.SQL("SELECT COUNT(*) FROM clients") + where
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            count = cur.fetchone()[0]
+        return count
+
+    def _count_approx(self) -> Optional[int]:
+        """
+        Оценка из статистики; None, если таблица ещё не анализировалась:
+        reltuples = -1 (PostgreSQL 14+) или 0 при relpages = 0 (до 14).
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT reltuples, relpages FROM pg_class "
+                "WHERE oid = 'clients'::regclass"
+            )
+            row = cur.fetchone()
+        if row is None or row[0] < 0 or row[1] == 0:
+            return None
+        return int(row[0])
+
+    def _count_from_counter(self) -> int:
+        """Таблицу clients_count создаёт initialize_database(counter=True)."""
         with self.conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) FROM clients")
+            cur.execute("SELECT n FROM clients_count")
             count = cur.fetchone()[0]
         return count
 
+    def _invalidate_count(self) -> None:
+        self._count_cache.clear()
+
+    def ensure_change_notifications(self) -> None:
+        """
+        Триггеры, публикующие каждое изменение clients через NOTIFY
+        (см. ClientChangeListener). Полезная нагрузка — JSON с операцией,
+        id и, для INSERT/UPDATE, всей строкой, чтобы слушателям
+        не приходилось перечитывать её из БД.
+        """
+        with self._commit():
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    CREATE OR REPLACE FUNCTION clients_notify_trg()
+                    RETURNS trigger AS $$
+                    BEGIN
+                        IF TG_OP = 'TRUNCATE' THEN
+                            PERFORM pg_notify('clients_changes',
+                                json_build_object('op', TG_OP)::text);
+                        ELSIF TG_OP = 'DELETE' THEN
+                            PERFORM pg_notify('clients_changes',
+                                json_build_object('op', TG_OP, 'id', OLD.id)::text);
+                        ELSE
+                            PERFORM pg_notify('clients_changes',
+                                json_build_object('op', TG_OP, 'id', NEW.id,
+                                                  'row', row_to_json(NEW))::text);
+                        END IF;
+                        RETURN NULL;
+                    END
+                    $$ LANGUAGE plpgsql;
+
+                    DROP TRIGGER IF EXISTS clients_notify_rows ON clients;
+                    CREATE TRIGGER clients_notify_rows
+                        AFTER INSERT OR UPDATE OR DELETE ON clients
+                        FOR EACH ROW EXECUTE FUNCTION clients_notify_trg();
+
+                    DROP TRIGGER IF EXISTS clients_notify_truncate ON clients;
+                    CREATE TRIGGER clients_notify_truncate
+                        AFTER TRUNCATE ON clients
+                        FOR EACH STATEMENT EXECUTE FUNCTION clients_notify_trg();
+                    """
+                )
+
     def close(self) -> None:
-        """Закрываем соединение через одиночку."""
+        """Закрываем соединение через одиночку и соединения обходов потока."""
+        for idle in getattr(self._local, "stream_connections", {}).values():
+            while idle:
+                idle.pop().close()
         self.db.close()
 
-    def get_all(self) -> List[Client]:
-        with self.conn.cursor() as cur:
-            cur.execute(
+    @_db_operation
+    def get_all(
+        self,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        lazy: bool = False,
+    ) -> List[ClientLike]:
+        where, params = _build_where(filters)
+        query = (
+            sql.SQL(
                 """
                 SELECT id, first_name, last_name, father_name,
                        haircut_counter, discount
                 FROM clients
-                ORDER BY id
                 """
             )
+            + where
+            + sql.SQL(" ORDER BY id")
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
             rows = cur.fetchall()
 
-        return [Client(self._row_to_dict(r)) for r in rows]
+        return [self._make_client(r, lazy) for r in rows]
+
+    def iter_all(
+        self,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        batch_size: int = 2000,
+        lazy: bool = False,
+    ) -> Iterator[ClientLike]:
+        """
+        Потоковый обход клиентов через серверный (именованный) курсор:
+        в памяти одновременно не больше batch_size строк.
+        """
+        columns = sql.SQL("id, first_name, last_name, father_name, haircut_counter, discount")
+        for row in self._stream(columns, filters, batch_size):
+            yield self._make_client(row, lazy)
+
+    def iter_short(
+        self,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        batch_size: int = 2000,
+    ) -> Iterator[ClientShort]:
+        """Потоковый обход в кратком виде: из БД читаются только SHORT_FIELDS."""
+        for row in self._stream(_short_columns(), filters, batch_size, "iter_short"):
+            yield ClientShort.from_trusted(*row)
+
+    def _stream(
+        self,
+        columns: sql.Composable,
+        filters: Optional[Iterable[SqlFilter]],
+        batch_size: int,
+        operation: str = "iter_all",
+    ) -> Iterator[Tuple[Any, ...]]:
+        where, params = _build_where(filters)
+        query = (
+            sql.SQL("SELECT {} FROM clients").format(columns)
+            + where
+            + sql.SQL(" ORDER BY id")
+        )
+        name = f"clients_iter_{next(self._cursor_ids)}"
+        # Обход идёт на соединении обходов потока (_stream_connection): серверный
+        # курсор живёт до конца транзакции, а коммит любой другой операции на
+        # общем соединении (в этом или другом потоке, между yield) закрыл бы её.
+        # Повторы к потоковому обходу не применяются, таймауты и дедлайн — да:
+        # deadline_ms ограничивает весь обход, включая время потребителя.
+        policy = self._current_policy()
+        deadline = time.monotonic() + policy.deadline_ms / 1000 if policy.deadline_ms is not None else None
+        cancel = _CancelTimer(deadline)
+        replica = self.replicas.acquire() if self._routes_to_replica("get_all") else None
+        target = replica or self.db
+        try:
+            with self._stream_connection(target) as conn:
+                # Соединение принадлежит только обходу — отмена не заденет чужие запросы
+                cancel.start(conn)
+                # Фабрика курсоров — как у общего соединения (её подменяет, например,
+                # QueryPlanChecker.watch), чтобы обход проверялся наравне с остальными
+                conn.cursor_factory = self.db.get_connection().cursor_factory
+                with conn:
+                    with conn.cursor() as cur:
+                        _set_local_timeouts(cur, self._current_policy())
+                    with conn.cursor(name=name) as cur:
+                        cur.itersize = batch_size
+                        cur.execute(query, params)
+                        for row in cur:
+                            if deadline is not None and time.monotonic() >= deadline:
+                                self.metrics.count("deadlines_exceeded")
+                                raise DeadlineExceededError(operation, f"дедлайн {policy.deadline_ms} мс истёк")
+                            yield row
+        except psycopg2.Error as exc:
+            if cancel.stop():
+                self.metrics.count("deadlines_exceeded")
+                raise DeadlineExceededError(
+                    operation, f"запрос отменён по дедлайну {policy.deadline_ms} мс"
+                ) from exc
+            if getattr(exc, "pgcode", None) == QUERY_CANCELED:
+                self.metrics.count("statement_timeouts")
+                raise StatementTimeoutError(
+                    operation, f"statement_timeout {policy.statement_timeout_ms} мс"
+                ) from exc
+            raise
+        finally:
+            cancel.stop()
+            if replica is not None:
+                self.replicas.release(replica)
 
     def print_all(self) -> None:
         """Красивый вывод клиентов из БД."""
-        clients = self.get_all()
+        clients = self.iter_all()
+        first = next(clients, None)
 
-        if not clients:
+        if first is None:
             print("Список клиентов пуст.")
             return
 
@@ -377,7 +2647,7 @@ class ClientRepDB:
         )
         print("-" * 60)
 
-        for client in clients:
+        for client in itertools.chain((first,), clients):
             print(
                 f"{client.get_id():<4} "
                 f"{client.get_last_name():<15} "
@@ -388,17 +2658,18 @@ class ClientRepDB:
             )
         print("=" * 60)
 
+    @_db_operation
     def clear_all(self) -> bool:
-        """Очистить таблицу clients."""
-        try:
-            with self.conn:
-                with self.conn.cursor() as cur:
-                    cur.execute("TRUNCATE TABLE clients RESTART IDENTITY CASCADE;")
-                    print("Таблица clients очищена.")
-                    return True
-        except Exception as exc:  # noqa: BLE001
-            print(f"Ошибка при очистке таблицы: {exc}")
-            return False
+        """
+        Очистить таблицу clients. Ошибки, как и у остальных операций,
+        обрабатывает QueryPolicy (повторы, типизированные DBOperationError).
+        """
+        with self._commit():
+            with self.conn.cursor() as cur:
+                cur.execute("TRUNCATE TABLE clients RESTART IDENTITY CASCADE;")
+        print("Таблица clients очищена.")
+        self._invalidate_count()
+        return True
 
 
 class ClientRepDBAdapter(ClientRepBase):
@@ -407,21 +2678,124 @@ class ClientRepDBAdapter(ClientRepBase):
     def __init__(self, db_repo: ClientRepDB) -> None:
         # сохраняем "адаптируемый" объект, чтобы read_all уже мог к нему обращаться
         self.db_repo = db_repo
+        # Если подключён слушатель NOTIFY, items обновляются по изменениям,
+        # а не полным перечитыванием таблицы
+        self.listener: Optional[ClientChangeListener] = None
+        # id -> позиция в items для точечного применения изменений; строится лениво
+        self._positions: Optional[Dict[int, int]] = None
         # file_path фиктивный, в БД он не используется
         super().__init__(file_path=":db:")
 
+    @property
+    def items(self) -> List[Client]:
+        return self._items
+
+    @items.setter
+    def items(self, clients: List[Client]) -> None:
+        ClientRepBase.items.fset(self, clients)
+        self._positions = None
+
+    def _id_positions(self) -> Dict[int, int]:
+        if self._positions is None:
+            self._positions = {c.get_id(): i for i, c in enumerate(self.items)}
+        return self._positions
+
     # Переопределение чтения и записи
+    @_writes
     def read_all(self) -> None:
-        """Загрузка всех клиентов из БД в self.items для совместимости."""
-        clients = self.db_repo.get_all()
+        """
+        Загрузка всех клиентов из БД в self.items для совместимости.
+        Снимок берётся с primary: по нему проверяется уникальность
+        перед записью, отставшая реплика здесь не годится.
+        """
+        with self.db_repo.primary():
+            clients = self.db_repo.get_all()
         self.items = clients[:]
 
+    def _refresh(self) -> None:
+        """Полное перечитывание нужно, только если items не ведёт слушатель."""
+        if self.listener is None:
+            self.read_all()
+
+    # Согласованность между узлами через LISTEN/NOTIFY
+    def attach_listener(self, listener: ClientChangeListener) -> None:
+        """
+        Подписывает адаптер на изменения таблицы: чужие записи применяются
+        к self.items точечно, без полного read_all после каждой операции.
+        """
+        self.db_repo.ensure_change_notifications()
+        listener.add_handler(self.apply_change)
+        listener.add_handler(lambda op, client_id, row: self.db_repo._invalidate_count())
+        listener.start()
+        self.listener = listener
+        # Базовый снимок берётся уже после LISTEN, чтобы не пропустить изменения
+        self.read_all()
+
+    @_writes
+    def apply_change(self, op: str, client_id: Optional[int], row: Optional[dict]) -> None:
+        if op in ("INSERT", "UPDATE"):
+            self._upsert_local(Client(row))
+        elif op == "DELETE":
+            self._remove_local(client_id)
+        elif op == "TRUNCATE":
+            self.items = []
+        elif op == "RESYNC":
+            self.read_all()
+
+    # Точечные изменения items (вызываются под блокировкой записи):
+    # вставка и замена — O(1) по индексу позиций, удаление сдвигает только хвост
+    def _upsert_local(self, client: Client) -> None:
+        positions = self._id_positions()
+        items = self._mutable_items()
+        pos = positions.get(client.get_id())
+        if pos is None:
+            positions[client.get_id()] = len(items)
+            items.append(client)
+        else:
+            self._index_removed(items[pos])
+            items[pos] = client
+        self._index_added(client)
+
+    def _remove_local(self, client_id: int) -> None:
+        positions = self._id_positions()
+        pos = positions.pop(client_id, None)
+        if pos is None:
+            return
+        items = self._mutable_items()
+        self._index_removed(items.pop(pos))
+        for i in range(pos, len(items)):
+            positions[items[i].get_id()] = i
+
+    @_writes
     def write_all(self, file_name: Optional[str] = None) -> None:
-        """Синхронизировать self.items с БД (простой вариант: очистить и залить)."""
-        self.db_repo.clear_all()
-        for client in self.items:
-            new_id = self.db_repo.add(client)
-            client.set_id(new_id)
+        """
+        Синхронизировать self.items с БД по разнице: строки, которым в items
+        есть равный клиент, остаются (клиент получает их ID), лишние строки
+        удаляются одним запросом, недостающие клиенты добавляются пачкой.
+        """
+        def sync() -> None:
+            # Чтение и запись разницы — одна транзакция на primary;
+            # при повторе разница считается заново
+            pending: Dict[Client, List[Client]] = {}
+            for client in self.items:
+                pending.setdefault(client, []).append(client)
+
+            stale: List[int] = []
+            for stored in self.db_repo.get_all(lazy=True):
+                same = pending.get(stored)
+                if same:
+                    same.pop().set_id(stored.get_id())
+                else:
+                    stale.append(stored.get_id())
+
+            self.db_repo.delete_many_by_ids(stale)
+            fresh = [c for group in pending.values() for c in group]
+            for client, new_id in zip(fresh, self.db_repo.add_many(fresh)):
+                client.set_id(new_id)
+
+        self.db_repo.run_in_transaction("write_all", sync)
+        # ID клиентов в items могли измениться — индекс позиций строится заново
+        self._positions = None
 
     def _load_from_storage(self) -> List[dict]:
         return []
@@ -437,36 +2811,157 @@ class ClientRepDBAdapter(ClientRepBase):
     def get_by_id(self, client_id: int) -> Optional[Client]:
         return self.db_repo.get_by_id(client_id)
 
-    def get_k_n_short_list(self, k: int, n: int) -> List[Client]:
-        return self.db_repo.get_k_n_short_list(k, n)
+    def get_many_by_ids(self, ids: Iterable[int]) -> Tuple[List[Client], List[int]]:
+        return self.db_repo.get_many_by_ids(ids)
+
+    def get_k_n_short_list(self, k: int, n: int, lazy: bool = False) -> List[ClientLike]:
+        return self.db_repo.get_k_n_short_list(k, n, lazy=lazy)
+
+    def get_short_list(self, k: int, n: int) -> List[ClientShort]:
+        return self.db_repo.get_short_list(k, n)
+
+    def iter_short(self) -> Iterator[ClientShort]:
+        return self.db_repo.iter_short()
+
+    def top_k(
+        self,
+        field: str,
+        k: int,
+        reverse: bool = False,
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+        filters: Optional[Iterable[SqlFilter]] = None,
+    ) -> List[Client]:
+        if filter_fn is None:
+            return self.db_repo.top_k(field, k, reverse, filters=filters)
+        # Произвольный предикат в SQL не переносится: простые условия
+        # отбираем в БД, остальное — кучей над потоком строк
+        if k <= 0:
+            return []
+        clients = (c for c in self.db_repo.iter_all(filters=filters) if filter_fn(c))
+        select_k = heapq.nlargest if reverse else heapq.nsmallest
+        return select_k(k, clients, key=_field_getter(field))
+
+    def fuzzy_search(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = 0.3,
+    ) -> List[Tuple[Client, float]]:
+        return self.db_repo.fuzzy_search(query, limit, min_similarity)
 
+    @_writes
     def add(self, client: Client) -> int:
-        self.read_all()
+        self._refresh()
         if not self._is_unique(client):
             return -1
         new_id = self.db_repo.add(client)
         client.set_id(new_id)
-        self.read_all()
+        if self.listener is None:
+            self.read_all()
+        else:
+            self._upsert_local(client)
         return new_id
 
+    @_writes
+    def add_many(self, clients: Iterable[Client]) -> List[Optional[int]]:
+        self._refresh()
+        taken = {key for key, count in self._uniqueness_index().items() if count > 0}
+        fresh: List[Optional[Client]] = []
+        for client in clients:
+            key = _unique_key(client)
+            if key in taken:
+                fresh.append(None)
+                continue
+            taken.add(key)
+            fresh.append(client)
+
+        new_ids = iter(self.db_repo.add_many(c for c in fresh if c is not None))
+        ids: List[Optional[int]] = []
+        for client in fresh:
+            if client is None:
+                ids.append(None)
+                continue
+            new_id = next(new_ids)
+            client.set_id(new_id)
+            ids.append(new_id)
+            if self.listener is not None:
+                self._upsert_local(client)
+        self._refresh()
+        return ids
+
+    @_writes
     def replace_by_id(self, client_id: int, new_client: Client) -> bool:
-        self.read_all()
+        self._refresh()
         if not self._is_unique(new_client):
             return False
         ok = self.db_repo.replace_by_id(client_id, new_client)
-        self.read_all()
+        if self.listener is None:
+            self.read_all()
+        elif ok:
+            new_client.set_id(client_id)
+            self._upsert_local(new_client)
         return ok
 
+    @_writes
     def delete_by_id(self, client_id: int) -> bool:
         ok = self.db_repo.delete_by_id(client_id)
-        self.read_all()
+        if self.listener is None:
+            self.read_all()
+        elif ok:
+            self._remove_local(client_id)
         return ok
 
-    def get_count(self) -> int:
-        return self.db_repo.get_count()
+    @_writes
+    def increment_haircuts(
+        self,
+        ids: Iterable[int],
+        by: int = 1,
+        tiers: Optional[Iterable[Tuple[int, int]]] = None,
+    ) -> int:
+        self._refresh()
+        wanted = set(ids)
+        targets = self._without_collisions([c for c in self.items if c.get_id() in wanted], by)
+        target_ids = [c.get_id() for c in targets]
+        updated = self.db_repo.increment_haircuts(target_ids, by=by, tiers=tiers)
+        self._sync_updated(target_ids)
+        return updated
+
+    @_writes
+    def recalculate_discounts(
+        self,
+        tiers: Iterable[Tuple[int, int]] = DISCOUNT_TIERS,
+        ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        ids = list(ids) if ids is not None else None
+        updated = self.db_repo.recalculate_discounts(tiers=tiers, ids=ids)
+        if self.listener is None or ids is None:
+            self.read_all()
+        else:
+            self._sync_updated(ids)
+        return updated
+
+    def _sync_updated(self, ids: List[int]) -> None:
+        """Подтянуть изменённые строки: полным read_all или точечно при слушателе."""
+        if self.listener is None:
+            self.read_all()
+            return
+        found, _ = self.db_repo.get_many_by_ids(ids)
+        for client in found:
+            self._upsert_local(client)
+
+    @_writes
+    def sort_by(self, param: str = "last_name") -> None:
+        super().sort_by(param)
+        self._positions = None
+
+    def get_count(self, filters: Optional[Iterable[SqlFilter]] = None) -> int:
+        return self.db_repo.get_count(filters=filters)
+
+    def iter_all(self) -> Iterator[Client]:
+        return self.db_repo.iter_all()
 
     def print_all(self) -> None:
-        self.read_all()
+        self._refresh()
         super().print_all()
 
 
@@ -475,7 +2970,11 @@ class ClientRepDBDecorator:
     Декоратор для ClientRepDB.
 
     Добавляет возможность передавать filter_fn и sort_key
-    в методы get_k_n_short_list и get_count.
+    в методы get_k_n_short_list, get_short_list и get_count,
+    а filter_fn — в get_many_by_ids.
+
+    filter_fn и sort_key получают Client; только при явном lazy=True —
+    ClientView (те же геттеры, сеттеры создают настоящий Client).
     """
 
     def __init__(self, wrapped: ClientRepDB) -> None:
@@ -488,46 +2987,83 @@ class ClientRepDBDecorator:
         filter_fn: Optional[Callable[[Client], bool]] = None,
         sort_key: Optional[Callable[[Client], Any]] = None,
         reverse: bool = False,
-    ) -> List[Client]:
+        lazy: bool = False,
+    ) -> List[ClientLike]:
         """
-        Расширенный вариант пагинации:
+        Расширенный вариант пагинации
+        (lazy=True — ленивые ClientView вместо полностью провалидированных Client):
 
-        1. Берём всех клиентов из БД (get_all)
-        2. Применяем filter_fn, если передан
-        3. Сортируем по sort_key, если передан
-        4. Возвращаем k-ю страницу по n элементов
+        1. Без filter_fn и sort_key страница читается в БД (LIMIT/OFFSET)
+        2. Иначе читаем клиентов из БД потоком (iter_all)
+        3. Применяем filter_fn, если передан
+        4. Отбираем первые k*n по sort_key, если передан
+        5. Возвращаем k-ю страницу по n элементов
         """
         if n <= 0 or k <= 0:
             return []
+        if filter_fn is None and sort_key is None:
+            return self._wrapped.get_k_n_short_list(k, n, lazy=lazy)
 
-        clients = self._wrapped.get_all()
-
-        if filter_fn is not None:
-            clients = [c for c in clients if filter_fn(c)]
-
-        if sort_key is not None:
-            clients.sort(key=sort_key, reverse=reverse)
+        clients = self._wrapped.iter_all(lazy=lazy)
+        return _select_page(clients, k, n, filter_fn, sort_key, reverse)
 
-        start = (k - 1) * n
-        end = start + n
-        return clients[start:end]
+    def get_short_list(
+        self,
+        k: int,
+        n: int,
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+        sort_key: Optional[Callable[[Client], Any]] = None,
+        reverse: bool = False,
+        lazy: bool = False,
+    ) -> List[ClientShort]:
+        """
+        Страница в кратком виде. Без filter_fn и sort_key из БД читаются
+        только столбцы ClientShort; иначе фильтр и сортировка работают
+        по клиентам (по ClientView при lazy=True), и в краткий вид
+        переводится только страница.
+        """
+        if filter_fn is None and sort_key is None:
+            return self._wrapped.get_short_list(k, n)
+        page = self.get_k_n_short_list(k, n, filter_fn, sort_key, reverse, lazy=lazy)
+        return [c.to_short_version() for c in page]
 
     def get_count(
         self,
         filter_fn: Optional[Callable[[Client], bool]] = None,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        lazy: bool = False,
     ) -> int:
         """
         Расширенный get_count с фильтром.
 
+        - filters (поле, оператор, значение) считаются на стороне БД
+          через COUNT(*) ... WHERE
         - если filter_fn не задан — делегируем в ClientRepDB.get_count()
-        - если задан — считаем только тех клиентов, кто прошёл фильтр
+        - если задан — из БД берутся только строки, прошедшие filters,
+          и среди них считаем тех, кто прошёл filter_fn;
+          lazy=True передаёт в filter_fn ClientView без валидации строк
         """
         if filter_fn is None:
-            return self._wrapped.get_count()
+            return self._wrapped.get_count(filters=filters)
 
-        clients = self._wrapped.get_all()
+        clients = self._wrapped.get_all(filters=filters, lazy=lazy)
         return sum(1 for c in clients if filter_fn(c))
 
+    def get_many_by_ids(
+        self,
+        ids: Iterable[int],
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+    ) -> Tuple[List[Client], List[int]]:
+        """
+        Несколько клиентов одним запросом (ClientRepDB.get_many_by_ids).
+        Клиенты, не прошедшие filter_fn, не попадают в результат,
+        но и отсутствующими не считаются.
+        """
+        found, missing = self._wrapped.get_many_by_ids(ids)
+        if filter_fn is not None:
+            found = [c for c in found if filter_fn(c)]
+        return found, missing
+
     def __getattr__(self, name: str) -> Any:
         """
         Все остальные методы/атрибуты делегируем обёрнутому ClientRepDB.
@@ -543,7 +3079,8 @@ class ClientRepFileDecorator:
     Декоратор для репозиториев, работающих с файлами (ClientRepBase и его наследники).
 
     Добавляет возможность передачи filter_fn и sort_key
-    в методы get_k_n_short_list и get_count.
+    в методы get_k_n_short_list, get_short_list и get_count,
+    а filter_fn — в get_many_by_ids.
     """
 
     def __init__(self, wrapped: ClientRepBase) -> None:
@@ -561,26 +3098,37 @@ class ClientRepFileDecorator:
         Расширенная пагинация для файлового репозитория.
 
         1. Обновляем items из файла (read_all)
-        2. Берём список клиентов
-        3. Применяем фильтр (если задан)
-        4. Применяем сортировку (если задана)
-        5. Возвращаем k-ю страницу по n элементов
+        2. Лениво применяем фильтр (если задан)
+        3. Без сортировки — останавливаемся, как только набрана k-я страница;
+           с сортировкой — отбираем только первые k*n элементов
+        4. Возвращаем k-ю страницу по n элементов
         """
         if n <= 0 or k <= 0:
             return []
 
         self._wrapped.read_all()
-        clients = list(self._wrapped.items)
-
-        if filter_fn is not None:
-            clients = [c for c in clients if filter_fn(c)]
-
-        if sort_key is not None:
-            clients.sort(key=sort_key, reverse=reverse)
+        # Фильтр и сортировка — под блокировкой чтения обёрнутого репозитория
+        with self._wrapped._read_locked():
+            clients = self._wrapped.iter_all()
+            return _select_page(clients, k, n, filter_fn, sort_key, reverse)
 
-        start = (k - 1) * n
-        end = start + n
-        return clients[start:end]
+    def get_short_list(
+        self,
+        k: int,
+        n: int,
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+        sort_key: Optional[Callable[[Client], Any]] = None,
+        reverse: bool = False,
+    ) -> List[ClientShort]:
+        """
+        Страница в кратком виде. Без filter_fn и sort_key — get_short_list
+        обёрнутого репозитория (SQLite и bounded читают только нужные поля).
+        """
+        if filter_fn is None and sort_key is None:
+            self._wrapped.read_all()
+            return self._wrapped.get_short_list(k, n)
+        page = self.get_k_n_short_list(k, n, filter_fn, sort_key, reverse)
+        return [c.to_short_version() for c in page]
 
     def get_count(
         self,
@@ -597,7 +3145,24 @@ class ClientRepFileDecorator:
         if filter_fn is None:
             return self._wrapped.get_count()
 
-        return sum(1 for c in self._wrapped.items if filter_fn(c))
+        with self._wrapped._read_locked():
+            return sum(1 for c in self._wrapped.iter_all() if filter_fn(c))
+
+    def get_many_by_ids(
+        self,
+        ids: Iterable[int],
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+    ) -> Tuple[List[Client], List[int]]:
+        """
+        Несколько клиентов за один проход по актуальному файлу.
+        Клиенты, не прошедшие filter_fn, не попадают в результат,
+        но и отсутствующими не считаются.
+        """
+        self._wrapped.read_all()
+        found, missing = self._wrapped.get_many_by_ids(ids)
+        if filter_fn is not None:
+            found = [c for c in found if filter_fn(c)]
+        return found, missing
 
     def __getattr__(self, name: str) -> Any:
         """
@@ -616,18 +3181,28 @@ POSTGRES_PORT = 5432
 TARGET_DB = "hair_salon"
 
 
-def ensure_database_exists() -> None:
-    """
-    Подключаемся к postgres и убеждаемся, что база hair_salon существует.
-    Если нет — создаём.
-    """
-    conn = psycopg2.connect(
-        dbname="postgres",
+# Схема (и счётчик строк) уже проверены в этом процессе — повторные
+# initialize_database не открывают соединений.
+_schema_ready = False
+_counter_ready = False
+
+
+def _connect(dbname: str):
+    return psycopg2.connect(
+        dbname=dbname,
         user=POSTGRES_USER,
         password=POSTGRES_PASSWORD,
         host=POSTGRES_HOST,
         port=POSTGRES_PORT,
     )
+
+
+def ensure_database_exists() -> None:
+    """
+    Подключаемся к postgres и убеждаемся, что база hair_salon существует.
+    Если нет — создаём.
+    """
+    conn = _connect("postgres")
     conn.autocommit = True
 
     with conn.cursor() as cur:
@@ -643,18 +3218,117 @@ def ensure_database_exists() -> None:
     conn.close()
 
 
-def ensure_clients_table() -> None:
+# Индексы таблицы clients под пути доступа ClientRepDB: сортировки и top_k
+# по полям, фильтры get_count / get_all и проверка уникальности
+# (фамилия, количество стрижек). Имя индекса -> столбцы.
+# Поиск и сортировка по одной фамилии идут по префиксу
+# clients_last_name_haircut_idx, отдельный индекс по last_name не нужен.
+CLIENT_INDEXES: Dict[str, Tuple[str, ...]] = {
+    "clients_haircut_counter_idx": ("haircut_counter",),
+    "clients_discount_idx": ("discount",),
+    "clients_last_name_haircut_idx": ("last_name", "haircut_counter"),
+}
+
+# Индексы прежних версий схемы, которые дублируют CLIENT_INDEXES
+OBSOLETE_CLIENT_INDEXES = ("clients_last_name_idx",)
+
+
+def ensure_clients_indexes(cur: Any) -> None:
     """
-    Создаёт таблицу clients, если её нет.
-    Если таблица пустая — сразу вставляет клиента по умолчанию.
+    Создаёт недостающие индексы CLIENT_INDEXES и удаляет
+    OBSOLETE_CLIENT_INDEXES (повторный вызов ничего не делает).
     """
-    conn = psycopg2.connect(
-        dbname=TARGET_DB,
-        user=POSTGRES_USER,
-        password=POSTGRES_PASSWORD,
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
+    for name in OBSOLETE_CLIENT_INDEXES:
+        cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(name)))
+    for name, columns in CLIENT_INDEXES.items():
+        cur.execute(
+            sql.SQL("CREATE INDEX IF NOT EXISTS {} ON clients ({})").format(
+                sql.Identifier(name),
+                sql.SQL(", ").join(map(sql.Identifier, columns)),
+            )
+        )
+
+
+# GIN-индексы триграмм (pg_trgm) для ClientRepDB.fuzzy_search:
+# имя индекса -> индексируемое выражение
+TRIGRAM_INDEXES: Dict[str, str] = {
+    "clients_last_name_trgm_idx": "last_name",
+    "clients_first_name_trgm_idx": "first_name",
+    "clients_father_name_trgm_idx": "father_name",
+    "clients_full_name_trgm_idx": "(last_name || ' ' || first_name || ' ' || father_name)",
+}
+
+
+def ensure_trigram_indexes(cur: Any) -> None:
+    """Подключает pg_trgm и создаёт недостающие индексы TRIGRAM_INDEXES."""
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, expression in TRIGRAM_INDEXES.items():
+        cur.execute(
+            sql.SQL("CREATE INDEX IF NOT EXISTS {} ON clients USING GIN (({}) gin_trgm_ops)").format(
+                sql.Identifier(name), sql.SQL(expression),
+            )
+        )
+
+
+def ensure_clients_counter(cur: Any) -> None:
+    """
+    Создаёт таблицу clients_count и триггеры, которые поддерживают в ней
+    точное количество строк clients (стратегия подсчёта "counter").
+    Начальное значение заполняется под блокировкой, чтобы не потерять
+    параллельные вставки. Триггеры обновляют одну строку при каждой
+    вставке и удалении, поэтому счётчик создаётся только по запросу.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS clients_count (
+            one BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (one),
+            n   BIGINT  NOT NULL
+        );
+
+        CREATE OR REPLACE FUNCTION clients_count_trg()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE clients_count SET n = n + 1;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE clients_count SET n = n - 1;
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                UPDATE clients_count SET n = 0;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        LOCK TABLE clients IN SHARE ROW EXCLUSIVE MODE;
+
+        DROP TRIGGER IF EXISTS clients_count_rows ON clients;
+        CREATE TRIGGER clients_count_rows
+            AFTER INSERT OR DELETE ON clients
+            FOR EACH ROW EXECUTE FUNCTION clients_count_trg();
+
+        DROP TRIGGER IF EXISTS clients_count_truncate ON clients;
+        CREATE TRIGGER clients_count_truncate
+            AFTER TRUNCATE ON clients
+            FOR EACH STATEMENT EXECUTE FUNCTION clients_count_trg();
+
+        INSERT INTO clients_count (one, n)
+        SELECT TRUE, COUNT(*) FROM clients
+        ON CONFLICT (one) DO UPDATE SET n = EXCLUDED.n;
+        """
     )
+
+
+def ensure_clients_table(conn: Any = None, counter: bool = False) -> None:
+    """
+    Создаёт таблицу clients и её индексы (CLIENT_INDEXES и триграммные
+    TRIGRAM_INDEXES для fuzzy_search), если их нет; counter=True — ещё
+    и счётчик строк для стратегии "counter" (ensure_clients_counter).
+    Если таблица пустая — сразу вставляет клиента по умолчанию.
+    Переданное соединение conn используется и не закрывается.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = _connect(TARGET_DB)
     with conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -669,11 +3343,15 @@ def ensure_clients_table() -> None:
                 );
                 """
             )
+            ensure_clients_indexes(cur)
+            ensure_trigram_indexes(cur)
+            if counter:
+                ensure_clients_counter(cur)
 
-            cur.execute("SELECT COUNT(*) FROM clients;")
-            count = cur.fetchone()[0]
+            cur.execute("SELECT EXISTS (SELECT 1 FROM clients);")
+            has_rows = cur.fetchone()[0]
 
-            if count == 0:
+            if not has_rows:
                 print("Добавляю клиента по умолчанию...")
                 cur.execute(
                     """
@@ -686,13 +3364,34 @@ def ensure_clients_table() -> None:
                     ("Иван", "Иванов", "Иванович", 4, 10),
                 )
 
-    conn.close()
+    if own_conn:
+        conn.close()
     print("Таблица clients готова.")
 
 
-def initialize_database() -> None:
-    ensure_database_exists()
-    ensure_clients_table()
+def initialize_database(force: bool = False, counter: bool = False) -> None:
+    """
+    Готовит БД и таблицу за одно подключение: сразу идём в hair_salon,
+    и только если базы нет — создаём её через служебную БД postgres.
+    counter=True — нужен ClientRepDB(count_strategy="counter").
+    Результат кэшируется на процесс (force=True — проверить заново).
+    """
+    global _schema_ready, _counter_ready
+    if _schema_ready and (_counter_ready or not counter) and not force:
+        return
+
+    try:
+        conn = _connect(TARGET_DB)
+    except psycopg2.OperationalError:
+        ensure_database_exists()
+        conn = _connect(TARGET_DB)
+
+    try:
+        ensure_clients_table(conn, counter=counter)
+    finally:
+        conn.close()
+    _schema_ready = True
+    _counter_ready = _counter_ready or counter
 
 
 if __name__ == "__main__":
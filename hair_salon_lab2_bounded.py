@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import os
+import weakref
+
+from hair_salon_lab1_task9 import Client, ClientShort
+from hair_salon_lab2 import (
+    DISCOUNT_TIERS,
+    SORT_KEYS,
+    ClientRepBase,
+    DiscountTiers,
+    _check_tiers,
+    _reads,
+    _writes,
+    discount_for,
+)
+from hair_salon_lab2_export import export_clients
+
+
+# Запись индекса: [смещение, длина, фамилия, количество стрижек]
+IndexEntry = List[Any]
+
+# Расширение файла выгрузки -> формат export_clients (остальные — JSONL)
+EXPORT_BY_EXTENSION = {".json": "json", ".csv": "csv"}
+
+
+class _JournalFiles:
+    """Открытые файлы журнала: отдельно от репозитория, чтобы их мог закрыть weakref.finalize."""
+
+    def __init__(self) -> None:
+        self.reader: Optional[BinaryIO] = None
+        self.writer: Optional[BinaryIO] = None
+
+    def close(self) -> None:
+        for f in (self.writer, self.reader):
+            if f is not None:
+                f.close()
+        self.writer = None
+        self.reader = None
+
+
+class ClientRepBounded(ClientRepBase):
+    """
+    Репозиторий с ограниченным объёмом памяти.
+
+    Данные хранятся в JSONL-журнале (по записи на строку, изменения
+    дописываются в конец, удаление — строкой-надгробием). В памяти живут:
+    индекс id -> смещение строки (он же сохраняется на диск рядом с журналом)
+    и не более max_resident объектов Client в LRU-кэше. Клиенты читаются
+    с диска по требованию. Каждое изменение сразу дописывается в журнал
+    и сбрасывается в файл (_persist), поэтому кэш ничего не держит
+    незаписанным, а вытесняемые записи просто забываются. Индекс
+    сохраняется в flush() / close(); после сбоя он дочитывается по журналу.
+    Незакрытый репозиторий при сборке мусора (и при выходе) закрывает
+    свои файлы, а индекс тогда восстанавливается по журналу при открытии.
+
+    items собирает всех клиентов в список и нужен лишь для совместимости —
+    для больших баз используйте get_by_id, get_k_n_short_list и iter_all.
+    """
+
+    # fuzzy_search: в индексе только ФИО, найденные клиенты читаются по ID
+    _fuzzy_keep_clients = False
+    # Чтение двигает LRU-кэш и позицию общего файла журнала — только монопольно
+    _shared_reads = False
+
+    def __init__(
+        self,
+        file_path: str = "clients.jsonl",
+        max_resident: int = 10000,
+        index_path: Optional[str] = None,
+    ) -> None:
+        if max_resident <= 0:
+            raise ValueError("max_resident должен быть положительным")
+        self.max_resident = max_resident
+        self.index_path = index_path or file_path + ".idx"
+        self._opened = False
+        self._index: Dict[int, IndexEntry] = {}
+        self._cache: "OrderedDict[int, Client]" = OrderedDict()
+        self._order: Optional[List[int]] = None
+        self._max_id = 0
+        self._files = _JournalFiles()
+        weakref.finalize(self, self._files.close)
+        super().__init__(file_path)
+
+    # Совместимость с ClientRepBase
+    @property
+    def items(self) -> List[Client]:
+        return list(self.iter_all())
+
+    @items.setter
+    def items(self, clients: List[Client]) -> None:
+        self._unique_keys = None
+        self._fuzzy_index = None
+        if not self._opened:
+            return
+        self._replace_all(clients)
+
+    # a. Чтение: загрузка индекса (или его восстановление по журналу)
+    @_writes
+    def read_all(self) -> None:
+        if self._opened:
+            self.flush()
+        self._close_files()
+        self._cache.clear()
+        self._order = None
+        self._index, scanned_from = self._load_index()
+        if os.path.exists(self.file_path):
+            self._scan(scanned_from)
+        self._max_id = max(self._index, default=0)
+        self._unique_keys = None
+        self._fuzzy_index = None
+        self.load_errors = []
+        self._opened = True
+
+    def _load_index(self) -> Tuple[Dict[int, IndexEntry], int]:
+        """Индекс с диска и позиция журнала, до которой он актуален."""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.file_path)):
+            return {}, 0
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("size", 0) > os.path.getsize(self.file_path):
+            # Журнал короче, чем при сохранении индекса — индексу доверять нельзя
+            return {}, 0
+        entries = {int(k): v for k, v in saved["entries"].items()}
+        return entries, saved["size"]
+
+    def _scan(self, offset: int) -> None:
+        """Дочитать журнал с offset и применить записи к индексу."""
+        with open(self.file_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                length = len(line)
+                if line.strip():
+                    record = json.loads(line)
+                    client_id = record["id"]
+                    if record.get("_deleted"):
+                        self._index.pop(client_id, None)
+                    else:
+                        self._index[client_id] = [
+                            offset, length, record["last_name"], record["haircut_counter"],
+                        ]
+                offset += length
+
+    def _save_index(self) -> None:
+        size = os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"size": size, "entries": self._index}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    # Работа с журналом
+    def _append(self, record: dict) -> Tuple[int, int]:
+        files = self._files
+        if files.writer is None:
+            files.writer = open(self.file_path, "ab")
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        offset = files.writer.tell()
+        files.writer.write(line)
+        return offset, len(line)
+
+    def _read_record(self, entry: IndexEntry) -> dict:
+        files = self._files
+        if files.writer is not None:
+            files.writer.flush()
+        if files.reader is None:
+            files.reader = open(self.file_path, "rb")
+        files.reader.seek(entry[0])
+        return json.loads(files.reader.read(entry[1]))
+
+    def _close_files(self) -> None:
+        self._files.close()
+
+    def _store(self, client: Client) -> None:
+        """Дописать новую версию клиента в журнал и перевести на неё индекс."""
+        offset, length = self._append(client.to_dict())
+        self._index[client.get_id()] = [
+            offset, length, client.get_last_name(), client.get_haircut_counter(),
+        ]
+        self._remember(client)
+
+    # LRU-кэш
+    def _remember(self, client: Client) -> None:
+        client_id = client.get_id()
+        self._cache[client_id] = client
+        self._cache.move_to_end(client_id)
+        while len(self._cache) > self.max_resident:
+            self._cache.popitem(last=False)
+
+    def _load(self, client_id: int, cache: bool = True) -> Optional[Client]:
+        client = self._cache.get(client_id)
+        if client is not None:
+            self._cache.move_to_end(client_id)
+            return client
+        entry = self._index.get(client_id)
+        if entry is None:
+            return None
+        client = Client(self._read_record(entry))
+        if cache:
+            self._remember(client)
+        return client
+
+    def _load_short(self, client_id: int) -> Optional[ClientShort]:
+        # Кэш не меняется: краткий вид не делает клиента «горячим»
+        client = self._cache.get(client_id)
+        if client is not None:
+            return client.to_short_version()
+        entry = self._index.get(client_id)
+        if entry is None:
+            return None
+        record = self._read_record(entry)
+        return ClientShort.from_trusted(
+            record["last_name"], record["first_name"], record["father_name"], record["haircut_counter"],
+        )
+
+    # Запись
+    @_writes
+    def flush(self) -> None:
+        """Сбросить журнал на диск (fsync) и сохранить индекс."""
+        if not self._opened:
+            return
+        writer = self._files.writer
+        if writer is not None:
+            writer.flush()
+            os.fsync(writer.fileno())
+        self._save_index()
+
+    @_writes
+    def close(self) -> None:
+        # Остановить фоновую запись, если она включена (она же делает flush)
+        super().close()
+        if self._opened:
+            self.flush()
+            self._close_files()
+            self._opened = False
+
+    @_reads
+    def write_all(self, file_name: Optional[str] = None) -> None:
+        """
+        Без file_name — flush(); с file_name — потоковая выгрузка: .json и .csv
+        в их формате (export_clients), остальные расширения — JSONL.
+        """
+        if file_name is None:
+            self.flush()
+            return
+        self._export(self.iter_all(), file_name)
+
+    @staticmethod
+    def _export(clients: Iterable[Client], file_name: str) -> None:
+        ext = os.path.splitext(file_name[:-3] if file_name.endswith(".gz") else file_name)[1].lower()
+        if ext in (".yaml", ".yml"):
+            raise ValueError(f"Выгрузка в YAML не поддерживается: {file_name}")
+        export_clients(clients, file_name, fmt=EXPORT_BY_EXTENSION.get(ext, "jsonl"))
+
+    def _persist(self) -> None:
+        # Записи уже дописаны в журнал (_store); осталось сбросить буфер в файл.
+        # С write-behind файл сбрасывает фоновый поток через flush()
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+        elif self._files.writer is not None:
+            self._files.writer.flush()
+
+    @_writes
+    def compact(self) -> None:
+        """Переписать журнал, оставив только актуальные версии записей."""
+        self.flush()
+        tmp_path = self.file_path + ".tmp"
+        new_index: Dict[int, IndexEntry] = {}
+        offset = 0
+        with open(tmp_path, "wb") as out:
+            for client_id in sorted(self._index):
+                entry = self._index[client_id]
+                line = (json.dumps(self._read_record(entry), ensure_ascii=False) + "\n").encode("utf-8")
+                out.write(line)
+                new_index[client_id] = [offset, len(line), entry[2], entry[3]]
+                offset += len(line)
+        self._close_files()
+        os.replace(tmp_path, self.file_path)
+        self._index = new_index
+        self._save_index()
+
+    def _replace_all(self, clients: List[Client]) -> None:
+        self._close_files()
+        self._index = {}
+        self._cache.clear()
+        self._order = None
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        for client in clients:
+            offset, length = self._append(client.to_dict())
+            self._index[client.get_id()] = [
+                offset, length, client.get_last_name(), client.get_haircut_counter(),
+            ]
+        self._max_id = max(self._index, default=0)
+        self.flush()
+
+    # c. Получить объект по ID
+    @_reads
+    def get_by_id(self, client_id: int) -> Optional[Client]:
+        if client_id < 0:
+            return None
+        return self._load(client_id)
+
+    def _ordered_ids(self) -> List[int]:
+        return self._order if self._order is not None else sorted(self._index)
+
+    # d. Пагинация: читаются только клиенты нужной страницы
+    @_reads
+    def get_k_n_short_list(self, k: int, n: int) -> List[Client]:
+        return [self._load(client_id) for client_id in self._page_ids(k, n)]
+
+    # d''. Страница в кратком виде: записи не проходят валидацию Client и не кэшируются
+    @_reads
+    def get_short_list(self, k: int, n: int) -> List[ClientShort]:
+        return [self._load_short(client_id) for client_id in self._page_ids(k, n)]
+
+    def _page_ids(self, k: int, n: int) -> List[int]:
+        count = self.get_count()
+        if count >= n > 0 and (k <= count // n + 1) and k > 0:
+            return self._ordered_ids()[n * (k - 1):n * k]
+        return []
+
+    @_reads
+    def iter_all(self) -> Iterator[Client]:
+        """
+        Обход всех клиентов без заполнения кэша (кроме уже находящихся в нём).
+        Порядок ID фиксируется при вызове; удалённые позже клиенты пропускаются.
+        """
+        return self._iter_ids(list(self._ordered_ids()), lambda i: self._load(i, cache=False))
+
+    @_reads
+    def iter_short(self) -> Iterator[ClientShort]:
+        """Обход в кратком виде; порядок и поведение — как у iter_all."""
+        return self._iter_ids(list(self._ordered_ids()), self._load_short)
+
+    def _iter_ids(self, ids: List[int], load: Callable[[int], Any]) -> Iterator[Any]:
+        for client_id in ids:
+            # Блокировка — на каждое чтение, а не на весь обход
+            with self._read_locked():
+                item = load(client_id)
+            if item is not None:
+                yield item
+
+    # e. Сортировка: хранится порядок ID, сами записи не перемещаются
+    @_writes
+    def sort_by(self, param: str = "last_name") -> None:
+        if param == "id":
+            self._order = None
+            return
+        if param == "last_name":
+            self._order = sorted(self._index, key=lambda i: self._index[i][2])
+        elif param == "haircut":
+            self._order = sorted(self._index, key=lambda i: self._index[i][3])
+        else:
+            key_fn = SORT_KEYS.get(param, SORT_KEYS["last_name"])
+            keys = {c.get_id(): key_fn(c) for c in self.iter_all()}
+            self._order = sorted(self._index, key=keys.__getitem__)
+
+    def _uniqueness_index(self) -> Counter:
+        if self._unique_keys is None:
+            self._unique_keys = Counter((e[2], e[3]) for e in self._index.values())
+        return self._unique_keys
+
+    def _generate_new_id(self) -> int:
+        return self._max_id + 1
+
+    # f. Добавить объект
+    @_writes
+    def add(self, client: Client) -> Optional[int]:
+        ids = self.add_many([client])
+        return ids[0]
+
+    @_writes
+    def add_many(self, clients: Any) -> List[Optional[int]]:
+        ids: List[Optional[int]] = []
+        for client in clients:
+            if not self._is_unique(client):
+                ids.append(None)
+                continue
+            new_id = self._generate_new_id()
+            self._max_id = new_id
+            client.set_id(new_id)
+            self._store(client)
+            self._index_added(client)
+            if self._order is not None:
+                self._order.append(new_id)
+            ids.append(new_id)
+        if any(i is not None for i in ids):
+            self._persist()
+        return ids
+
+    # g. Заменить по ID
+    @_writes
+    def replace_by_id(self, client_id: int, new_client: Client) -> bool:
+        entry = self._index.get(client_id)
+        if client_id < 0 or entry is None or not self._is_unique(new_client):
+            return False
+        self._unique_keys = None
+        new_client.set_id(client_id)
+        self._store(new_client)
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.add(new_client)
+        self._persist()
+        return True
+
+    # h. Удалить по ID
+    @_writes
+    def delete_by_id(self, client_id: int) -> bool:
+        entry = self._index.pop(client_id, None)
+        if entry is None:
+            return False
+        self._unique_keys = None
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.remove(client_id)
+        self._cache.pop(client_id, None)
+        if self._order is not None:
+            self._order.remove(client_id)
+        self._append({"id": client_id, "_deleted": True})
+        self._persist()
+        return True
+
+    # Программа лояльности: новые версии клиентов дописываются в журнал
+    def _select_for_update(self, ids: set) -> List[Client]:
+        loaded = (self._load(client_id, cache=False) for client_id in ids)
+        return [c for c in loaded if c is not None]
+
+    def _apply_increment(self, targets: List[Client], by: int, tiers: Optional[DiscountTiers]) -> None:
+        super()._apply_increment(targets, by, tiers)
+        for client in targets:
+            self._store(client)
+
+    @_writes
+    def recalculate_discounts(
+        self,
+        tiers: Iterable[Tuple[int, int]] = DISCOUNT_TIERS,
+        ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        tiers = _check_tiers(tiers)
+        changed = 0
+        for client_id in (list(ids) if ids is not None else self._ordered_ids()):
+            client = self._load(client_id, cache=False)
+            if client is None:
+                continue
+            discount = discount_for(client.get_haircut_counter(), tiers)
+            if client.get_discount() != discount:
+                client.set_discount(discount)
+                self._store(client)
+                changed += 1
+        if changed:
+            self._persist()
+        return changed
+
+    # i. Кол-во элементов
+    @_reads
+    def get_count(self) -> int:
+        return len(self._index)
+
+    def _load_from_storage(self) -> List[dict]:
+        return [c.to_dict() for c in self.iter_all()]
+
+    def _dump_to_storage(
+        self,
+        data: List[dict],
+        file_name: Optional[str] = None,
+    ) -> None:
+        if file_name is None:
+            self._replace_all([Client(d) for d in data])
+            return
+        self._export((Client(d) for d in data), file_name)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import Any, Callable, IO, Iterable, Iterator, Optional
+import csv
+import gzip
+import json
+import time
+
+from hair_salon_lab1_task9 import Client
+
+
+EXPORT_FORMATS = ("csv", "jsonl", "json")
+CSV_COLUMNS = ("id", "first_name", "last_name", "father_name", "haircut_counter", "discount")
+
+
+class ExportStats:
+    """Статистика выгрузки: сколько строк записано и с какой скоростью."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def tick(self) -> None:
+        self.seconds = time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Выгружено строк: {self.rows} за {self.seconds:.2f} с "
+            f"({self.rows_per_sec:.0f} строк/с)"
+        )
+
+
+def _open_output(path: str, compress: bool, buffer_size: int) -> IO[str]:
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="", buffering=buffer_size)
+
+
+def iter_clients(source: Any) -> Iterator[Client]:
+    """
+    Итератор клиентов из любого источника: репозитория с iter_all
+    (ClientRepBase, ClientRepDB и их декораторы) или просто итерируемого.
+    """
+    iter_all = getattr(source, "iter_all", None)
+    if iter_all is not None:
+        return iter_all()
+    return iter(source)
+
+
+def export_clients(
+    clients: Iterable[Client],
+    path: str,
+    fmt: str = "jsonl",
+    compress: Optional[bool] = None,
+    buffer_size: int = 1 << 20,
+    progress_every: int = 0,
+    on_progress: Optional[Callable[[ExportStats], None]] = None,
+) -> ExportStats:
+    """
+    Потоковая выгрузка клиентов в CSV, JSONL или JSON-массив.
+
+    Клиенты сериализуются по одному и пишутся через буферизованный файл,
+    поэтому полный список словарей в памяти не строится.
+    compress=None включает gzip по расширению .gz.
+    Каждые progress_every строк вызывается on_progress со статистикой.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    if compress is None:
+        compress = path.endswith(".gz")
+
+    stats = ExportStats()
+    with _open_output(path, compress, buffer_size) as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+
+            def write_row(d: dict) -> None:
+                writer.writerow([d[c] for c in CSV_COLUMNS])
+        elif fmt == "jsonl":
+            def write_row(d: dict) -> None:
+                f.write(json.dumps(d, ensure_ascii=False) + "\n")
+        else:
+            f.write("[")
+
+            def write_row(d: dict) -> None:
+                f.write(("\n" if stats.rows == 0 else ",\n") + json.dumps(d, ensure_ascii=False))
+
+        for client in clients:
+            write_row(client.to_dict())
+            stats.rows += 1
+            if progress_every and on_progress and stats.rows % progress_every == 0:
+                stats.tick()
+                on_progress(stats)
+
+        if fmt == "json":
+            f.write("\n]\n")
+
+    stats.tick()
+    return stats
+
+
+def export_repository(repo: Any, path: str, fmt: str = "jsonl", **kwargs: Any) -> ExportStats:
+    """Выгрузка всего репозитория (файлового или БД) без материализации списка."""
+    return export_clients(iter_clients(repo), path, fmt=fmt, **kwargs)
+
+
+if __name__ == "__main__":
+    from hair_salon_lab2 import ClientRepJson
+
+    result = export_repository(ClientRepJson("clients.json"), "clients_export.jsonl.gz")
+    print(result)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, TypeVar
+import functools
+import heapq
+import math
+import re
+
+
+# Триграммы строятся так же, как в pg_trgm: каждое слово дополняется
+# двумя пробелами слева и одним справа, регистр не учитывается
+_WORD = re.compile(r"\w+")
+
+T = TypeVar("T")
+
+# Поля клиента, по которым ищем: фамилия, имя, отчество и ФИО целиком
+FIELD_COUNT = 4
+
+
+def normalize(text: str) -> str:
+    return text.casefold().replace("ё", "е")
+
+
+@functools.lru_cache(maxsize=65536)
+def trigrams(text: str) -> FrozenSet[str]:
+    # Кэш: имена и отчества у клиентов часто повторяются
+    grams: Set[str] = set()
+    for word in _WORD.findall(normalize(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: str, b: str) -> float:
+    """Сходство по триграммам (как similarity() в pg_trgm): |A ∩ B| / |A ∪ B|."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Расстояние Левенштейна (вставка, удаление, замена — по 1)."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def client_names(client: Any) -> Tuple[str, str, str, str]:
+    last, first, father = client.get_last_name(), client.get_first_name(), client.get_father_name()
+    return last, first, father, f"{last} {first} {father}"
+
+
+def rank(
+    query: str,
+    matches: Iterable[Tuple[T, float]],
+    limit: int,
+    names: Callable[[T], Iterable[str]],
+    ident: Callable[[T], int],
+) -> List[Tuple[T, float]]:
+    """
+    Первые limit пар (объект, сходство): выше сходство, при равном —
+    меньше расстояние редактирования до ближайшего из names(объект),
+    затем меньше ident(объект). Расстояние считается только среди
+    первых limit * 3 и только для пар с одинаковым сходством.
+    """
+    top = heapq.nsmallest(limit * 3, matches, key=lambda item: (-item[1], ident(item[0])))
+    tied = {score for score, count in Counter(score for _, score in top).items() if count > 1}
+    normalized = normalize(query)
+
+    def distance(item: Tuple[T, float]) -> int:
+        if item[1] not in tied:
+            return 0
+        return min(edit_distance(normalized, normalize(name)) for name in names(item[0]))
+
+    top.sort(key=lambda item: (-item[1], distance(item), ident(item[0])))
+    return top[:limit]
+
+
+class FuzzyNameIndex:
+    """
+    Индекс триграмм ФИО для нечёткого поиска в файловых хранилищах.
+
+    Документ — одно поле клиента (номер client_id * FIELD_COUNT + поле).
+    Для каждой триграммы документы разложены по числу триграмм в них:
+    при сходстве не ниже t подходят только документы размера
+    [t * m, m / t] (m — триграмм в запросе), остальные корзины не читаются.
+    Списки триграмм запроса обходятся от самых редких; обход
+    останавливается, как только ещё не встреченные документы заведомо
+    не могут попасть в первые limit. Поэтому частые триграммы вроде «ов »
+    обычно не читаются вовсе.
+    """
+
+    def __init__(self, keep_clients: bool = True) -> None:
+        self.keep_clients = keep_clients
+        # триграмма -> размер документа -> документы
+        self._postings: Dict[str, Dict[int, Set[int]]] = {}
+        # client_id -> нормализованные поля (для удаления и ранжирования)
+        self._names: Dict[int, Tuple[str, ...]] = {}
+        self._clients: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, client: Any) -> None:
+        client_id = client.get_id()
+        if client_id in self._names:
+            self.remove(client_id)
+        names = tuple(normalize(name) for name in client_names(client))
+        self._names[client_id] = names
+        for field, name in enumerate(names):
+            doc = client_id * FIELD_COUNT + field
+            grams = trigrams(name)
+            size = len(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, {}).setdefault(size, set()).add(doc)
+        if self.keep_clients:
+            self._clients[client_id] = client
+
+    def remove(self, client_id: int) -> None:
+        names = self._names.pop(client_id, None)
+        if names is None:
+            return
+        for field, name in enumerate(names):
+            doc = client_id * FIELD_COUNT + field
+            grams = trigrams(name)
+            size = len(grams)
+            for gram in grams:
+                buckets = self._postings[gram]
+                bucket = buckets[size]
+                bucket.discard(doc)
+                if not bucket:
+                    del buckets[size]
+                    if not buckets:
+                        del self._postings[gram]
+        self._clients.pop(client_id, None)
+
+    def client(self, client_id: int) -> Optional[Any]:
+        """Сохранённый клиент (при keep_clients=False — None)."""
+        return self._clients.get(client_id)
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.3) -> List[Tuple[int, float]]:
+        """(client_id, сходство) лучших совпадений по убыванию сходства."""
+        query_grams = trigrams(query)
+        m = len(query_grams)
+        if not 0 <= min_similarity <= 1:
+            raise ValueError("min_similarity должно быть в диапазоне [0, 1]")
+        if not m or limit <= 0:
+            return []
+        min_similarity = max(min_similarity, 1e-9)
+        empty: Dict[int, Set[int]] = {}
+        lists = sorted(
+            (self._postings.get(g, empty) for g in query_grams),
+            key=lambda buckets: sum(map(len, buckets.values())),
+        )
+
+        best: Dict[int, float] = {}
+        seen: Set[int] = set()
+        for r, posting in enumerate(lists):
+            # Документ, не встретившийся в r самых редких списках, разделяет
+            # с запросом не больше m - r триграмм, т.е. его сходство <= (m - r) / m
+            scores = heapq.nlargest(limit, best.values())
+            threshold = max(scores[-1] if len(scores) == limit else 0.0, min_similarity)
+            if (m - r) / m < threshold:
+                break
+            # Запас на округление float: 0.28 * 25 == 7.000000000000001,
+            # а документ из 7 триграмм имеет сходство ровно 0.28
+            lo = math.ceil(threshold * m - 1e-9)
+            hi = math.floor(m / threshold + 1e-9)
+            for size, docs in posting.items():
+                if not lo <= size <= hi:
+                    continue
+                fresh = docs - seen
+                if not fresh:
+                    continue
+                seen |= fresh
+                # Число общих триграмм — пересечениями с корзинами того же размера
+                shared_counts: Counter = Counter()
+                for other in lists:
+                    same_size = other.get(size)
+                    if same_size:
+                        shared_counts.update(same_size & fresh)
+                for doc, shared in shared_counts.items():
+                    score = shared / (m + size - shared)
+                    if score >= min_similarity:
+                        client_id = doc // FIELD_COUNT
+                        if score > best.get(client_id, 0.0):
+                            best[client_id] = score
+
+        return rank(query, best.items(), limit, self._names.__getitem__, int)
@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import random
+import time
+
+from hair_salon_lab1_task9 import Client
+from hair_salon_lab2_export import iter_clients
+
+
+# Смесь операций по умолчанию (веса) — примерно как у стойки администратора
+DEFAULT_MIX: Dict[str, int] = {
+    "get_by_id": 40,
+    "name_lookup": 20,
+    "page": 25,
+    "add": 5,
+    "replace_by_id": 5,
+    "delete_by_id": 5,
+}
+
+# Замер: (время окончания, операция, задержка в секундах, успех)
+Sample = Tuple[float, str, float, bool]
+
+_LETTERS = "абвгдежзиклмнопрстуфхцчшэюя"
+
+
+class _WorkerState:
+    """Состояние одного рабочего потока: известные ID и добавленные им клиенты."""
+
+    def __init__(self, worker_id: int, known_ids: List[int], last_names: List[str], seed: int) -> None:
+        self.worker_id = worker_id
+        self.known_ids = known_ids
+        self.last_names = last_names or ["Иванов"]
+        self.added: List[int] = []
+        self.rng = random.Random(seed)
+        self.seq = 0
+
+    def random_id(self) -> int:
+        pool = self.added if self.added and self.rng.random() < 0.3 else self.known_ids
+        return self.rng.choice(pool) if pool else 1
+
+    def new_client(self) -> Client:
+        # Фамилия + счётчик уникальны для потока, поэтому add не упирается в дубликаты
+        self.seq += 1
+        suffix = "".join(self.rng.choice(_LETTERS) for _ in range(6))
+        return Client({
+            "first_name": "Нагрузка",
+            "last_name": f"Тест{suffix}".title(),
+            "father_name": "Тестович",
+            "haircut_counter": self.worker_id * 1_000_000 + self.seq,
+            "discount": self.rng.randint(0, 30),
+        })
+
+
+def _op_get_by_id(repo: Any, state: _WorkerState) -> None:
+    repo.get_by_id(state.random_id())
+
+
+def _op_name_lookup(repo: Any, state: _WorkerState) -> None:
+    name = state.rng.choice(state.last_names)
+    repo.top_k("id", 20, filters=[("last_name", "=", name)])
+
+
+def _op_page(repo: Any, state: _WorkerState) -> None:
+    pages = max(len(state.known_ids) // 20, 1)
+    repo.get_k_n_short_list(state.rng.randint(1, pages), 20)
+
+
+def _op_add(repo: Any, state: _WorkerState) -> None:
+    new_id = repo.add(state.new_client())
+    if new_id is None or new_id < 0:
+        raise RuntimeError("add отклонён")
+    state.added.append(new_id)
+
+
+def _op_replace_by_id(repo: Any, state: _WorkerState) -> None:
+    if not state.added:
+        return _op_add(repo, state)
+    repo.replace_by_id(state.rng.choice(state.added), state.new_client())
+
+
+def _op_delete_by_id(repo: Any, state: _WorkerState) -> None:
+    # Удаляем только своих клиентов, исходные данные не трогаем
+    if not state.added:
+        return _op_add(repo, state)
+    repo.delete_by_id(state.added.pop(state.rng.randrange(len(state.added))))
+
+
+OPERATIONS: Dict[str, Callable[[Any, _WorkerState], None]] = {
+    "get_by_id": _op_get_by_id,
+    "name_lookup": _op_name_lookup,
+    "page": _op_page,
+    "add": _op_add,
+    "replace_by_id": _op_replace_by_id,
+    "delete_by_id": _op_delete_by_id,
+}
+
+
+def _run_worker(
+    repo: Any,
+    worker_id: int,
+    mix: Dict[str, int],
+    rate: float,
+    duration: float,
+    known_ids: List[int],
+    last_names: List[str],
+    seed: int,
+) -> List[Sample]:
+    """
+    Один поток нагрузки. Запросы планируются с частотой rate; задержка
+    считается от запланированного момента, а не от фактического старта,
+    чтобы перегрузка не скрывала очередь (coordinated omission).
+    """
+    state = _WorkerState(worker_id, known_ids, last_names, seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples: List[Sample] = []
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    started = time.perf_counter()
+    wall_offset = time.time() - started
+    scheduled = started
+    while scheduled - started < duration:
+        now = time.perf_counter()
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        elif not interval:
+            scheduled = now
+
+        op = state.rng.choices(names, weights)[0]
+        ok = True
+        try:
+            OPERATIONS[op](repo, state)
+        except Exception:  # noqa: BLE001
+            ok = False
+        finished = time.perf_counter()
+        samples.append((finished + wall_offset, op, finished - scheduled, ok))
+        scheduled += interval
+    return samples
+
+
+def _close_repo(repo: Any) -> None:
+    """Закрыть соединение с БД, открытое фабрикой для одного потока."""
+    db = getattr(repo, "db", None)
+    if db is not None:
+        db.close()
+
+
+def _run_own_repo(repo_factory: Callable[[], Any], *args: Any) -> List[Sample]:
+    """Поток нагрузки со своим репозиторием (и своим соединением с БД)."""
+    repo = repo_factory()
+    try:
+        return _run_worker(repo, *args)
+    finally:
+        _close_repo(repo)
+
+
+def _run_process(
+    repo_factory: Callable[[], Any],
+    first_worker: int,
+    threads: int,
+    mix: Dict[str, int],
+    rate: float,
+    duration: float,
+    seed: int,
+    repo_per_worker: bool = False,
+) -> List[Sample]:
+    """
+    Процесс нагрузки: threads потоков над одним экземпляром репозитория
+    или, при repo_per_worker, каждый поток со своим экземпляром.
+    """
+    repo = repo_factory()
+    try:
+        known_ids, last_names = _sample_dataset(repo)
+    finally:
+        if repo_per_worker:
+            _close_repo(repo)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = []
+        for i in range(threads):
+            args = (
+                first_worker + i, mix, rate / threads, duration,
+                known_ids, last_names, seed + first_worker + i,
+            )
+            if repo_per_worker:
+                futures.append(pool.submit(_run_own_repo, repo_factory, *args))
+            else:
+                futures.append(pool.submit(_run_worker, repo, *args))
+        samples: List[Sample] = []
+        for future in futures:
+            samples.extend(future.result())
+    return samples
+
+
+def _sample_dataset(repo: Any, limit: int = 10000) -> Tuple[List[int], List[str]]:
+    ids: List[int] = []
+    names = set()
+    for client in iter_clients(repo):
+        ids.append(client.get_id())
+        names.add(client.get_last_name())
+        if len(ids) >= limit:
+            break
+    return ids, sorted(names)
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LoadReport:
+    """Итоги прогона: пропускная способность, доля ошибок и перцентили задержки."""
+
+    def __init__(self, samples: List[Sample], window: float) -> None:
+        self.samples = sorted(samples)
+        self.window = window
+
+    @staticmethod
+    def _stats(samples: List[Sample], seconds: float) -> Dict[str, float]:
+        latencies = sorted(s[2] * 1000 for s in samples)
+        errors = sum(1 for s in samples if not s[3])
+        return {
+            "count": len(samples),
+            "rps": len(samples) / seconds if seconds > 0 else 0.0,
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+        }
+
+    @property
+    def seconds(self) -> float:
+        if not self.samples:
+            return 0.0
+        return self.samples[-1][0] - self.samples[0][0] or self.window
+
+    def total(self) -> Dict[str, float]:
+        return self._stats(self.samples, self.seconds)
+
+    def by_operation(self) -> Dict[str, Dict[str, float]]:
+        groups: Dict[str, List[Sample]] = {}
+        for sample in self.samples:
+            groups.setdefault(sample[1], []).append(sample)
+        return {op: self._stats(group, self.seconds) for op, group in sorted(groups.items())}
+
+    def timeline(self) -> List[Tuple[float, Dict[str, float]]]:
+        """Статистика по окнам длиной window секунд от начала прогона."""
+        if not self.samples:
+            return []
+        start = self.samples[0][0]
+        windows: Dict[int, List[Sample]] = {}
+        for sample in self.samples:
+            windows.setdefault(int((sample[0] - start) // self.window), []).append(sample)
+        return [
+            (index * self.window, self._stats(group, self.window))
+            for index, group in sorted(windows.items())
+        ]
+
+    @staticmethod
+    def _format(label: str, stats: Dict[str, float]) -> str:
+        return (
+            f"{label:<14} {int(stats['count']):>7} {stats['rps']:>9.1f} "
+            f"{stats['error_rate'] * 100:>6.2f}% {stats['p50_ms']:>8.2f} "
+            f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}"
+        )
+
+    def to_text(self) -> str:
+        header = (
+            f"{'':<14} {'запросов':>7} {'в сек':>9} {'ошибки':>7} "
+            f"{'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} {'max мс':>8}"
+        )
+        lines = ["По времени:", header]
+        lines += [self._format(f"+{offset:.0f}s", stats) for offset, stats in self.timeline()]
+        lines += ["", "По операциям:", header]
+        lines += [self._format(op, stats) for op, stats in self.by_operation().items()]
+        lines += ["", self._format("ИТОГО", self.total())]
+        return "\n".join(lines)
+
+
+def run_load(
+    repo_factory: Callable[[], Any],
+    mix: Optional[Dict[str, int]] = None,
+    threads: int = 4,
+    processes: int = 1,
+    rate: float = 100.0,
+    duration: float = 10.0,
+    window: float = 1.0,
+    seed: int = 0,
+    repo_per_worker: bool = False,
+) -> LoadReport:
+    """
+    Нагрузка на любой репозиторий из hair_salon_lab2.
+
+    repo_factory создаёт репозиторий (в каждом процессе свой; при processes > 1
+    фабрика должна сериализоваться pickle — функция уровня модуля или partial).
+    rate — целевое общее число операций в секунду (0 — без ограничения),
+    делится поровну между всеми потоками всех процессов.
+    Файловые хранилища в разных процессах держат независимые копии данных,
+    поэтому для них пишущая нагрузка из нескольких процессов перезаписывает
+    файл друг друга — многопроцессный режим рассчитан прежде всего на БД.
+    repo_per_worker — фабрика вызывается в каждом потоке: так у каждого потока
+    своё соединение с БД (через общее соединение psycopg2 запросы потоков
+    шли бы по одному и в одной транзакции).
+    """
+    mix = dict(mix or DEFAULT_MIX)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Неизвестные операции: {sorted(unknown)}")
+
+    per_process_rate = rate / processes
+    if processes == 1:
+        samples = _run_process(
+            repo_factory, 0, threads, mix, per_process_rate, duration, seed, repo_per_worker,
+        )
+        return LoadReport(samples, window)
+
+    samples: List[Sample] = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(
+                _run_process, repo_factory, p * threads, threads, mix,
+                per_process_rate, duration, seed, repo_per_worker,
+            )
+            for p in range(processes)
+        ]
+        for future in futures:
+            samples.extend(future.result())
+    return LoadReport(samples, window)
+
+
+def _parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+class _RepoFactory:
+    """
+    Фабрика репозитория по имени хранилища (сериализуемая для процессов).
+    Для БД каждый вызов открывает новое соединение, а не берёт общее
+    DatabaseConnection.get_instance — вызывается в каждом потоке (per_worker).
+    """
+
+    def __init__(self, backend: str, path: str) -> None:
+        self.backend = backend
+        self.path = path
+
+    @property
+    def per_worker(self) -> bool:
+        return self.backend == "db"
+
+    def __call__(self) -> Any:
+        import hair_salon_lab2 as lab2
+
+        if self.backend == "json":
+            return lab2.ClientRepJson(self.path)
+        if self.backend == "yaml":
+            return lab2.ClientRepYaml(self.path)
+        if self.backend == "sqlite":
+            from hair_salon_lab2_sqlite import ClientRepSqlite
+
+            return ClientRepSqlite(self.path)
+        if self.backend == "db":
+            lab2.initialize_database()
+            dsn = (
+                f"dbname={lab2.TARGET_DB} user={lab2.POSTGRES_USER} "
+                f"password={lab2.POSTGRES_PASSWORD} host={lab2.POSTGRES_HOST} "
+                f"port={lab2.POSTGRES_PORT}"
+            )
+            return lab2.ClientRepDB(lab2.DatabaseConnection(dsn))
+        raise ValueError(f"Неизвестное хранилище: {self.backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест репозиториев клиентов")
+    parser.add_argument("--backend", choices=("json", "yaml", "sqlite", "db"), default="json")
+    parser.add_argument("--path", default="clients.json")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=100.0, help="операций в секунду, 0 — без ограничения")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--mix", type=_parse_mix, default=None, help="например get_by_id=40,add=5")
+    args = parser.parse_args()
+
+    factory = _RepoFactory(args.backend, args.path)
+    report = run_load(
+        factory,
+        mix=args.mix,
+        threads=args.threads,
+        processes=args.processes,
+        rate=args.rate,
+        duration=args.duration,
+        window=args.window,
+        repo_per_worker=factory.per_worker,
+    )
+    print(report.to_text())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Union
+
+from hair_salon_lab1_task9 import Client
+from hair_salon_lab2_export import iter_clients
+
+
+# Политика разрешения конфликта: (уже выбранный клиент, новый клиент) -> победитель
+ConflictPolicy = Callable[[Client, Client], Client]
+
+
+def exact_key(client: Client) -> Hashable:
+    """Точный ключ: все поля клиента, кроме ID (как в Client.__eq__)."""
+    return (
+        client.get_last_name(),
+        client.get_first_name(),
+        client.get_father_name(),
+        client.get_haircut_counter(),
+        client.get_discount(),
+    )
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold().replace("ё", "е")
+
+
+def normalized_name_key(client: Client) -> Hashable:
+    """Один и тот же человек независимо от регистра, лишних пробелов и ё/е."""
+    return (
+        _normalize_name(client.get_last_name()),
+        _normalize_name(client.get_first_name()),
+        _normalize_name(client.get_father_name()),
+    )
+
+
+def _merge_max(current: Client, incoming: Client) -> Client:
+    """Объединение: большее число стрижек и большая скидка."""
+    base = current if current.get_haircut_counter() >= incoming.get_haircut_counter() else incoming
+    if base.get_discount() >= max(current.get_discount(), incoming.get_discount()):
+        return base
+    data = base.to_dict()
+    data["discount"] = max(current.get_discount(), incoming.get_discount())
+    return Client(data)
+
+
+DEDUP_KEYS: Dict[str, Callable[[Client], Hashable]] = {
+    "exact": exact_key,
+    "normalized": normalized_name_key,
+}
+
+CONFLICT_POLICIES: Dict[str, ConflictPolicy] = {
+    "first": lambda current, incoming: current,
+    "last": lambda current, incoming: incoming,
+    "max_haircuts": lambda current, incoming: (
+        incoming if incoming.get_haircut_counter() > current.get_haircut_counter() else current
+    ),
+    "merge": _merge_max,
+}
+
+
+class MergeResult:
+    """Итог слияния: клиенты без дубликатов и статистика по источникам."""
+
+    def __init__(self) -> None:
+        self.clients: List[Client] = []
+        self.read_by_source: Dict[str, int] = {}
+        self.exact_duplicates = 0
+        self.conflicts = 0
+        self.ids: List[Optional[int]] = []
+
+    @property
+    def total_read(self) -> int:
+        return sum(self.read_by_source.values())
+
+    def summary(self) -> str:
+        sources = ", ".join(f"{name}: {count}" for name, count in self.read_by_source.items())
+        return (
+            f"Прочитано {self.total_read} ({sources}); точных дубликатов: "
+            f"{self.exact_duplicates}, конфликтов разрешено: {self.conflicts}, "
+            f"итого клиентов: {len(self.clients)}"
+        )
+
+
+def _source_name(index: int, source: Any) -> str:
+    path = getattr(source, "file_path", None)
+    return f"{index}:{path or type(source).__name__}"
+
+
+def merge_clients(
+    sources: Iterable[Any],
+    key: Union[str, Callable[[Client], Hashable]] = "normalized",
+    policy: Union[str, ConflictPolicy] = "merge",
+) -> MergeResult:
+    """
+    Потоково читает клиентов из всех источников (ClientRepJson, ClientRepYaml,
+    ClientRepDB, декораторы или просто итерируемые) и убирает дубликаты
+    за один проход по словарям: O(суммарного числа клиентов).
+
+    Записи, совпадающие полностью, отбрасываются сразу; записи с одинаковым
+    ключом key, но разными данными, разрешаются политикой policy.
+    """
+    key_fn = DEDUP_KEYS[key] if isinstance(key, str) else key
+    resolve = CONFLICT_POLICIES[policy] if isinstance(policy, str) else policy
+
+    result = MergeResult()
+    seen_exact = set()
+    chosen: Dict[Hashable, Client] = {}
+
+    for index, source in enumerate(sources):
+        name = _source_name(index, source)
+        read = 0
+        for client in iter_clients(source):
+            read += 1
+            # Client хэшируется по тем же полям, что и exact_key
+            if client in seen_exact:
+                result.exact_duplicates += 1
+                continue
+            seen_exact.add(client)
+
+            group = key_fn(client)
+            current = chosen.get(group)
+            if current is None:
+                chosen[group] = client
+            else:
+                result.conflicts += 1
+                chosen[group] = resolve(current, client)
+        result.read_by_source[name] = read
+
+    # Копии: ID назначит целевое хранилище, исходные объекты не трогаем
+    for client in chosen.values():
+        data = client.to_dict()
+        data.pop("id", None)
+        result.clients.append(Client(data))
+    return result
+
+
+def merge_into(
+    target: Any,
+    sources: Iterable[Any],
+    key: Union[str, Callable[[Client], Hashable]] = "normalized",
+    policy: Union[str, ConflictPolicy] = "merge",
+) -> MergeResult:
+    """Слияние источников и запись результата в target одним add_many."""
+    result = merge_clients(sources, key=key, policy=policy)
+    result.ids = target.add_many(result.clients)
+    return result
+
+
+if __name__ == "__main__":
+    from hair_salon_lab2 import ClientRepJson, ClientRepYaml
+
+    merged = merge_into(
+        ClientRepJson("clients_merged.json"),
+        [ClientRepJson("clients.json"), ClientRepYaml("clients.yaml")],
+    )
+    print(merged.summary())
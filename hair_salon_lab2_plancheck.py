@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import json
+import sys
+
+import psycopg2
+import psycopg2.extensions
+
+from hair_salon_lab2 import ClientRepDB
+
+
+# Запросы, для которых EXPLAIN имеет смысл (DDL, SET, LISTEN и т.п. пропускаются)
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+class SeqScanError(AssertionError):
+    """Запрос читает большую таблицу последовательным сканированием."""
+
+    def __init__(self, query: str, relation: str, rows: float) -> None:
+        super().__init__(
+            f"Seq Scan по {relation} (~{int(rows)} строк) в запросе: {query}"
+        )
+        self.query = query
+        self.relation = relation
+        self.rows = rows
+
+
+def _seq_scans(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan
+    for child in plan.get("Plans", ()):
+        yield from _seq_scans(child)
+
+
+class QueryPlanChecker:
+    """
+    Тестовый режим для ClientRepDB: перед каждым запросом выполняет
+    EXPLAIN (FORMAT JSON) и падает с SeqScanError, если в плане есть
+    Seq Scan по таблице, в которой не меньше min_rows строк
+    (оценка pg_class.reltuples).
+
+    EXPLAIN строится с настройками планировщика по умолчанию — проверяется
+    тот план, который сервер действительно выполнит; на малых таблицах
+    полный проход честно дешевле, их отсекает min_rows. disable_seqscan=True
+    (enable_seqscan = off) показывает, есть ли для запроса индекс вообще,
+    даже на маленькой тестовой таблице. allow — подстроки запросов,
+    которым полный проход разрешён.
+    """
+
+    def __init__(
+        self,
+        min_rows: int = 10000,
+        disable_seqscan: bool = False,
+        allow: Iterable[str] = (),
+        raise_on_violation: bool = True,
+    ) -> None:
+        self.min_rows = min_rows
+        self.disable_seqscan = disable_seqscan
+        self.allow = tuple(allow)
+        self.raise_on_violation = raise_on_violation
+        self.checked: List[str] = []
+        self.violations: List[SeqScanError] = []
+        self._table_rows: Dict[str, float] = {}
+
+    def _table_size(self, cur: Any, relation: str) -> float:
+        if relation not in self._table_rows:
+            cur.execute("SELECT reltuples FROM pg_class WHERE relname = %s", (relation,))
+            row = cur.fetchone()
+            self._table_rows[relation] = max(row[0], 0) if row else 0
+        return self._table_rows[relation]
+
+    def check(self, conn: Any, query: Any, params: Any = None) -> None:
+        if isinstance(query, bytes):
+            query = query.decode(psycopg2.extensions.encodings[conn.encoding])
+        elif not isinstance(query, str):
+            query = query.as_string(conn)
+        text = query.strip()
+        if not text.upper().startswith(EXPLAINABLE):
+            return
+        if any(pattern in text for pattern in self.allow):
+            return
+
+        # Обычный курсор: фабрика соединения снова вызвала бы check
+        cur = psycopg2.extensions.cursor(conn)
+        try:
+            if self.disable_seqscan:
+                cur.execute("SET enable_seqscan = off")
+            try:
+                cur.execute("EXPLAIN (FORMAT JSON) " + text, params)
+                plan = cur.fetchone()[0]
+            finally:
+                if self.disable_seqscan:
+                    cur.execute("RESET enable_seqscan")
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+
+            self.checked.append(text)
+            for node in _seq_scans(plan[0]["Plan"]):
+                relation = node.get("Relation Name", "?")
+                rows = self._table_size(cur, relation)
+                if rows >= self.min_rows:
+                    error = SeqScanError(" ".join(text.split()), relation, rows)
+                    self.violations.append(error)
+                    if self.raise_on_violation:
+                        raise error
+        finally:
+            cur.close()
+
+    def _cursor_class(self) -> type:
+        checker = self
+
+        class PlanCheckingCursor(psycopg2.extensions.cursor):
+            def execute(self, query: Any, vars: Any = None) -> Any:
+                checker.check(self.connection, query, vars)
+                return super().execute(query, vars)
+
+        return PlanCheckingCursor
+
+    @contextmanager
+    def watch(self, target: Any) -> Iterator["QueryPlanChecker"]:
+        """Проверять запросы ClientRepDB (или соединения psycopg2) внутри блока."""
+        conn = target.conn if isinstance(target, ClientRepDB) else target
+        previous = conn.cursor_factory
+        conn.cursor_factory = self._cursor_class()
+        try:
+            yield self
+        finally:
+            conn.cursor_factory = previous
+
+    def report(self) -> str:
+        lines = [f"Проверено запросов: {len(self.checked)}, нарушений: {len(self.violations)}"]
+        lines.extend(f"  {error}" for error in self.violations)
+        return "\n".join(lines)
+
+
+def check_repository_plans(
+    repo: ClientRepDB,
+    min_rows: int = 10000,
+    allow: Iterable[str] = (),
+) -> QueryPlanChecker:
+    """
+    Прогоняет типовые запросы ClientRepDB (чтение, пагинация, краткие
+    страницы и обход, top_k, фильтры, подсчёт, нечёткий поиск по
+    триграммным GIN-индексам) под QueryPlanChecker и возвращает его
+    с итогами. Изменяющие запросы не выполняются.
+    """
+    checker = QueryPlanChecker(min_rows=min_rows, allow=allow, raise_on_violation=False)
+    filters: List[Tuple[str, str, Any]] = [("discount", ">=", 10)]
+    with checker.watch(repo):
+        repo.get_by_id(1)
+        repo.get_many_by_ids([1, 2, 3])
+        repo.get_k_n_short_list(2, 20)
+        repo.get_short_list(2, 20)
+        repo.get_short_list(1, 20, filters=filters)
+        for _ in repo.iter_short(filters=filters):
+            pass
+        for field in ("last_name", "haircut_counter", "discount"):
+            repo.top_k(field, 10)
+            repo.top_k(field, 10, reverse=True)
+        repo.top_k("id", 20, filters=[("last_name", "=", "Иванов")])
+        repo.get_count(filters=filters)
+        repo.get_count(filters=[("last_name", "=", "Иванов"), ("haircut_counter", "=", 4)])
+        repo.get_all(filters=filters, lazy=True)
+        for _ in repo.iter_all(filters=filters, lazy=True):
+            pass
+        # Оператор % должен идти по TRIGRAM_INDEXES, а не полным проходом
+        repo.fuzzy_search("Иванов")
+        repo.fuzzy_search("Ивнов Петр", min_similarity=0.2)
+    return checker
+
+
+if __name__ == "__main__":
+    import hair_salon_lab2 as lab2
+
+    lab2.initialize_database()
+    dsn = (
+        f"dbname={lab2.TARGET_DB} user={lab2.POSTGRES_USER} "
+        f"password={lab2.POSTGRES_PASSWORD} host={lab2.POSTGRES_HOST} "
+        f"port={lab2.POSTGRES_PORT}"
+    )
+    repo = ClientRepDB(lab2.DatabaseConnection.get_instance(dsn))
+    min_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    result = check_repository_plans(repo, min_rows=min_rows)
+    print(result.report())
+    sys.exit(1 if result.violations else 0)
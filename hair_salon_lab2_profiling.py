@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+
+# Операции репозиториев (и декораторов), которые оборачивает ProfiledRepository
+PROFILED_METHODS = (
+    "read_all",
+    "write_all",
+    "get_by_id",
+    "get_many_by_ids",
+    "get_k_n_short_list",
+    "get_short_list",
+    "get_count",
+    "get_all",
+    "iter_all",
+    "iter_short",
+    "top_k",
+    "fuzzy_search",
+    "add",
+    "add_many",
+    "replace_by_id",
+    "delete_by_id",
+    "increment_haircuts",
+    "recalculate_discounts",
+    "sort_by",
+)
+
+# Переменная окружения, включающая профилирование на весь процесс
+PROFILE_ENV = "HAIR_SALON_PROFILE"
+
+
+class RepositoryProfiler:
+    """
+    Собирает cProfile-статистику и места выделения памяти (tracemalloc)
+    для профилируемых вызовов и суммирует их между вызовами.
+
+    Профилирование включается на время блока profile(...) или для всего
+    процесса (enabled=True + ProfiledRepository). Блоки разных потоков
+    профилируются независимо; вложенные блоки одного потока учитываются
+    только внешним, т.к. cProfile не допускает двух активных профилировщиков
+    в потоке. В Python 3.12+ профилировщик cProfile один на процесс: пока он
+    занят другим потоком, для блока собираются только время и память.
+    tracemalloc тоже общий на процесс, поэтому в память блока попадают
+    и выделения параллельных потоков.
+    """
+
+    def __init__(self, enabled: bool = False, trace_frames: int = 1) -> None:
+        self.enabled = enabled
+        self.trace_frames = trace_frames
+        self._lock = threading.Lock()
+        # Идёт ли профилируемый блок в текущем потоке
+        self._local = threading.local()
+        # Сколько блоков сейчас пользуются tracemalloc, запущенным профилировщиком
+        self._tracing_users = 0
+        self._owns_tracing = False
+        self._stats: Optional[pstats.Stats] = None
+        # место выделения -> (байт, объектов), суммарно по всем вызовам
+        self._alloc_size: Counter = Counter()
+        self._alloc_count: Counter = Counter()
+        # операция -> (вызовов, суммарное время)
+        self.calls: Counter = Counter()
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def profile(self, label: str = "block") -> Iterator[None]:
+        if getattr(self._local, "active", False):
+            yield
+            return
+
+        self._local.active = True
+        try:
+            self._start_tracing()
+            try:
+                before = tracemalloc.take_snapshot()
+                profile: Optional[cProfile.Profile] = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Python 3.12+: cProfile уже включён в другом потоке
+                    profile = None
+                started = time.perf_counter()
+                try:
+                    yield
+                finally:
+                    if profile is not None:
+                        profile.disable()
+                    elapsed = time.perf_counter() - started
+                    after = tracemalloc.take_snapshot()
+                    self._collect(label, elapsed, profile, before, after)
+            finally:
+                self._stop_tracing()
+        finally:
+            self._local.active = False
+
+    def profile_iter(self, label: str, iterator: Iterator[Any]) -> Iterator[Any]:
+        """
+        Весь ленивый обход iterator — один блок label: снимки памяти берутся
+        в начале и в конце обхода, один cProfile включается только на время
+        next(), так что время и функции потребителя в блок не попадают
+        (в отличие от памяти — снимки общие на весь обход).
+        """
+        if getattr(self._local, "active", False):
+            yield from iterator
+            return
+
+        self._start_tracing()
+        try:
+            before = tracemalloc.take_snapshot()
+            profile = cProfile.Profile()
+            profiled = False
+            elapsed = 0.0
+            try:
+                while True:
+                    self._local.active = True
+                    try:
+                        try:
+                            profile.enable()
+                            enabled = True
+                        except ValueError:
+                            # Python 3.12+: cProfile уже включён в другом потоке
+                            enabled = False
+                        started = time.perf_counter()
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - started
+                            if enabled:
+                                profile.disable()
+                                profiled = True
+                    finally:
+                        self._local.active = False
+                    yield item
+            finally:
+                after = tracemalloc.take_snapshot()
+                self._collect(label, elapsed, profile if profiled else None, before, after)
+        finally:
+            self._stop_tracing()
+
+    def _start_tracing(self) -> None:
+        with self._lock:
+            if self._tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._owns_tracing = True
+            self._tracing_users += 1
+
+    def _stop_tracing(self) -> None:
+        with self._lock:
+            self._tracing_users -= 1
+            if self._tracing_users == 0 and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    def _collect(
+        self,
+        label: str,
+        elapsed: float,
+        profile: Optional[cProfile.Profile],
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+    ) -> None:
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        with self._lock:
+            self.calls[label] += 1
+            self.seconds[label] = self.seconds.get(label, 0.0) + elapsed
+            if profile is not None and self._stats is None:
+                self._stats = pstats.Stats(profile)
+            elif profile is not None:
+                self._stats.add(profile)
+            for stat in diff:
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    site = f"{frame.filename}:{frame.lineno}"
+                    self._alloc_size[site] += stat.size_diff
+                    self._alloc_count[site] += max(stat.count_diff, 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = None
+            self._alloc_size.clear()
+            self._alloc_count.clear()
+            self.calls.clear()
+            self.seconds.clear()
+
+    def report(self, top: int = 20, sort: str = "cumulative") -> str:
+        """Текстовый отчёт: операции, топ функций и топ мест выделения памяти."""
+        lines = ["Операции:"]
+        for label, count in self.calls.most_common():
+            total = self.seconds[label]
+            lines.append(f"  {label:<22} вызовов: {count:>6}  всего: {total * 1000:>10.1f} мс  "
+                         f"среднее: {total / count * 1000:>8.2f} мс")
+
+        lines.append("")
+        lines.append(f"Топ-{top} функций ({sort}):")
+        if self._stats is not None:
+            buffer = io.StringIO()
+            self._stats.stream = buffer
+            self._stats.sort_stats(sort).print_stats(top)
+            lines.append(buffer.getvalue().rstrip())
+
+        lines.append("")
+        lines.append(f"Топ-{top} мест выделения памяти:")
+        for site, size in self._alloc_size.most_common(top):
+            lines.append(f"  {size / 1024:>10.1f} КиБ  {self._alloc_count[site]:>8} объектов  {site}")
+        return "\n".join(lines)
+
+    def dump(self, path: str, top: int = 30) -> None:
+        """Сохранить отчёт в path и сырую статистику cProfile в path + '.prof'."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report(top=top))
+        if self._stats is not None:
+            self._stats.dump_stats(path + ".prof")
+
+
+class ProfiledRepository:
+    """
+    Обёртка над репозиторием или декоратором: вызовы из methods выполняются
+    под profiler.profile(<имя метода>), пока profiler.enabled истинно.
+    Если метод возвращает итератор (iter_all, iter_short), весь обход
+    учитывается отдельно одним блоком <имя метода>:iter.
+    Остальные атрибуты делегируются без изменений.
+    """
+
+    def __init__(
+        self,
+        wrapped: Any,
+        profiler: Optional[RepositoryProfiler] = None,
+        methods: Iterable[str] = PROFILED_METHODS,
+    ) -> None:
+        self._wrapped = wrapped
+        self._profiler = profiler or PROCESS_PROFILER
+        self._methods = frozenset(methods)
+
+    @property
+    def profiler(self) -> RepositoryProfiler:
+        return self._profiler
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._wrapped, name)
+        if name not in self._methods or not callable(attr):
+            return attr
+
+        profiler = self._profiler
+
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            if not profiler.enabled:
+                return attr(*args, **kwargs)
+            with profiler.profile(name):
+                result = attr(*args, **kwargs)
+            if isinstance(result, Iterator):
+                return profiler.profile_iter(f"{name}:iter", result)
+            return result
+
+        return profiled
+
+
+# Профилировщик процесса: включается enable_process_profiling()
+# или переменной окружения HAIR_SALON_PROFILE=<файл отчёта>
+PROCESS_PROFILER = RepositoryProfiler()
+
+
+def enable_process_profiling(report_path: Optional[str] = "repository_profile.txt") -> RepositoryProfiler:
+    """Включить профилирование всех ProfiledRepository процесса; отчёт — при выходе."""
+    PROCESS_PROFILER.enabled = True
+    if report_path:
+        atexit.register(PROCESS_PROFILER.dump, report_path)
+    return PROCESS_PROFILER
+
+
+if os.environ.get(PROFILE_ENV):
+    enable_process_profiling(os.environ[PROFILE_ENV])
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+import bisect
+import heapq
+import itertools
+import os
+
+from hair_salon_lab1_task9 import Client
+from hair_salon_lab2 import (
+    DISCOUNT_TIERS,
+    SORT_KEYS,
+    ClientRepBase,
+    ClientRepJson,
+    ClientRepYaml,
+    _check_increment,
+    _check_tiers,
+    _reads,
+    _writes,
+)
+from hair_salon_lab2_fuzzy import client_names, rank
+
+
+SHARD_FORMATS: Dict[str, Type[ClientRepBase]] = {
+    "json": ClientRepJson,
+    "yaml": ClientRepYaml,
+}
+
+
+class ClientRepSharded(ClientRepBase):
+    """
+    Файловый репозиторий, разбитый на N шардов по хэшу ID.
+
+    Каждый шард — обычный ClientRepJson / ClientRepYaml в своём файле.
+    Изменение переписывает только файл затронутого шарда, get_by_id
+    обращается к одному шарду, а пагинация с сортировкой/фильтром
+    собирается k-путевым слиянием шардов.
+    """
+
+    def __init__(
+        self,
+        dir_path: str = "clients_shards",
+        shard_count: int = 8,
+        fmt: str = "json",
+        load_workers: int = 1,
+        chunk_size: int = 10000,
+    ) -> None:
+        if shard_count <= 0:
+            raise ValueError("shard_count должен быть положительным")
+        if fmt not in SHARD_FORMATS:
+            raise ValueError(f"Неизвестный формат шардов: {fmt}")
+        self.shard_count = shard_count
+        self.fmt = fmt
+        self.shards: List[ClientRepBase] = []
+        # Порядок, в котором упорядочены клиенты внутри шардов (см. sort_by)
+        self._order_key: Callable[[Client], Any] = SORT_KEYS["id"]
+        os.makedirs(dir_path, exist_ok=True)
+        super().__init__(dir_path, load_workers=load_workers, chunk_size=chunk_size)
+
+    # Маршрутизация
+    def _shard_index(self, client_id: int) -> int:
+        return hash(client_id) % self.shard_count
+
+    def _shard_for(self, client_id: int) -> ClientRepBase:
+        return self.shards[self._shard_index(client_id)]
+
+    def _shard_path(self, index: int) -> str:
+        return os.path.join(self.file_path, f"clients_{index:03d}.{self.fmt}")
+
+    def _open_shard(self, index: int) -> ClientRepBase:
+        shard_cls = SHARD_FORMATS[self.fmt]
+        return shard_cls(
+            self._shard_path(index),
+            load_workers=self.load_workers,
+            chunk_size=self.chunk_size,
+        )
+
+    # Объединённое представление всех шардов (для совместимости с ClientRepBase)
+    @property
+    def items(self) -> List[Client]:
+        return list(self.iter_all())
+
+    @items.setter
+    def items(self, clients: List[Client]) -> None:
+        parts: List[List[Client]] = [[] for _ in range(self.shard_count)]
+        for client in clients:
+            parts[self._shard_index(client.get_id())].append(client)
+        # Присваивание целого списка сбрасывает индексы шарда (уникальность, нечёткий поиск)
+        for shard, part in zip(self.shards, parts):
+            part.sort(key=self._order_key)
+            shard.items = part
+
+    # Каждый шард упорядочен по _order_key — на этом держится слияние в iter_all
+    # и пагинации. Файл шарда может хранить порядок прежнего sort_by,
+    # поэтому после загрузки шард сортируется, а вставки идут через bisect.
+    def _insert(self, shard: ClientRepBase, client: Client) -> None:
+        bisect.insort(shard._mutable_items(), client, key=self._order_key)
+
+    def _restore_order(self, shard: ClientRepBase) -> None:
+        """Вернуть порядок шарду после изменения полей, по которым он упорядочен."""
+        if self._order_key is not SORT_KEYS["id"]:
+            shard._mutable_items().sort(key=self._order_key)
+
+    # a. Чтение: шарды загружаются по очереди — разбор JSON/YAML занимает
+    # процессор, и потоки из-за GIL его не ускоряют. Параллельная проверка
+    # записей внутри шарда включается через load_workers (пул процессов).
+    @_writes
+    def read_all(self) -> None:
+        self.shards = [self._open_shard(index) for index in range(self.shard_count)]
+        self._order_key = SORT_KEYS["id"]
+        for shard in self.shards:
+            shard._mutable_items().sort(key=self._order_key)
+        self.load_errors = [
+            (f"{self._shard_path(i)}:{row}", message)
+            for i, shard in enumerate(self.shards)
+            for row, message in shard.load_errors
+        ]
+
+    # b. Запись: все шарды или, с file_name, единый файл формата шардов
+    @_reads
+    def write_all(self, file_name: Optional[str] = None) -> None:
+        if file_name is not None:
+            super().write_all(file_name=file_name)
+            return
+        with ThreadPoolExecutor(max_workers=self.shard_count) as pool:
+            list(pool.map(lambda shard: shard.write_all(), self.shards))
+
+    # c. Получить объект по ID — только в своём шарде
+    @_reads
+    def get_by_id(self, client_id: int) -> Optional[Client]:
+        if client_id < 0:
+            return None
+        return self._shard_for(client_id).get_by_id(client_id)
+
+    @_reads
+    def get_many_by_ids(self, ids: Iterable[int]) -> Tuple[List[Client], List[int]]:
+        ids = list(ids)
+        by_id: Dict[int, Client] = {}
+        groups: Dict[int, List[int]] = {}
+        for client_id in ids:
+            groups.setdefault(self._shard_index(client_id), []).append(client_id)
+        for index, shard_ids in groups.items():
+            found, _ = self.shards[index].get_many_by_ids(shard_ids)
+            by_id.update((c.get_id(), c) for c in found)
+        found = [by_id[i] for i in ids if i in by_id]
+        missing = list(dict.fromkeys(i for i in ids if i not in by_id))
+        return found, missing
+
+    # d. Пагинация с k-путевым слиянием отсортированных шардов
+    @_reads
+    def get_k_n_short_list(
+        self,
+        k: int,
+        n: int,
+        filter_fn: Optional[Callable[[Client], bool]] = None,
+        sort_key: Optional[Callable[[Client], Any]] = None,
+        reverse: bool = False,
+    ) -> List[Client]:
+        if n <= 0 or k <= 0:
+            return []
+        if filter_fn is None and sort_key is None:
+            # Те же граничные условия, что и у ClientRepBase
+            count = self.get_count()
+            if not (count >= n and k <= count // n + 1):
+                return []
+
+        streams = []
+        for shard in self.shards:
+            part = shard.items
+            if filter_fn is not None:
+                part = [c for c in part if filter_fn(c)]
+            if sort_key is not None:
+                part = sorted(part, key=sort_key, reverse=reverse)
+            streams.append(part)
+
+        if sort_key is not None:
+            merged = heapq.merge(*streams, key=sort_key, reverse=reverse)
+        else:
+            merged = heapq.merge(*streams, key=self._order_key)
+        start = (k - 1) * n
+        return list(itertools.islice(merged, start, start + n))
+
+    # e. Сортировка: каждый шард отдельно, порядок общего списка — слиянием
+    @_writes
+    def sort_by(self, param: str = "last_name") -> None:
+        for shard in self.shards:
+            shard.sort_by(param)
+        self._order_key = SORT_KEYS.get(param, SORT_KEYS["last_name"])
+
+    def _is_unique(self, client: Client) -> bool:
+        return all(shard._is_unique(client) for shard in self.shards)
+
+    def _generate_new_id(self) -> int:
+        return max((shard._generate_new_id() for shard in self.shards), default=1)
+
+    # f. Добавить объект — переписывается только его шард
+    @_writes
+    def add(self, client: Client) -> Optional[int]:
+        if not self._is_unique(client):
+            return None
+        new_id = self._generate_new_id()
+        client.set_id(new_id)
+        shard = self._shard_for(new_id)
+        self._insert(shard, client)
+        shard._index_added(client)
+        shard.write_all()
+        return new_id
+
+    @_writes
+    def add_many(self, clients: Iterable[Client]) -> List[Optional[int]]:
+        next_id = self._generate_new_id()
+        touched = set()
+        ids: List[Optional[int]] = []
+        for client in clients:
+            if not self._is_unique(client):
+                ids.append(None)
+                continue
+            client.set_id(next_id)
+            index = self._shard_index(next_id)
+            self._insert(self.shards[index], client)
+            self.shards[index]._index_added(client)
+            touched.add(index)
+            ids.append(next_id)
+            next_id += 1
+
+        for index in touched:
+            self.shards[index].write_all()
+        return ids
+
+    # g. Заменить по ID
+    @_writes
+    def replace_by_id(self, client_id: int, new_client: Client) -> bool:
+        if client_id < 0 or not self._is_unique(new_client):
+            return False
+        shard = self._shard_for(client_id)
+        for i, c in enumerate(shard.items):
+            if c.get_id() == client_id:
+                new_client.set_id(client_id)
+                del shard._mutable_items()[i]
+                self._insert(shard, new_client)
+                shard._index_removed(c)
+                shard._index_added(new_client)
+                shard.write_all()
+                return True
+        return False
+
+    # h. Удалить по ID
+    @_writes
+    def delete_by_id(self, client_id: int) -> bool:
+        return self._shard_for(client_id).delete_by_id(client_id)
+
+    # Программа лояльности: переписываются только затронутые шарды
+    @_writes
+    def increment_haircuts(
+        self,
+        ids: Iterable[int],
+        by: int = 1,
+        tiers: Optional[Iterable[Tuple[int, int]]] = None,
+    ) -> int:
+        _check_increment(by)
+        tiers = _check_tiers(tiers) if tiers is not None else None
+        groups: Dict[int, set] = {}
+        for client_id in set(ids):
+            groups.setdefault(self._shard_index(client_id), set()).add(client_id)
+        candidates = [
+            c for index, shard_ids in groups.items()
+            for c in self.shards[index]._select_for_update(shard_ids)
+        ]
+        targets = self._without_collisions(candidates, by)
+
+        by_shard: Dict[int, List[Client]] = {}
+        for client in targets:
+            by_shard.setdefault(self._shard_index(client.get_id()), []).append(client)
+        for index, shard_targets in by_shard.items():
+            self.shards[index]._apply_increment(shard_targets, by, tiers)
+            self._restore_order(self.shards[index])
+            self.shards[index].write_all()
+        return len(targets)
+
+    @_writes
+    def recalculate_discounts(
+        self,
+        tiers: Iterable[Tuple[int, int]] = DISCOUNT_TIERS,
+        ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        ids = list(ids) if ids is not None else None
+        changed = 0
+        for shard in self.shards:
+            shard_changed = shard.recalculate_discounts(tiers, ids)
+            if shard_changed:
+                self._restore_order(shard)
+            changed += shard_changed
+        return changed
+
+    def _key_count(self, key: Tuple[str, int]) -> int:
+        return sum(shard._key_count(key) for shard in self.shards)
+
+    # i. Кол-во элементов
+    @_reads
+    def get_count(self) -> int:
+        return sum(shard.get_count() for shard in self.shards)
+
+    def iter_all(self) -> Iterator[Client]:
+        """
+        Слияние шардов в общем порядке. Списки всех шардов фиксируются
+        разом под блокировкой чтения (при первом next()), поэтому
+        изменения во время обхода его не затрагивают — как в ClientRepBase.
+        """
+        with self._read_locked():
+            order_key = self._order_key
+            shared = [(shard, shard._share_items()) for shard in self.shards]
+        try:
+            yield from heapq.merge(*(items for _, items in shared), key=order_key)
+        finally:
+            for shard, items in shared:
+                shard._release_items(items)
+
+    # j. Нечёткий поиск: у каждого шарда свой индекс, результаты сливаются
+    @_reads
+    def fuzzy_search(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = 0.3,
+    ) -> List[Tuple[Client, float]]:
+        matches = itertools.chain.from_iterable(
+            shard.fuzzy_search(query, limit, min_similarity) for shard in self.shards
+        )
+        return rank(query, matches, limit, client_names, Client.get_id)
+
+    def _load_from_storage(self) -> List[dict]:
+        return [c.to_dict() for c in self.iter_all()]
+
+    def _dump_to_storage(
+        self,
+        data: List[dict],
+        file_name: Optional[str] = None,
+    ) -> None:
+        if file_name is None:
+            # Без имени файла данные раскладываются по шардам
+            self.items = [Client(d) for d in data]
+            self.write_all()
+            return
+        # Единый файл (экспорт) пишется форматом шардов
+        self.shards[0]._dump_to_storage(data, file_name=file_name)
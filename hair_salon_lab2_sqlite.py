@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+import sqlite3
+
+from hair_salon_lab1_task9 import Client, ClientShort
+from hair_salon_lab2 import (
+    DISCOUNT_TIERS,
+    SHORT_FIELDS,
+    ClientRepBase,
+    DiscountTiers,
+    SqlFilter,
+    _FILTER_FIELDS,
+    _FILTER_OPS,
+    _check_field,
+    _check_increment,
+    _check_tiers,
+    _collect_by_ids,
+    _reads,
+    _unique_key,
+    _writes,
+)
+
+
+COLUMNS = "id, first_name, last_name, father_name, haircut_counter, discount"
+
+# Столбцы краткого вида (порядок аргументов ClientShort.from_trusted)
+SHORT_COLUMNS = ", ".join(SHORT_FIELDS)
+
+# Параметр sort_by -> столбец (те же имена, что и в SORT_KEYS)
+SORT_COLUMNS = {
+    "id": "id",
+    "haircut": "haircut_counter",
+    "discount": "discount",
+    "last_name": "last_name",
+}
+
+# SQLite ограничивает число параметров запроса — длинные списки ID делятся на части
+_MAX_PARAMS = 900
+
+# Строк за одно обращение к курсору в iter_all и iter_short
+_ITER_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id              INTEGER PRIMARY KEY,
+    first_name      TEXT    NOT NULL,
+    last_name       TEXT    NOT NULL,
+    father_name     TEXT    NOT NULL,
+    haircut_counter INTEGER NOT NULL,
+    discount        INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS clients_last_name_haircut_idx
+    ON clients (last_name, haircut_counter);
+CREATE INDEX IF NOT EXISTS clients_haircut_counter_idx ON clients (haircut_counter);
+CREATE INDEX IF NOT EXISTS clients_discount_idx ON clients (discount);
+"""
+
+
+def _where(filters: Optional[Iterable[SqlFilter]]) -> Tuple[str, list]:
+    """WHERE-часть из фильтров (поле, оператор, значение) с белым списком полей."""
+    conditions = []
+    params: list = []
+    for field, op, value in filters or ():
+        if field not in _FILTER_FIELDS:
+            raise ValueError(f"Неизвестное поле фильтра: {field}")
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Неподдерживаемый оператор фильтра: {op}")
+        conditions.append(f"{field} {op} ?")
+        params.append(value)
+    if not conditions:
+        return "", params
+    return " WHERE " + " AND ".join(conditions), params
+
+
+def _discount_case(tiers: DiscountTiers, counter: str) -> str:
+    """CASE-выражение со ступенями скидки (значения уже проверены _check_tiers)."""
+    if not tiers:
+        return "0"
+    whens = " ".join(
+        f"WHEN {counter} >= {threshold} THEN {discount}"
+        for threshold, discount in reversed(tiers)
+    )
+    return f"CASE {whens} ELSE 0 END"
+
+
+def _row_to_client(row: Tuple[Any, ...]) -> Client:
+    return Client({
+        "id": row[0],
+        "first_name": row[1],
+        "last_name": row[2],
+        "father_name": row[3],
+        "haircut_counter": row[4],
+        "discount": row[5],
+    })
+
+
+def _client_row(client: Client) -> Tuple[Any, ...]:
+    return (
+        client.get_first_name(),
+        client.get_last_name(),
+        client.get_father_name(),
+        client.get_haircut_counter(),
+        client.get_discount(),
+    )
+
+
+class ClientRepSqlite(ClientRepBase):
+    """
+    Встроенное хранилище на SQLite (журнал WAL).
+
+    Каждое изменение — отдельная транзакция, файл не переписывается целиком.
+    Уникальность (фамилия, количество стрижек) поддерживает уникальный индекс,
+    ID назначаются как max(id) + 1, как и в ClientRepBase. Пагинация,
+    фильтры (поле, оператор, значение) и сортировка выполняются в SQL.
+    """
+
+    # fuzzy_search: в индексе только ФИО, найденные клиенты читаются по ID
+    _fuzzy_keep_clients = False
+
+    def __init__(self, file_path: str = "clients.sqlite3") -> None:
+        self._conn: Optional[sqlite3.Connection] = None
+        # Столбец, задающий порядок для пагинации и обхода (см. sort_by)
+        self._order = "id"
+        super().__init__(file_path)
+
+    # Совместимость с ClientRepBase
+    @property
+    def items(self) -> List[Client]:
+        return list(self.iter_all())
+
+    @items.setter
+    def items(self, clients: List[Client]) -> None:
+        self._unique_keys = None
+        self._fuzzy_index = None
+        if self._conn is None:
+            return
+        try:
+            with self._conn:
+                self._conn.execute("DELETE FROM clients")
+                self._conn.executemany(
+                    f"INSERT INTO clients ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((c.get_id(),) + _client_row(c) for c in clients),
+                )
+        except sqlite3.IntegrityError as exc:
+            # Транзакция откатана, прежнее содержимое базы сохранено
+            raise ValueError(f"Клиенты нарушают уникальность ID или (фамилия, стрижки): {exc}") from exc
+
+    # a. Открытие базы: WAL, схема и индексы создаются при необходимости
+    @_writes
+    def read_all(self) -> None:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.file_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        self._order = "id"
+        self._fuzzy_index = None
+        self.load_errors = []
+
+    # b. Изменения фиксируются сразу; с file_name — копия базы в новый файл
+    @_reads
+    def write_all(self, file_name: Optional[str] = None) -> None:
+        if file_name is None:
+            self._conn.commit()
+            return
+        self._conn.execute("VACUUM INTO ?", (file_name,))
+
+    def close(self) -> None:
+        # Фоновая запись останавливается вне блокировки: её потоку нужно чтение
+        super().close()
+        with self.lock.write():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _select(self, tail: str = "", params: Iterable[Any] = ()) -> List[Client]:
+        rows = self._conn.execute(f"SELECT {COLUMNS} FROM clients{tail}", tuple(params))
+        return [_row_to_client(r) for r in rows]
+
+    # c. Получить объект по ID
+    @_reads
+    def get_by_id(self, client_id: int) -> Optional[Client]:
+        if client_id < 0:
+            return None
+        found = self._select(" WHERE id = ?", (client_id,))
+        return found[0] if found else None
+
+    @_reads
+    def get_many_by_ids(self, ids: Iterable[int]) -> Tuple[List[Client], List[int]]:
+        ids = list(ids)
+        wanted = sorted({i for i in ids if i >= 0})
+        by_id = {}
+        for start in range(0, len(wanted), _MAX_PARAMS):
+            part = wanted[start:start + _MAX_PARAMS]
+            marks = ", ".join("?" * len(part))
+            by_id.update((c.get_id(), c) for c in self._select(f" WHERE id IN ({marks})", part))
+        return _collect_by_ids(ids, by_id)
+
+    def _order_clause(self, column: str, reverse: bool = False) -> str:
+        direction = "DESC" if reverse else "ASC"
+        if column == "id":
+            return f" ORDER BY id {direction}"
+        return f" ORDER BY {column} {direction}, id"
+
+    # d. Пагинация: LIMIT/OFFSET в SQL, порядок — как задан sort_by
+    @_reads
+    def get_k_n_short_list(self, k: int, n: int) -> List[Client]:
+        return self.get_page(k, n)
+
+    # d''. Страница в кратком виде: читаются только столбцы ClientShort
+    @_reads
+    def get_short_list(self, k: int, n: int) -> List[ClientShort]:
+        return self.get_short_page(k, n)
+
+    # Страницы с фильтром и сортировкой в SQL (сверх интерфейса ClientRepBase)
+    @_reads
+    def get_page(
+        self,
+        k: int,
+        n: int,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        order_by: Optional[str] = None,
+        reverse: bool = False,
+    ) -> List[Client]:
+        """k-я страница по n клиентов среди подходящих под filters, в порядке order_by."""
+        page = self._page_query(k, n, filters, order_by, reverse)
+        return self._select(*page) if page is not None else []
+
+    @_reads
+    def get_short_page(
+        self,
+        k: int,
+        n: int,
+        filters: Optional[Iterable[SqlFilter]] = None,
+        order_by: Optional[str] = None,
+        reverse: bool = False,
+    ) -> List[ClientShort]:
+        """Как get_page, но в кратком виде: читаются только SHORT_COLUMNS."""
+        page = self._page_query(k, n, filters, order_by, reverse)
+        if page is None:
+            return []
+        tail, params = page
+        rows = self._conn.execute(f"SELECT {SHORT_COLUMNS} FROM clients{tail}", params)
+        return [ClientShort.from_trusted(*r) for r in rows]
+
+    def _page_query(
+        self,
+        k: int,
+        n: int,
+        filters: Optional[Iterable[SqlFilter]],
+        order_by: Optional[str],
+        reverse: bool,
+    ) -> Optional[Tuple[str, list]]:
+        """WHERE/ORDER BY/LIMIT для k-й страницы; None — страница заведомо пуста."""
+        if n <= 0 or k <= 0:
+            return None
+        if filters is None and order_by is None:
+            # Те же граничные условия, что и у ClientRepBase
+            count = self.get_count()
+            if not (count >= n and k <= count // n + 1):
+                return None
+        if order_by is not None:
+            _check_field(order_by)
+        where, params = _where(filters)
+        order = self._order_clause(order_by or self._order, reverse)
+        return where + order + " LIMIT ? OFFSET ?", params + [n, (k - 1) * n]
+
+    @_reads
+    def top_k(
+        self,
+        field: str,
+        k: int,
+        reverse: bool = False,
+        filter_fn: Any = None,
+        filters: Optional[Iterable[SqlFilter]] = None,
+    ) -> List[Client]:
+        """ORDER BY field LIMIT k по индексу; с filter_fn — общий алгоритм ClientRepBase."""
+        if filter_fn is not None:
+            return super().top_k(field, k, reverse=reverse, filter_fn=filter_fn, filters=filters)
+        if k <= 0:
+            return []
+        _check_field(field)
+        where, params = _where(filters)
+        return self._select(where + self._order_clause(field, reverse) + " LIMIT ?", params + [k])
+
+    # e. Сортировка: меняется только порядок выдачи, строки не переписываются
+    @_writes
+    def sort_by(self, param: str = "last_name") -> None:
+        self._order = SORT_COLUMNS.get(param, "last_name")
+
+    # Уникальность проверяет индекс (last_name, haircut_counter)
+    def _key_count(self, key: Tuple[str, int]) -> int:
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM clients WHERE last_name = ? AND haircut_counter = ?", key
+        ).fetchone()
+        return row[0]
+
+    def _is_unique(self, client: Client) -> bool:
+        return self._key_count(_unique_key(client)) <= 0
+
+    def _generate_new_id(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM clients").fetchone()
+        return row[0]
+
+    # f. Добавить объект
+    @_writes
+    def add(self, client: Client) -> Optional[int]:
+        return self.add_many([client])[0]
+
+    @_writes
+    def add_many(self, clients: Iterable[Client]) -> List[Optional[int]]:
+        """
+        Вставка пачкой в одной транзакции; None — клиент не уникален
+        (в базе или внутри пачки), как и в ClientRepBase. Прочие нарушения
+        ограничений не замалчиваются: sqlite3.IntegrityError откатывает пачку.
+        """
+        ids: List[Optional[int]] = []
+        added: List[Client] = []
+        with self._conn:
+            next_id = self._generate_new_id()
+            for client in clients:
+                # Проверка видит и строки, вставленные ранее в этой транзакции
+                if not self._is_unique(client):
+                    ids.append(None)
+                    continue
+                self._conn.execute(
+                    f"INSERT INTO clients ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                    (next_id,) + _client_row(client),
+                )
+                client.set_id(next_id)
+                added.append(client)
+                ids.append(next_id)
+                next_id += 1
+        # Индекс fuzzy_search — только после фиксации транзакции
+        for client in added:
+            self._index_added(client)
+        return ids
+
+    # g. Заменить по ID
+    @_writes
+    def replace_by_id(self, client_id: int, new_client: Client) -> bool:
+        if client_id < 0 or not self._is_unique(new_client):
+            return False
+        with self._conn:
+            cur = self._conn.execute(
+                "UPDATE clients SET first_name = ?, last_name = ?, father_name = ?, "
+                "haircut_counter = ?, discount = ? WHERE id = ?",
+                _client_row(new_client) + (client_id,),
+            )
+        if cur.rowcount == 0:
+            return False
+        new_client.set_id(client_id)
+        self._index_added(new_client)
+        return True
+
+    # h. Удалить по ID
+    @_writes
+    def delete_by_id(self, client_id: int) -> bool:
+        with self._conn:
+            cur = self._conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
+        if cur.rowcount and self._fuzzy_index is not None:
+            self._fuzzy_index.remove(client_id)
+        return cur.rowcount > 0
+
+    # h'. Программа лояльности одной транзакцией
+    @_writes
+    def increment_haircuts(
+        self,
+        ids: Iterable[int],
+        by: int = 1,
+        tiers: Optional[Iterable[Tuple[int, int]]] = None,
+    ) -> int:
+        """
+        Клиенты обновляются по убыванию haircut_counter с UPDATE OR IGNORE:
+        цепочка (Иванов, 3), (Иванов, 4) сдвигается целиком, а клиент,
+        чей новый ключ занят, пропускается — как в ClientRepBase.
+        """
+        _check_increment(by)
+        # by проверен как целое число и подставляется в запрос напрямую
+        counter = f"haircut_counter + {by}"
+        assignments = f"haircut_counter = {counter}"
+        if tiers is not None:
+            assignments += ", discount = " + _discount_case(_check_tiers(tiers), counter)
+        ids = [i for i in set(ids) if i >= 0]
+        with self._conn:
+            targets = []
+            for start in range(0, len(ids), _MAX_PARAMS):
+                part = ids[start:start + _MAX_PARAMS]
+                marks = ", ".join("?" * len(part))
+                targets.extend(self._conn.execute(
+                    f"SELECT id, haircut_counter FROM clients WHERE id IN ({marks})", part
+                ))
+            targets.sort(key=lambda r: r[1], reverse=True)
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"UPDATE OR IGNORE clients SET {assignments} WHERE id = ?",
+                ((client_id,) for client_id, _ in targets),
+            )
+            return self._conn.total_changes - before
+
+    @_writes
+    def recalculate_discounts(
+        self,
+        tiers: Iterable[Tuple[int, int]] = DISCOUNT_TIERS,
+        ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        case = _discount_case(_check_tiers(tiers), "haircut_counter")
+        query = f"UPDATE clients SET discount = {case} WHERE discount <> {case}"
+        with self._conn:
+            if ids is None:
+                return self._conn.execute(query).rowcount
+            ids = [i for i in set(ids) if i >= 0]
+            updated = 0
+            for start in range(0, len(ids), _MAX_PARAMS):
+                part = ids[start:start + _MAX_PARAMS]
+                marks = ", ".join("?" * len(part))
+                updated += self._conn.execute(query + f" AND id IN ({marks})", part).rowcount
+            return updated
+
+    # i. Кол-во элементов
+    @_reads
+    def get_count(self, filters: Optional[Iterable[SqlFilter]] = None) -> int:
+        where, params = _where(filters)
+        return self._conn.execute("SELECT COUNT(*) FROM clients" + where, params).fetchone()[0]
+
+    @_reads
+    def iter_all(self, filters: Optional[Iterable[SqlFilter]] = None) -> Iterator[Client]:
+        return self._iter_rows(self._scan(COLUMNS, filters), _row_to_client)
+
+    @_reads
+    def iter_short(self, filters: Optional[Iterable[SqlFilter]] = None) -> Iterator[ClientShort]:
+        """Обход в кратком виде: из базы читаются только SHORT_COLUMNS."""
+        cursor = self._scan(SHORT_COLUMNS, filters)
+        return self._iter_rows(cursor, lambda row: ClientShort.from_trusted(*row))
+
+    def _scan(self, columns: str, filters: Optional[Iterable[SqlFilter]]) -> sqlite3.Cursor:
+        where, params = _where(filters)
+        return self._conn.execute(
+            f"SELECT {columns} FROM clients{where}{self._order_clause(self._order)}", params
+        )
+
+    def _iter_rows(self, cursor: sqlite3.Cursor, make: Callable[[tuple], Any]) -> Iterator[Any]:
+        while True:
+            # Пачка строк — под блокировкой чтения, записи между пачками допустимы
+            with self._read_locked():
+                rows = cursor.fetchmany(_ITER_BATCH)
+            if not rows:
+                return
+            for row in rows:
+                yield make(row)
+
+    def _load_from_storage(self) -> List[dict]:
+        return [c.to_dict() for c in self.iter_all()]
+
+    def _dump_to_storage(
+        self,
+        data: List[dict],
+        file_name: Optional[str] = None,
+    ) -> None:
+        if file_name is None:
+            self.items = [Client(d) for d in data]
+            return
+        target = ClientRepSqlite(file_name)
+        target.items = [Client(d) for d in data]
+        target.close()
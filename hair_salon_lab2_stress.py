@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import random
+import sys
+import threading
+import time
+import traceback
+
+from hair_salon_lab1_task9 import Client
+from hair_salon_lab2 import ClientRepFileDecorator
+
+
+# Смесь операций стресс-теста (веса): половина — изменения, чтобы потоки
+# постоянно пересекались с записью файла
+DEFAULT_MIX: Dict[str, int] = {
+    "add": 15,
+    "replace_by_id": 8,
+    "delete_by_id": 5,
+    "increment_haircuts": 5,
+    "get_by_id": 20,
+    "page": 15,
+    "top_k": 8,
+    "get_count": 8,
+    "iter_all": 5,
+    "fuzzy_search": 5,
+    "filtered_page": 6,
+}
+
+_LETTERS = "абвгдежзиклмнопрстуфхцчшэюя"
+
+# Шаг количества стрижек между клиентами одного потока: increment_haircuts
+# по своим клиентам не приводит к совпадению (фамилия, количество стрижек)
+_HAIRCUT_STEP = 1000
+
+
+def _letters(number: int) -> str:
+    """Число буквами (имена клиентов допускают только буквы)."""
+    text = ""
+    while True:
+        number, digit = divmod(number, len(_LETTERS))
+        text = _LETTERS[digit] + text
+        if not number:
+            return text
+
+
+class StressReport:
+    """Итоги стресс-теста: число операций, исключения и нарушенные инварианты."""
+
+    def __init__(self) -> None:
+        self.operations: Counter = Counter()
+        self.errors: List[str] = []
+        self.violations: List[str] = []
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.violations
+
+    def count(self, operation: str) -> None:
+        with self._lock:
+            self.operations[operation] += 1
+
+    def error(self, message: str) -> None:
+        with self._lock:
+            self.errors.append(message)
+
+    def violation(self, message: str) -> None:
+        with self._lock:
+            self.violations.append(message)
+
+    def to_text(self, limit: int = 10) -> str:
+        total = sum(self.operations.values())
+        lines = [
+            f"Операций: {total} за {self.seconds:.2f} с, "
+            f"ошибок: {len(self.errors)}, нарушений инвариантов: {len(self.violations)}",
+        ]
+        lines.extend(f"  {name:<20} {count}" for name, count in self.operations.most_common())
+        lines.extend(f"  ОШИБКА: {message}" for message in self.errors[:limit])
+        lines.extend(f"  НАРУШЕНИЕ: {message}" for message in self.violations[:limit])
+        return "\n".join(lines)
+
+
+class _StressWorker:
+    """
+    Поток стресс-теста. Изменяет только своих клиентов (фамилия — по номеру
+    потока), поэтому точно знает, что должно оказаться в хранилище;
+    читает — всех.
+    """
+
+    def __init__(self, worker_id: int, repo: Any, report: StressReport, seed: int) -> None:
+        self.worker_id = worker_id
+        self.repo = repo
+        self.decorator = ClientRepFileDecorator(repo)
+        self.report = report
+        self.rng = random.Random(seed)
+        self.last_name = f"Стресс{_letters(worker_id)}".title()
+        self.seq = 0
+        # ID -> (фамилия, количество стрижек), которые должны быть в хранилище
+        self.expected: Dict[int, Tuple[str, int]] = {}
+        self.deleted: List[int] = []
+
+    def _new_client(self) -> Client:
+        self.seq += 1
+        return Client({
+            "first_name": "Поток",
+            "last_name": self.last_name,
+            "father_name": "Стрессович",
+            "haircut_counter": self.seq * _HAIRCUT_STEP,
+            "discount": self.rng.randint(0, 30),
+        })
+
+    def _own_id(self) -> Optional[int]:
+        return self.rng.choice(list(self.expected)) if self.expected else None
+
+    def _check(self, condition: bool, message: str) -> None:
+        if not condition:
+            self.report.violation(f"поток {self.worker_id}: {message}")
+
+    def _check_unique_ids(self, clients: List[Client], operation: str) -> None:
+        ids = [c.get_id() for c in clients]
+        self._check(len(ids) == len(set(ids)), f"{operation} вернул повторяющиеся ID")
+
+    # Операции
+    def op_add(self) -> None:
+        client = self._new_client()
+        new_id = self.repo.add(client)
+        self._check(new_id is not None, "add отклонил уникального клиента")
+        if new_id is not None:
+            self.expected[new_id] = (client.get_last_name(), client.get_haircut_counter())
+
+    def op_replace_by_id(self) -> None:
+        client_id = self._own_id()
+        if client_id is None:
+            return
+        client = self._new_client()
+        self._check(self.repo.replace_by_id(client_id, client), f"replace_by_id({client_id}) не выполнен")
+        self.expected[client_id] = (client.get_last_name(), client.get_haircut_counter())
+
+    def op_delete_by_id(self) -> None:
+        client_id = self._own_id()
+        if client_id is None:
+            return
+        self._check(self.repo.delete_by_id(client_id), f"delete_by_id({client_id}) не выполнен")
+        del self.expected[client_id]
+        self.deleted.append(client_id)
+
+    def op_increment_haircuts(self) -> None:
+        ids = list(self.expected)[:5]
+        updated = self.repo.increment_haircuts(ids)
+        self._check(updated == len(ids), f"increment_haircuts обновил {updated} из {len(ids)}")
+        for client_id in ids:
+            last_name, haircuts = self.expected[client_id]
+            self.expected[client_id] = (last_name, haircuts + 1)
+
+    def op_get_by_id(self) -> None:
+        client_id = self._own_id()
+        if client_id is None:
+            return
+        client = self.repo.get_by_id(client_id)
+        self._check(client is not None, f"get_by_id({client_id}) не нашёл своего клиента")
+        if client is not None:
+            key = (client.get_last_name(), client.get_haircut_counter())
+            self._check(key == self.expected[client_id], f"get_by_id({client_id}) вернул {key}")
+
+    def op_page(self) -> None:
+        page = self.repo.get_k_n_short_list(self.rng.randint(1, 5), 20)
+        self._check_unique_ids(page, "get_k_n_short_list")
+
+    def op_top_k(self) -> None:
+        top = self.repo.top_k("haircut_counter", 10, reverse=True)
+        counters = [c.get_haircut_counter() for c in top]
+        self._check(counters == sorted(counters, reverse=True), "top_k вернул неупорядоченный список")
+
+    def op_get_count(self) -> None:
+        self._check(self.repo.get_count() >= len(self.expected), "get_count меньше числа своих клиентов")
+
+    def op_iter_all(self) -> None:
+        self._check_unique_ids(list(self.repo.iter_all()), "iter_all")
+
+    def op_fuzzy_search(self) -> None:
+        for client, score in self.repo.fuzzy_search(self.last_name, limit=5):
+            self._check(0 < score <= 1, f"fuzzy_search вернул сходство {score}")
+
+    def op_filtered_page(self) -> None:
+        last_name = self.last_name
+        page = self.decorator.get_k_n_short_list(
+            1, 20, filter_fn=lambda c: c.get_last_name() == last_name,
+        )
+        self._check_unique_ids(page, "ClientRepFileDecorator.get_k_n_short_list")
+        self._check(all(c.get_last_name() == last_name for c in page), "фильтр декоратора пропустил чужих")
+
+    def run(self, operations: int, mix: Dict[str, int], start: threading.Barrier) -> None:
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        start.wait()
+        for _ in range(operations):
+            name = self.rng.choices(names, weights)[0]
+            try:
+                getattr(self, f"op_{name}")()
+            except Exception:  # noqa: BLE001
+                self.report.error(f"поток {self.worker_id}, {name}: {traceback.format_exc(limit=3)}")
+            self.report.count(name)
+
+
+def check_invariants(
+    repo: Any,
+    workers: List[_StressWorker],
+    initial: Dict[int, Tuple[str, int]],
+    reopen: Optional[Callable[[], Any]],
+    report: StressReport,
+) -> None:
+    """
+    Проверка состояния после стресс-теста: ID и ключи (фамилия, количество
+    стрижек) уникальны, get_count совпадает с обходом, у каждого потока
+    сохранены ровно его изменения, исходные клиенты не пострадали и,
+    если задан reopen, файл после повторного открытия совпадает с памятью
+    (т.е. ни одна запись не потеряна).
+    """
+    state = {c.get_id(): (c.get_last_name(), c.get_haircut_counter()) for c in repo.iter_all()}
+    ids = [c.get_id() for c in repo.iter_all()]
+    if len(ids) != len(set(ids)):
+        report.violation("в хранилище есть повторяющиеся ID")
+    keys = Counter(state.values())
+    duplicates = [key for key, count in keys.items() if count > 1]
+    if duplicates:
+        report.violation(f"повторяющиеся (фамилия, количество стрижек): {duplicates[:5]}")
+    if repo.get_count() != len(state):
+        report.violation(f"get_count() = {repo.get_count()}, а клиентов при обходе {len(state)}")
+
+    expected = dict(initial)
+    for worker in workers:
+        expected.update(worker.expected)
+    # ID назначаются как max + 1, поэтому освобождённый ID может занять
+    # клиент другого потока — тогда он есть в expected
+    for worker in workers:
+        for client_id in worker.deleted:
+            if client_id in state and client_id not in expected:
+                report.violation(f"удалённый клиент {client_id} остался в хранилище")
+    for client_id, key in expected.items():
+        if state.get(client_id) != key:
+            report.violation(f"клиент {client_id}: ожидалось {key}, в хранилище {state.get(client_id)}")
+    if len(state) != len(expected):
+        report.violation(f"клиентов {len(state)}, ожидалось {len(expected)}")
+
+    if reopen is not None:
+        repo.flush()
+        reopened = reopen()
+        stored = {c.get_id(): (c.get_last_name(), c.get_haircut_counter()) for c in reopened.iter_all()}
+        if stored != state:
+            lost = len(set(state.items()) - set(stored.items()))
+            report.violation(f"файл расходится с памятью: не записано {lost} клиентов")
+        reopened.close()
+
+
+def run_stress(
+    repo: Any,
+    threads: int = 8,
+    operations: int = 300,
+    initial: int = 200,
+    mix: Optional[Dict[str, int]] = None,
+    reopen: Optional[Callable[[], Any]] = None,
+    seed: int = 0,
+) -> StressReport:
+    """
+    Запускает threads потоков, каждый выполняет operations случайных операций
+    из mix над общим repo, затем проверяет инварианты (check_invariants).
+    Пустое хранилище сначала заполняется initial клиентами.
+    """
+    report = StressReport()
+    if repo.get_count() == 0 and initial > 0:
+        repo.add_many(
+            Client({
+                "first_name": "Исходный",
+                "last_name": f"Клиент{_letters(i)}".title(),
+                "father_name": "Исходович",
+                "haircut_counter": i,
+                "discount": 0,
+            })
+            for i in range(initial)
+        )
+    before = {c.get_id(): (c.get_last_name(), c.get_haircut_counter()) for c in repo.iter_all()}
+
+    workers = [_StressWorker(i, repo, report, seed + i) for i in range(threads)]
+    start = threading.Barrier(threads)
+    pool = [
+        threading.Thread(target=w.run, args=(operations, mix or DEFAULT_MIX, start), name=f"stress-{i}")
+        for i, w in enumerate(workers)
+    ]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    report.seconds = time.perf_counter() - started
+
+    check_invariants(repo, workers, before, reopen, report)
+    return report
+
+
+def open_repository(backend: str, path: str) -> Any:
+    import hair_salon_lab2 as lab2
+
+    if backend == "json":
+        return lab2.ClientRepJson(path)
+    if backend == "yaml":
+        return lab2.ClientRepYaml(path)
+    if backend == "sqlite":
+        from hair_salon_lab2_sqlite import ClientRepSqlite
+
+        return ClientRepSqlite(path)
+    if backend == "bounded":
+        from hair_salon_lab2_bounded import ClientRepBounded
+
+        return ClientRepBounded(path, max_resident=100)
+    if backend == "sharded":
+        from hair_salon_lab2_sharded import ClientRepSharded
+
+        return ClientRepSharded(path, shard_count=4)
+    raise ValueError(f"Неизвестное хранилище: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Стресс-тест потокобезопасности репозиториев клиентов")
+    parser.add_argument("--backend", choices=("json", "yaml", "sqlite", "bounded", "sharded"), default="json")
+    parser.add_argument("--path", default="clients_stress.json")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=300, help="операций на поток")
+    parser.add_argument("--initial", type=int, default=200)
+    parser.add_argument("--write-behind", action="store_true", help="включить отложенную запись")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    repository = open_repository(args.backend, args.path)
+    if args.write_behind:
+        repository.enable_write_behind()
+    result = run_stress(
+        repository,
+        threads=args.threads,
+        operations=args.operations,
+        initial=args.initial,
+        reopen=lambda: open_repository(args.backend, args.path),
+        seed=args.seed,
+    )
+    repository.close()
+    print(result.to_text())
+    sys.exit(0 if result.ok else 1)
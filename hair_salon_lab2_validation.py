@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import re
+
+from hair_salon_lab1_task9 import Client, ClientShort
+
+
+NAME_FIELDS = ("last_name", "first_name", "father_name")
+SHORT_FIELDS = NAME_FIELDS + ("haircut_counter",)
+# Порядок полей как в Client._init_from_data — для одинаковых сообщений об ошибках
+CLIENT_FIELDS = ("first_name", "last_name", "father_name", "haircut_counter", "discount")
+
+_MISSING = object()
+
+# Заведомо корректное ФИО: только кириллица/латиница и пробелы, не меньше двух букв.
+# Всё остальное (в том числе редкие буквы других алфавитов) проверяет штатный валидатор.
+_NAME_PATTERN = re.compile(r" *[A-Za-zА-Яа-яЁё](?: *[A-Za-zА-Яа-яЁё])+ *")
+
+
+class BatchValidationReport:
+    """
+    Результат пакетной проверки записей.
+
+    valid_rows / valid_indices — корректные записи и их номера во входных данных,
+    errors — номер записи -> список ошибок (все ошибки записи, а не только первая),
+    ids / duplicates — заполняются import_clients после вставки в репозиторий.
+    """
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.valid_rows: List[dict] = []
+        self.valid_indices: List[int] = []
+        self.errors: Dict[int, List[str]] = {}
+        self.ids: List[int] = []
+        self.duplicates: List[int] = []
+
+    def add_error(self, index: int, message: str) -> None:
+        self.errors.setdefault(index, []).append(message)
+
+    @property
+    def invalid_count(self) -> int:
+        return len(self.errors)
+
+    def is_ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        lines = [
+            f"Всего записей: {self.total}, корректных: {len(self.valid_rows)}, "
+            f"с ошибками: {self.invalid_count}, дубликатов: {len(self.duplicates)}"
+        ]
+        for index in sorted(self.errors):
+            lines.append(f"  {index}: {'; '.join(self.errors[index])}")
+        return "\n".join(lines)
+
+
+def _exact_error(validator: Callable[..., None], *args: Any) -> Optional[str]:
+    """Текст ошибки штатного валидатора Client (None, если значение корректно)."""
+    try:
+        validator(*args)
+    except ValueError as exc:
+        return str(exc)
+    return None
+
+
+# Быстрые проверки значений допустимого типа: True — значение заведомо корректно
+def _name_ok(value: str) -> bool:
+    return _NAME_PATTERN.fullmatch(value) is not None
+
+
+def _haircut_ok(value: int) -> bool:
+    return value >= 0
+
+
+def _discount_ok(value: float) -> bool:
+    return 0 <= value <= 100
+
+
+# Поле -> (допустимые типы, быстрая проверка, штатный валидатор Client,
+# передаётся ли валидатору имя поля)
+_COLUMN_CHECKS: Dict[str, Tuple[Tuple[type, ...], Callable[[Any], bool], Callable[..., None], bool]] = {
+    "last_name": ((str,), _name_ok, ClientShort._validate_name, True),
+    "first_name": ((str,), _name_ok, ClientShort._validate_name, True),
+    "father_name": ((str,), _name_ok, ClientShort._validate_name, True),
+    "haircut_counter": ((int,), _haircut_ok, ClientShort._validate_haircut_counter, False),
+    "discount": ((int, float), _discount_ok, Client._validate_discount, False),
+}
+
+
+def _check_column(values: List[Any], field: str) -> Iterator[Tuple[int, str]]:
+    """
+    Проверка столбца: корректные значения отсеиваются быстрой проверкой,
+    к штатному валидатору Client обращаемся только для подозрительных —
+    ради точного текста ошибки.
+    """
+    types, ok, validator, pass_field = _COLUMN_CHECKS[field]
+    # Имена и счётчики сильно повторяются: быстрая проверка — по разу на значение.
+    # Тип сверяется точно (type, а не isinstance), поэтому True не сойдёт за 1
+    good = {v for v in {v for v in values if type(v) in types} if ok(v)}
+    suspicious = [
+        i for i, v in enumerate(values)
+        if v is not _MISSING and not (type(v) in types and v in good)
+    ]
+    for i in suspicious:
+        args = (values[i], field) if pass_field else (values[i],)
+        message = _exact_error(validator, *args)
+        if message is not None:
+            yield i, message
+
+
+def _as_record(row: Any) -> dict:
+    """Запись как dict: принимает dict или JSON-строку, как и конструктор Client."""
+    if isinstance(row, dict):
+        return row
+    if isinstance(row, str):
+        try:
+            data = json.loads(row)
+        except json.JSONDecodeError:
+            raise ValueError("Некорректный JSON формат")
+        if isinstance(data, dict):
+            return data
+    raise ValueError("Не поддерживаемый тип аргумента")
+
+
+def validate_rows(rows: Iterable[Any], short: bool = False) -> BatchValidationReport:
+    """
+    Пакетная проверка данных для Client (или ClientShort при short=True).
+
+    Поля проверяются по столбцам, ошибки собираются по всем записям,
+    исключение на первой некорректной записи не выбрасывается.
+    """
+    rows = list(rows)
+    report = BatchValidationReport(len(rows))
+    fields = SHORT_FIELDS if short else CLIENT_FIELDS
+    required = frozenset(fields)
+
+    records: List[Optional[dict]] = []
+    for i, row in enumerate(rows):
+        try:
+            record = _as_record(row)
+        except ValueError as exc:
+            report.add_error(i, str(exc))
+            records.append(None)
+            continue
+        if not required <= record.keys():
+            missing = [f for f in fields if f not in record]
+            report.add_error(i, f"Отсутствуют обязательные поля: {missing}")
+        records.append(record)
+
+    for field in fields:
+        column = [
+            _MISSING if r is None else r.get(field, _MISSING)
+            for r in records
+        ]
+        for i, message in _check_column(column, field):
+            report.add_error(i, message)
+
+    for i, record in enumerate(records):
+        if record is not None and i not in report.errors:
+            report.valid_rows.append(record)
+            report.valid_indices.append(i)
+    return report
+
+
+def import_clients(repo: Any, rows: Iterable[Any]) -> BatchValidationReport:
+    """
+    Проверяет записи пачкой и добавляет в репозиторий только корректные
+    одним вызовом repo.add_many (ClientRepBase, ClientRepDB или их декораторы).
+    """
+    report = validate_rows(rows)
+    # Записи уже проверены validate_rows; ID всё равно назначит add_many
+    clients = [
+        Client.from_trusted(
+            r["last_name"], r["first_name"], r["father_name"], r["haircut_counter"], r["discount"],
+        )
+        for r in report.valid_rows
+    ]
+    if not clients:
+        return report
+
+    for index, new_id in zip(report.valid_indices, repo.add_many(clients)):
+        if new_id is None:
+            report.duplicates.append(index)
+        else:
+            report.ids.append(new_id)
+    return report
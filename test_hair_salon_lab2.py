@@ -0,0 +1,583 @@
+import csv
+import json
+import random
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+import hair_salon_lab2
+from hair_salon_lab1_task9 import Client, ClientShort
+from hair_salon_lab2 import (
+    ClientRepDB,
+    ClientRepDBAdapter,
+    ClientRepFileDecorator,
+    ClientRepJson,
+    DeadlineExceededError,
+    LockTimeoutError,
+    QueryPolicy,
+    ReplicaRouter,
+    RetriesExhaustedError,
+    StatementTimeoutError,
+    _build_where,
+    _filters_to_predicate,
+    _select_page,
+)
+from hair_salon_lab2_export import export_repository
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    path = tmp_path / "clients.json"
+    path.write_text("[]", encoding="utf-8")
+    return str(path)
+
+
+def test_client_id_and_to_dict_round_trip(make_client):
+    client = Client({"id": 7, "first_name": "Анна", "last_name": "Петрова",
+                     "father_name": "Сергеевна", "haircut_counter": 3, "discount": 5})
+    assert client.get_id() == 7
+    assert Client(client.to_dict()).to_dict() == client.to_dict()
+
+    client.set_id(8)
+    assert client.to_dict()["id"] == 8
+    with pytest.raises(ValueError):
+        client.set_id(-1)
+    assert make_client("Петров").get_id() is None
+
+
+def test_json_add_replace_delete_persist(json_path, make_client):
+    repo = ClientRepJson(json_path)
+    first = repo.add(make_client("Иванов"))
+    second = repo.add(make_client("Петров", 4))
+    assert (first, second) == (1, 2)
+    # Дубликат по (фамилия, число стрижек) не добавляется
+    assert repo.add(make_client("Иванов")) is None
+
+    assert repo.replace_by_id(second, make_client("Сидоров", 6, 5))
+    assert repo.delete_by_id(first)
+    assert not repo.delete_by_id(first)
+
+    reopened = ClientRepJson(json_path)
+    assert reopened.get_count() == 1
+    stored = reopened.get_by_id(second)
+    assert stored.get_last_name() == "Сидоров"
+    assert stored.get_id() == second
+    assert reopened.get_by_id(first) is None
+
+
+def test_json_add_many_and_get_many_by_ids(json_path, make_client):
+    repo = ClientRepJson(json_path)
+    ids = repo.add_many([make_client("Иванов", i) for i in range(5)])
+    assert ids == [1, 2, 3, 4, 5]
+
+    found, missing = repo.get_many_by_ids([4, 99, 1])
+    assert [c.get_id() for c in found] == [4, 1]
+    assert missing == [99]
+
+    decorator = ClientRepFileDecorator(ClientRepJson(json_path))
+    found, missing = decorator.get_many_by_ids([1, 2, 3], filter_fn=lambda c: c.get_haircut_counter() > 0)
+    assert [c.get_id() for c in found] == [2, 3]
+    assert missing == []
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "json", "csv"])
+def test_export_repository(json_path, tmp_path, fmt, make_client):
+    repo = ClientRepJson(json_path)
+    repo.add_many([make_client("Иванов", i, i) for i in range(3)])
+    out = tmp_path / f"export.{fmt}"
+
+    stats = export_repository(repo, str(out), fmt=fmt)
+
+    assert stats.rows == 3
+    text = out.read_text(encoding="utf-8")
+    if fmt == "jsonl":
+        rows = [json.loads(line) for line in text.splitlines()]
+    elif fmt == "json":
+        rows = json.loads(text)
+    else:
+        rows = [
+            {k: (int(v) if k in ("id", "haircut_counter", "discount") else v) for k, v in r.items()}
+            for r in csv.DictReader(text.splitlines())
+        ]
+    assert rows == [c.to_dict() for c in repo.items]
+
+
+def test_json_concurrent_stress(json_path):
+    from hair_salon_lab2_stress import run_stress
+
+    report = run_stress(ClientRepJson(json_path), threads=4, operations=50, initial=40)
+    assert report.ok, (report.errors, report.violations)
+
+
+def test_count_cache_key_accepts_unhashable_filter_values():
+    from hair_salon_lab2 import _filters_key
+
+    a = _filters_key([("haircut_counter", ">", [1, 2]), ("last_name", "=", "Иванов")])
+    b = _filters_key([("last_name", "=", "Иванов"), ("haircut_counter", ">", [1, 2])])
+    assert a == b and hash(a) == hash(b)
+    assert _filters_key([("last_name", "=", bytearray(b"x"))]) is None
+
+
+@pytest.mark.parametrize("load_workers", [1, 2])
+def test_load_collects_errors_in_every_mode(tmp_path, load_workers, make_client):
+    records = [make_client("Иванов", i).to_dict() for i in range(6)]
+    for i, record in enumerate(records, 1):
+        record["id"] = i
+    records[1]["haircut_counter"] = -1
+    records[4]["first_name"] = ""
+    path = tmp_path / "clients.json"
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+
+    repo = ClientRepJson(str(path), load_workers=load_workers, chunk_size=2)
+
+    assert [c.get_id() for c in repo.items] == [1, 3, 4, 6]
+    assert [row for row, _ in repo.load_errors] == [1, 4]
+    assert repo.items[2] == Client(records[3]) and repo.items[2].get_id() == 4
+
+
+def test_iter_all_streams_without_copy_and_ignores_concurrent_writes(json_path, make_client):
+    repo = ClientRepJson(json_path)
+    repo.add_many([make_client("Иванов", i) for i in range(4)])
+    items = repo.items
+
+    stream = repo.iter_all()
+    assert next(stream).get_id() == 1
+    repo.delete_by_id(2)
+    repo.add(make_client("Петров"))
+
+    # Обход продолжается по исходному списку, изменения ушли в копию
+    assert [c.get_id() for c in stream] == [2, 3, 4]
+    assert repo.items is not items
+    assert [c.get_id() for c in repo.items] == [1, 3, 4, 5]
+
+    # Без активного обхода список меняется на месте
+    current = repo.items
+    repo.add(make_client("Сидоров"))
+    assert repo.items is current
+
+
+def test_client_view_setters_materialize_client(make_client):
+    from hair_salon_lab2 import ClientView
+
+    view = ClientView((3, "Иван", "Иванов", "Иванович", 4, 0))
+    assert view == make_client("Иванов", 4)
+    view.set_haircut_counter(5)
+    assert view.get_haircut_counter() == 5
+    assert view.to_client().get_id() == 3
+    with pytest.raises(ValueError):
+        view.set_haircut_counter(-1)
+
+
+def test_write_behind_coalesces_and_releases_repository(json_path, make_client):
+    import gc
+    import time
+    import weakref
+
+    repo = ClientRepJson(json_path)
+    flusher = repo.enable_write_behind(interval_ms=10_000)
+    for i in range(5):
+        repo.add(make_client("Иванов", i))
+    assert ClientRepJson(json_path).get_count() == 0
+
+    repo.flush()
+    assert ClientRepJson(json_path).get_count() == 5
+    assert (flusher.metrics.flushes, flusher.metrics.coalesced_writes) == (1, 4)
+
+    # Без close() репозиторий не удерживается ни потоком, ни atexit
+    ref, thread = weakref.ref(repo), flusher._thread
+    del repo, flusher
+    deadline = time.monotonic() + 5
+    while ref() is not None and time.monotonic() < deadline:
+        gc.collect()
+        time.sleep(0.05)
+    assert ref() is None
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_import_does_not_load_storage_backends():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, hair_salon_lab2, hair_salon_lab2_sqlite, hair_salon_lab2_bounded; "
+        "print(sorted(m for m in ('psycopg2', 'yaml') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_reads_route_to_replicas_except_on_primary():
+    repo = ClientRepDB(db=None, replicas=ReplicaRouter(["r1", "r2"]))
+    assert repo._routes_to_replica("get_all")
+    assert not repo._routes_to_replica("add")
+    with repo.primary():
+        assert not repo._routes_to_replica("get_all")
+    assert repo._routes_to_replica("get_all")
+    assert not ClientRepDB(db=None)._routes_to_replica("get_all")
+
+
+def test_replica_candidates_rotate_and_skip_down_replicas():
+    router = ReplicaRouter(["r1", "r2", "r3"])
+    dsns = lambda: [r.dsn for r in router._candidates()]
+    assert dsns() == ["r1", "r2", "r3"]
+    assert dsns() == ["r2", "r3", "r1"]
+    router.replicas[2].down_until = float("inf")
+    assert dsns() == ["r1", "r2"]
+
+    busy = ReplicaRouter(["r1", "r2", "r3"], strategy="least_busy")
+    busy.replicas[0].in_flight = 2
+    busy.replicas[1].in_flight = 1
+    assert [r.dsn for r in busy._candidates()] == ["r3", "r2", "r1"]
+
+
+class PrimaryOnlyRepo:
+    """ClientRepDB для адаптера: чтения и записи допускаются только на primary."""
+
+    def __init__(self, clients):
+        self.clients = {i: c for i, c in enumerate(clients, start=1)}
+        self.on_primary = False
+        self.transactions = []
+
+    @contextmanager
+    def primary(self):
+        previous, self.on_primary = self.on_primary, True
+        try:
+            yield self
+        finally:
+            self.on_primary = previous
+
+    def run_in_transaction(self, name, call):
+        self.transactions.append(name)
+        with self.primary():
+            return call()
+
+    def get_all(self, lazy=False):
+        assert self.on_primary
+        for client_id, client in self.clients.items():
+            client.set_id(client_id)
+        return list(self.clients.values())
+
+    def delete_many_by_ids(self, ids):
+        assert self.on_primary
+        for client_id in ids:
+            del self.clients[client_id]
+        return len(ids)
+
+    def add_many(self, clients):
+        assert self.on_primary
+        start = max(self.clients, default=0) + 1
+        ids = list(range(start, start + len(clients)))
+        self.clients.update(zip(ids, clients))
+        return ids
+
+
+def test_db_adapter_reads_and_syncs_on_primary(make_client):
+    db_repo = PrimaryOnlyRepo([make_client("Иванов"), make_client("Петров")])
+    adapter = ClientRepDBAdapter(db_repo)
+    assert [c.get_last_name() for c in adapter.items] == ["Иванов", "Петров"]
+
+    adapter.items = [adapter.items[1], make_client("Сидоров")]
+    adapter.write_all()
+    assert db_repo.transactions == ["write_all"]
+    assert sorted(c.get_last_name() for c in db_repo.clients.values()) == ["Петров", "Сидоров"]
+    assert [c.get_id() for c in adapter.items] == [2, 3]
+
+
+def test_stream_connections_are_reused_per_thread():
+    class Conn:
+        closed = False
+
+    class Target:
+        opened = 0
+
+        def open_dedicated(self):
+            Target.opened += 1
+            return Conn()
+
+    repo = ClientRepDB(db=None)
+    target = Target()
+    with repo._stream_connection(target) as first:
+        with repo._stream_connection(target) as nested:
+            assert nested is not first
+    with repo._stream_connection(target) as again:
+        assert again in (first, nested)
+    assert Target.opened == 2
+
+    again.closed = True
+    with repo._stream_connection(target) as reused:
+        assert reused is not again
+    assert Target.opened == 2
+
+
+def test_increment_moves_whole_chain_and_skips_blocked_keys(json_path, make_client):
+    repo = ClientRepJson(json_path)
+    repo.add_many([
+        make_client("Иванов", 3),
+        make_client("Иванов", 4),
+        make_client("Петров", 5),
+        make_client("Петров", 6),
+    ])
+    chain, blocked = repo.items[:2], repo.items[2]
+    assert repo._without_collisions(chain + [blocked], 1) == chain
+
+    assert repo.increment_haircuts([1, 2, 3], tiers=((5, 5),)) == 2
+    counters = {c.get_id(): (c.get_haircut_counter(), c.get_discount()) for c in repo.items}
+    assert counters == {1: (4, 0), 2: (5, 5), 3: (5, 0), 4: (6, 0)}
+
+    assert repo.recalculate_discounts(tiers=((5, 5),)) == 2
+    assert repo.recalculate_discounts(tiers=((5, 5),)) == 0
+    assert [c.get_discount() for c in ClientRepJson(json_path).items] == [0, 5, 5, 5]
+
+
+def test_filters_accept_only_whitelisted_fields_and_operators(make_client):
+    matches = _filters_to_predicate([("last_name", "=", "Иванов"), ("haircut_counter", ">=", 3)])
+    assert matches(make_client("Иванов", 3))
+    assert not matches(make_client("Иванов", 2))
+    assert not matches(make_client("Петров", 5))
+    assert _filters_to_predicate([]) is None
+
+    for bad in ([("id; DROP TABLE clients", "=", 1)], [("discount", "LIKE", "%")]):
+        with pytest.raises(ValueError):
+            _filters_to_predicate(bad)
+        with pytest.raises(ValueError):
+            _build_where(bad)
+
+
+@pytest.mark.parametrize("reltuples, relpages, expected", [
+    (-1.0, 0, None),    # PostgreSQL 14+: таблица ещё не анализировалась
+    (0.0, 0, None),     # до 14: то же самое
+    (1234.0, 10, 1234),
+])
+def test_approx_count_treats_unanalyzed_table_as_unknown(reltuples, relpages, expected):
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, query, params=None):
+            pass
+
+        def fetchone(self):
+            return reltuples, relpages
+
+    class Connection:
+        def cursor(self):
+            return Cursor()
+
+    class Database:
+        def get_connection(self):
+            return Connection()
+
+    repo = ClientRepDB(Database(), count_strategy="approx")
+    assert repo._count_approx() == expected
+
+
+def test_db_adapter_applies_notify_deltas_in_place(make_client):
+    db_repo = PrimaryOnlyRepo([make_client("Иванов", 1), make_client("Петров", 2), make_client("Сидоров", 3)])
+    adapter = ClientRepDBAdapter(db_repo)
+
+    def row(client_id, last_name, haircut_counter):
+        return {**make_client(last_name, haircut_counter).to_dict(), "id": client_id}
+
+    adapter.apply_change("INSERT", 4, row(4, "Кузнецов", 4))
+    adapter.apply_change("UPDATE", 2, row(2, "Петров", 7))
+    adapter.apply_change("DELETE", 1, None)
+    adapter.apply_change("DELETE", 99, None)
+    state = [(c.get_id(), c.get_last_name(), c.get_haircut_counter()) for c in adapter.items]
+    assert state == [(2, "Петров", 7), (3, "Сидоров", 3), (4, "Кузнецов", 4)]
+    assert adapter._id_positions() == {2: 0, 3: 1, 4: 2}
+    # Индекс уникальности следует за изменениями
+    assert not adapter._is_unique(make_client("Петров", 7))
+    assert adapter._is_unique(make_client("Петров", 2))
+    assert adapter._is_unique(make_client("Иванов", 1))
+
+    adapter.apply_change("TRUNCATE", None, None)
+    assert adapter.items == []
+    adapter.apply_change("RESYNC", None, None)
+    assert [c.get_id() for c in adapter.items] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("field", ["id", "last_name", "haircut_counter", "discount"])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_top_k_matches_stable_sort(json_path, field, reverse, make_client):
+    rng = random.Random(5)
+    repo = ClientRepJson(json_path)
+    repo.add_many([
+        make_client(rng.choice(["Иванов", "Петров", "Сидоров"]), i, rng.choice([0, 5, 10]))
+        for i in range(60)
+    ])
+    key = lambda c: getattr(c, f"get_{field}")()  # noqa: E731
+    for k in (0, 1, 7, 60, 100):
+        expected = sorted(repo.items, key=key, reverse=reverse)[:k]
+        assert repo.top_k(field, k, reverse=reverse) == expected
+
+    even = lambda c: c.get_haircut_counter() % 2 == 0  # noqa: E731
+    selected = [c for c in repo.items if c.get_discount() >= 5 and even(c)]
+    expected = sorted(selected, key=key, reverse=reverse)[:5]
+    assert repo.top_k(field, 5, reverse, filter_fn=even, filters=[("discount", ">=", 5)]) == expected
+
+
+def test_select_page_matches_full_sort_and_closes_stream(make_client):
+    rng = random.Random(11)
+    clients = [make_client("Иванов", i, rng.choice([0, 5, 10])) for i in range(50)]
+    discount = lambda c: c.get_discount()  # noqa: E731
+    has_discount = lambda c: c.get_discount() > 0  # noqa: E731
+    for k, n in ((1, 10), (3, 7), (8, 7), (20, 5)):
+        start = (k - 1) * n
+        assert _select_page(clients, k, n) == clients[start:start + n]
+        for reverse in (False, True):
+            expected = sorted(filter(has_discount, clients), key=discount, reverse=reverse)
+            page = _select_page(clients, k, n, has_discount, discount, reverse)
+            assert page == expected[start:start + n]
+
+    closed = []
+
+    def stream():
+        try:
+            yield from clients
+        finally:
+            closed.append(True)
+
+    assert _select_page(stream(), 1, 3) == clients[:3]
+    assert closed == [True]
+
+
+def test_client_equality_and_hash_semantics(make_client):
+    client = make_client("Иванов", 3, 5)
+    short = client.to_short_version()
+    assert short == ClientShort("Иванов", "Иван", "Иванович", 3)
+    # Полный клиент не равен краткому ни с какой стороны
+    assert client != short and short != client
+    assert Client.__eq__(client, short) is NotImplemented
+    assert ClientShort.__eq__(short, "Иванов") is NotImplemented
+    assert client != ("Иванов", "Иван", "Иванович", 3, 5)
+
+    twin = make_client("Иванов", 3, 5)
+    twin.set_id(42)
+    # ID не участвует в сравнении
+    assert client == twin and hash(client) == hash(twin)
+
+    seen = {client}
+    hash(twin)
+    twin.set_haircut_counter(4)
+    assert twin != client and twin not in seen
+    client.set_haircut_counter(4)
+    assert client == twin and hash(client) == hash(twin)
+    client.set_discount(10)
+    assert client != twin
+    twin.set_discount(10)
+    assert hash(client) == hash(twin) == hash(make_client("Иванов", 4, 10))
+
+
+def pg_error(code):
+    """psycopg2.Error с заданным SQLSTATE, как его возвращает сервер."""
+    return type(f"PgError{code}", (psycopg2.OperationalError,), {"pgcode": code})(code)
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.session_settings = {}
+
+    def get_connection(self):
+        return self.conn
+
+    def open_dedicated(self):
+        return FakeConnection()
+
+
+def failing(*errors, result="ok"):
+    """Вызов, который по очереди бросает errors, а затем возвращает result."""
+    pending = list(errors)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if pending:
+            raise pending.pop(0)
+        return result
+
+    return call, calls
+
+
+def test_query_policy_backoff_and_replace():
+    policy = QueryPolicy(backoff_ms=100, max_backoff_ms=300)
+    for attempt, cap in ((1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)):
+        for _ in range(20):
+            assert cap / 2 <= policy.backoff(attempt) <= cap
+    changed = policy.replace(retries=2)
+    assert (changed.retries, changed.backoff_ms, policy.retries) == (2, 100, 0)
+    with pytest.raises(ValueError):
+        policy.replace(timeout=1)
+
+
+def test_run_operation_retries_transient_errors(monkeypatch):
+    delays = []
+    monkeypatch.setattr(hair_salon_lab2.time, "sleep", delays.append)
+    repo = ClientRepDB(FakeDatabase(), policy=QueryPolicy(retries=3, backoff_ms=10))
+
+    call, calls = failing(pg_error("40P01"), pg_error("40001"))
+    assert repo._run_operation("add", call) == "ok"
+    assert len(calls) == 3 and len(delays) == 2
+    assert repo.metrics.retries == 2
+
+    call, calls = failing(*[pg_error("40001")] * 4)
+    with pytest.raises(RetriesExhaustedError):
+        repo._run_operation("add", call)
+    assert len(calls) == 4
+
+    call, calls = failing(*[pg_error("55P03")] * 4)
+    with pytest.raises(LockTimeoutError):
+        repo._run_operation("add", call)
+    assert repo.metrics.lock_timeouts == 4
+
+
+def test_run_operation_maps_timeouts_without_retrying(monkeypatch):
+    monkeypatch.setattr(hair_salon_lab2.time, "sleep", lambda delay: None)
+    repo = ClientRepDB(FakeDatabase(), policy=QueryPolicy(retries=3))
+
+    call, calls = failing(pg_error("57014"))
+    with pytest.raises(StatementTimeoutError):
+        repo._run_operation("get_all", call)
+    assert len(calls) == 1 and repo.metrics.statement_timeouts == 1
+
+    unique_violation = pg_error("23505")
+    call, calls = failing(unique_violation)
+    with pytest.raises(psycopg2.Error) as error:
+        repo._run_operation("add", call)
+    assert error.value is unique_violation and len(calls) == 1
+    assert repo.db.conn.rollbacks == 2
+
+
+def test_run_operation_cancels_query_at_deadline():
+    repo = ClientRepDB(FakeDatabase(), policy=QueryPolicy(deadline_ms=50, retries=3))
+
+    def slow_query():
+        # Запрос «выполняется», пока клиент не отменит его по дедлайну
+        assert repo.conn.cancelled.wait(5)
+        raise pg_error("57014")
+
+    with pytest.raises(DeadlineExceededError):
+        repo._run_operation("get_all", slow_query)
+    # Отменено отдельное соединение потока, а не общее
+    assert not repo.db.conn.cancelled.is_set()
+    assert repo.metrics.deadlines_exceeded == 1
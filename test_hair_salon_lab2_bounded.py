@@ -0,0 +1,70 @@
+import csv
+import gc
+import json
+import weakref
+
+import pytest
+
+from hair_salon_lab2_bounded import ClientRepBounded
+
+
+def test_mutations_reach_journal_without_flush(tmp_path, make_client):
+    path = str(tmp_path / "clients.jsonl")
+    repo = ClientRepBounded(path, max_resident=2)
+    repo.add_many([make_client("Иванов", i) for i in range(4)])
+    repo.replace_by_id(2, make_client("Петров", 9, 5))
+    repo.delete_by_id(3)
+    repo.increment_haircuts([1])
+
+    # Без flush() / close(): журнал уже в файле, новый экземпляр дочитывает его
+    reopened = ClientRepBounded(path, index_path=str(tmp_path / "other.idx"))
+    assert reopened.get_count() == 3
+    assert reopened.get_by_id(2).get_last_name() == "Петров"
+    assert reopened.get_by_id(3) is None
+    assert reopened.get_by_id(1).get_haircut_counter() == 1
+    reopened.close()
+    repo.close()
+
+
+@pytest.mark.parametrize("name", ["out.jsonl", "out.json", "out.csv"])
+def test_write_all_exports_by_extension(tmp_path, name, make_client):
+    repo = ClientRepBounded(str(tmp_path / "clients.jsonl"))
+    repo.add_many([make_client("Иванов", i) for i in range(3)])
+    out = tmp_path / name
+
+    repo.write_all(str(out))
+
+    text = out.read_text(encoding="utf-8")
+    if name.endswith(".jsonl"):
+        rows = [json.loads(line) for line in text.splitlines()]
+    elif name.endswith(".json"):
+        rows = json.loads(text)
+    else:
+        rows = list(csv.DictReader(text.splitlines()))
+        rows = [{k: int(v) if v.isdigit() else v for k, v in r.items()} for r in rows]
+    assert rows == [c.to_dict() for c in repo.iter_all()]
+    repo.close()
+
+
+def test_write_all_rejects_yaml(tmp_path):
+    repo = ClientRepBounded(str(tmp_path / "clients.jsonl"))
+    with pytest.raises(ValueError):
+        repo.write_all(str(tmp_path / "out.yaml"))
+    repo.close()
+
+
+def test_unclosed_repository_is_collected_and_closes_files(tmp_path, make_client):
+    path = str(tmp_path / "clients.jsonl")
+    repo = ClientRepBounded(path)
+    repo.add(make_client("Иванов"))
+    files = repo._files
+    assert files.writer is not None
+    ref = weakref.ref(repo)
+    del repo
+    gc.collect()
+    assert ref() is None
+    assert files.writer is None
+
+    reopened = ClientRepBounded(path)
+    assert [c.get_last_name() for c in reopened.iter_all()] == ["Иванов"]
+    reopened.close()
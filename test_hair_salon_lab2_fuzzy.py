@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from hair_salon_lab1_task9 import Client
+from hair_salon_lab2_fuzzy import FuzzyNameIndex, client_names, normalize, rank, similarity
+
+
+SYLLABLES = ["ив", "ан", "ов", "пет", "ро", "сид", "ор", "ку", "зне", "цов", "ми", "ха", "ил", "ев", "ёж"]
+
+
+def random_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))).capitalize()
+
+
+def make_clients(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    clients = []
+    for client_id in range(1, count + 1):
+        client = Client(random_name(rng), random_name(rng), random_name(rng), client_id, 0)
+        client.set_id(client_id)
+        clients.append(client)
+    return clients
+
+
+def brute_force(clients, query, limit, min_similarity):
+    names = {c.get_id(): tuple(normalize(n) for n in client_names(c)) for c in clients}
+    matches = []
+    for client_id, fields in names.items():
+        score = max(similarity(query, name) for name in fields)
+        if score >= max(min_similarity, 1e-9):
+            matches.append((client_id, score))
+    return rank(query, matches, limit, names.__getitem__, int)
+
+
+@pytest.fixture(scope="module")
+def clients():
+    return make_clients(200)
+
+
+@pytest.fixture(scope="module")
+def index(clients):
+    index = FuzzyNameIndex()
+    for client in clients:
+        index.add(client)
+    return index
+
+
+@pytest.mark.parametrize("min_similarity", [0.0, 0.1, 0.3, 0.5, 0.8, 1.0])
+@pytest.mark.parametrize("limit", [1, 5, 50])
+def test_search_matches_brute_force(clients, index, min_similarity, limit):
+    rng = random.Random(limit)
+    for _ in range(15):
+        query = " ".join(random_name(rng) for _ in range(rng.randint(1, 3)))
+        assert index.search(query, limit, min_similarity) == brute_force(clients, query, limit, min_similarity)
+
+
+def test_search_keeps_documents_on_size_bucket_boundaries():
+    # Запрос из 25 триграмм, фамилия из 7 — все общие: сходство ровно 7/25,
+    # а 0.28 * 25 в float чуть больше 7 — корзина размера 7 не должна выпасть
+    client = Client("Петр", "Иванов", "Петрович", 1, 0)
+    client.set_id(1)
+    index = FuzzyNameIndex()
+    index.add(client)
+    assert index.search("Иванов Абвгдежзиклмнопрс", 5, 0.28) == [(1, 0.28)]
+
+
+def test_search_finds_every_client_at_its_exact_similarity(clients, index):
+    # Порог, равный сходству, проверяет обе границы корзин [t * m, m / t]
+    rng = random.Random(3)
+    for client in rng.sample(clients, 60):
+        query = " ".join(random_name(rng) for _ in range(rng.randint(1, 3)))
+        score = max(similarity(query, name) for name in client_names(client))
+        if score == 0:
+            continue
+        found = dict(index.search(query, len(clients), score))
+        assert found.get(client.get_id()) == score
+
+
+def test_remove_drops_client_from_results(clients):
+    index = FuzzyNameIndex()
+    for client in clients[:20]:
+        index.add(client)
+    target = clients[0]
+    query = target.get_last_name()
+    assert target.get_id() in dict(index.search(query, 20, 0.3))
+    index.remove(target.get_id())
+    assert target.get_id() not in dict(index.search(query, 20, 0.3))
+    assert len(index) == 19
@@ -0,0 +1,52 @@
+import pytest
+
+from hair_salon_lab2 import ClientRepJson, ClientRepYaml
+from hair_salon_lab2_merge import merge_clients, merge_into
+
+
+@pytest.fixture
+def sources(tmp_path, make_client):
+    json_path = tmp_path / "a.json"
+    json_path.write_text("[]", encoding="utf-8")
+    yaml_path = tmp_path / "b.yaml"
+    yaml_path.write_text("[]", encoding="utf-8")
+
+    first = ClientRepJson(str(json_path))
+    first.add_many([
+        make_client("Иванов", 3, 5, first_name="Иван"),
+        make_client("Петров", 1, first_name="Пётр"),
+    ])
+    second = ClientRepYaml(str(yaml_path))
+    second.add_many([
+        make_client("Иванов", 3, 5, first_name="Иван"),     # точный дубликат
+        make_client("ИВАНОВ", 7, 0, first_name="иван"),     # тот же человек, другие данные
+        make_client("Сидоров", 2, first_name="Сидор"),
+    ])
+    return first, second
+
+
+def test_merge_clients_resolves_duplicates(sources):
+    result = merge_clients(sources, key="normalized", policy="merge")
+
+    assert result.total_read == 5
+    assert result.exact_duplicates == 1
+    assert result.conflicts == 1
+    by_last = {c.get_last_name(): c for c in result.clients}
+    assert sorted(by_last) == ["ИВАНОВ", "Петров", "Сидоров"]
+    merged = by_last["ИВАНОВ"]
+    assert (merged.get_haircut_counter(), merged.get_discount()) == (7, 5)
+    # Результат — копии без ID, исходные клиенты не изменены
+    assert all(c.get_id() is None for c in result.clients)
+    assert sources[0].get_by_id(1).get_discount() == 5
+
+
+def test_merge_into_writes_target(sources, tmp_path):
+    target_path = tmp_path / "merged.json"
+    target_path.write_text("[]", encoding="utf-8")
+
+    result = merge_into(ClientRepJson(str(target_path)), sources, policy="last")
+
+    assert result.ids == [1, 2, 3]
+    reopened = ClientRepJson(str(target_path))
+    assert reopened.get_count() == 3
+    assert reopened.get_by_id(1).get_haircut_counter() == 7
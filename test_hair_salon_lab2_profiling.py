@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from hair_salon_lab2_profiling import PROFILED_METHODS, ProfiledRepository, RepositoryProfiler
+
+
+def busy(n: int = 20000) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_profile_counts_blocks_from_every_thread():
+    profiler = RepositoryProfiler(enabled=True)
+    barrier = threading.Barrier(3)
+
+    def worker():
+        with profiler.profile("op"):
+            barrier.wait()
+            busy()
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert profiler.calls["op"] == 3
+    # Вложенный блок того же потока учитывается только внешним
+    with profiler.profile("outer"):
+        with profiler.profile("inner"):
+            busy()
+    assert profiler.calls["outer"] == 1 and "inner" not in profiler.calls
+
+
+def test_profile_recovers_after_collect_failure(monkeypatch):
+    profiler = RepositoryProfiler(enabled=True)
+
+    def broken(*args):
+        raise RuntimeError("collect")
+
+    monkeypatch.setattr(profiler, "_collect", broken)
+    with pytest.raises(RuntimeError):
+        with profiler.profile("op"):
+            busy()
+    monkeypatch.undo()
+
+    with profiler.profile("op"):
+        busy()
+    assert profiler.calls["op"] == 1
+    assert "busy" in profiler.report()
+
+
+def test_profiled_repository_wraps_streaming_reads():
+    assert {"iter_all", "iter_short"} <= set(PROFILED_METHODS)
+
+    class Repo:
+        def iter_all(self):
+            return iter([1, 2])
+
+    profiler = RepositoryProfiler(enabled=True)
+    assert list(ProfiledRepository(Repo(), profiler).iter_all()) == [1, 2]
+    assert profiler.calls["iter_all"] == 1
+    assert profiler.calls["iter_all:iter"] == 1
+
+
+def test_profiled_traversal_is_one_block_without_consumer_code():
+    class Repo:
+        def iter_all(self):
+            return iter(range(3000))
+
+    def consume(item):
+        return item
+
+    profiler = RepositoryProfiler(enabled=True)
+    repo = ProfiledRepository(Repo(), profiler)
+    total = 0
+    for item in repo.iter_all():
+        # потребитель может сам профилировать блоки во время обхода
+        if item % 1000 == 0:
+            with profiler.profile("consume"):
+                consume(item)
+        total += item
+    assert total == sum(range(3000))
+    assert profiler.calls["iter_all:iter"] == 1
+    assert profiler.calls["consume"] == 3
+
+    # брошенный на середине обход тоже учитывается один раз
+    steps = repo.iter_all()
+    next(steps)
+    steps.close()
+    assert profiler.calls["iter_all:iter"] == 2
@@ -0,0 +1,86 @@
+from hair_salon_lab2_sharded import ClientRepSharded
+
+
+def test_sharded_round_trip_keeps_ids(tmp_path, make_client):
+    path = str(tmp_path / "shards")
+    repo = ClientRepSharded(path, shard_count=3)
+    ids = repo.add_many([make_client("Иванов", i) for i in range(10)])
+    assert ids == list(range(1, 11))
+    assert repo.delete_by_id(4)
+    assert repo.replace_by_id(5, make_client("Петров", 1))
+
+    reopened = ClientRepSharded(path, shard_count=3)
+    assert [c.get_id() for c in reopened.iter_all()] == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+    assert reopened.get_by_id(5).get_last_name() == "Петров"
+
+    # write_all -> _dump_to_storage раскладывает записи по шардам с их ID
+    reopened._dump_to_storage([c.to_dict() for c in reopened.iter_all()])
+    assert [c.get_id() for c in ClientRepSharded(path, shard_count=3).iter_all()] == [
+        1, 2, 3, 5, 6, 7, 8, 9, 10,
+    ]
+
+
+def test_sharded_items_setter_rebuilds_uniqueness(tmp_path, make_client):
+    repo = ClientRepSharded(str(tmp_path / "shards"), shard_count=2)
+    repo.add(make_client("Иванов", 1))
+    assert not repo._is_unique(make_client("Иванов", 1))
+
+    replacement = make_client("Петров", 2)
+    replacement.set_id(1)
+    repo.items = [replacement]
+
+    assert repo._is_unique(make_client("Иванов", 1))
+    assert not repo._is_unique(make_client("Петров", 2))
+
+
+def test_sharded_iter_all_is_a_consistent_snapshot(tmp_path, make_client):
+    repo = ClientRepSharded(str(tmp_path / "shards"), shard_count=4)
+    repo.add_many([make_client("Иванов", i) for i in range(8)])
+
+    stream = repo.iter_all()
+    assert next(stream).get_id() == 1
+    repo.delete_by_id(6)
+    repo.add(make_client("Петров"))
+
+    assert [c.get_id() for c in stream] == [2, 3, 4, 5, 6, 7, 8]
+    assert [c.get_id() for c in repo.iter_all()] == [1, 2, 3, 4, 5, 7, 8, 9]
+
+
+def test_sharded_order_survives_mutations_and_reopen(tmp_path, make_client):
+    path = str(tmp_path / "shards")
+    repo = ClientRepSharded(path, shard_count=3)
+    names = ["Петров", "Антонов", "Сидоров", "Борисов", "Яковлев", "Иванов"]
+    repo.add_many([make_client(name, i) for i, name in enumerate(names)])
+
+    repo.sort_by("last_name")
+    repo.add(make_client("Васильев", 10))
+    repo.replace_by_id(1, make_client("Гришин", 11))
+    by_name = sorted(c.get_last_name() for c in repo.iter_all())
+    assert [c.get_last_name() for c in repo.iter_all()] == by_name
+    assert [c.get_last_name() for c in repo.get_k_n_short_list(2, 3)] == by_name[3:6]
+
+    # Файлы шардов хранят порядок по фамилии, а после открытия порядок — по ID
+    reopened = ClientRepSharded(path, shard_count=3)
+    assert [c.get_id() for c in reopened.iter_all()] == list(range(1, 8))
+    assert [c.get_id() for c in reopened.get_k_n_short_list(2, 3)] == [4, 5, 6]
+    reopened.add(make_client("Абрамов", 12))
+    assert [c.get_id() for c in reopened.iter_all()] == list(range(1, 9))
+
+    reopened.sort_by("haircut")
+    reopened.increment_haircuts([2], by=20)
+    counters = [c.get_haircut_counter() for c in reopened.iter_all()]
+    assert counters == sorted(counters)
+
+
+def test_sharded_increment_moves_chain_across_shards(tmp_path, make_client):
+    repo = ClientRepSharded(str(tmp_path / "shards"), shard_count=3)
+    repo.add_many([
+        make_client("Иванов", 3),
+        make_client("Иванов", 4),
+        make_client("Петров", 5),
+        make_client("Петров", 6),
+    ])
+    assert repo.increment_haircuts([1, 2, 3], tiers=((5, 5),)) == 2
+    counters = {c.get_id(): (c.get_haircut_counter(), c.get_discount()) for c in repo.iter_all()}
+    assert counters == {1: (4, 0), 2: (5, 5), 3: (5, 0), 4: (6, 0)}
+    assert repo.recalculate_discounts(tiers=((5, 5),)) == 2
@@ -0,0 +1,70 @@
+import pytest
+
+from hair_salon_lab2_sqlite import ClientRepSqlite
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = ClientRepSqlite(str(tmp_path / "clients.sqlite3"))
+    yield repo
+    repo.close()
+
+
+def test_add_many_reports_duplicates(repo, make_client):
+    ids = repo.add_many([
+        make_client("Иванов", 1),
+        make_client("Петров", 2),
+        make_client("Иванов", 1),   # дубликат внутри пачки
+    ])
+    assert ids == [1, 2, None]
+    assert repo.add(make_client("Петров", 2)) is None
+    assert repo.get_count() == 2
+
+
+def test_items_setter_rejects_clashes_and_keeps_data(repo, make_client):
+    repo.add_many([make_client("Иванов", 1), make_client("Петров", 2)])
+    clash = [make_client("Сидоров", 3), make_client("Сидоров", 3)]
+    for i, client in enumerate(clash, 10):
+        client.set_id(i)
+
+    with pytest.raises(ValueError):
+        repo.items = clash
+    assert [c.get_id() for c in repo.iter_all()] == [1, 2]
+
+
+def test_dump_to_storage_keeps_ids(repo, tmp_path, make_client):
+    data = [dict(make_client("Иванов", i).to_dict(), id=i * 10) for i in range(1, 4)]
+    repo._dump_to_storage(data)
+    assert [c.get_id() for c in repo.iter_all()] == [10, 20, 30]
+
+    copy_path = str(tmp_path / "copy.sqlite3")
+    repo._dump_to_storage(data, file_name=copy_path)
+    copy = ClientRepSqlite(copy_path)
+    assert [c.to_dict() for c in copy.iter_all()] == data
+    copy.close()
+
+
+def test_pages_keep_base_signature(repo, make_client):
+    repo.add_many([make_client("Иванов", i, i % 3) for i in range(10)])
+
+    assert [c.get_id() for c in repo.get_k_n_short_list(2, 4)] == [5, 6, 7, 8]
+    assert len(repo.get_short_list(3, 4)) == 2
+
+    page = repo.get_page(1, 3, filters=[("discount", "=", 0)], order_by="haircut_counter", reverse=True)
+    assert [c.get_haircut_counter() for c in page] == [9, 6, 3]
+    short = repo.get_short_page(2, 2, filters=[("discount", "=", 0)])
+    assert [c.get_haircut_counter() for c in short] == [6, 9]
+
+
+def test_increment_moves_whole_chain_and_skips_blocked_keys(repo, make_client):
+    repo.add_many([
+        make_client("Иванов", 3),
+        make_client("Иванов", 4),
+        make_client("Петров", 5),
+        make_client("Петров", 6),
+    ])
+    assert repo.increment_haircuts([1, 2, 3], tiers=((5, 5),)) == 2
+    counters = {c.get_id(): (c.get_haircut_counter(), c.get_discount()) for c in repo.iter_all()}
+    assert counters == {1: (4, 0), 2: (5, 5), 3: (5, 0), 4: (6, 0)}
+    assert repo.recalculate_discounts(tiers=((5, 5),), ids=[3, 4]) == 2
+    assert repo.recalculate_discounts(tiers=((5, 5),)) == 0
@@ -0,0 +1,46 @@
+from hair_salon_lab1_task9 import Client
+from hair_salon_lab2 import ClientRepJson
+from hair_salon_lab2_validation import import_clients, validate_rows
+
+
+def record(last_name: str, haircut_counter: int = 0, **changes):
+    data = {"first_name": "Иван", "last_name": last_name, "father_name": "Иванович",
+            "haircut_counter": haircut_counter, "discount": 0}
+    data.update(changes)
+    return data
+
+
+def test_validate_rows_reports_every_error_with_validator_messages():
+    rows = [
+        record("Иванов"),
+        record("И", haircut_counter=-1),
+        record("Smith Jones", discount=150),
+        "не json",
+        {"first_name": "Иван"},
+        record("Ωmega"),
+    ]
+    report = validate_rows(rows)
+
+    assert report.valid_indices == [0, 5]
+    assert report.errors[1] == [
+        "last_name должен содержать минимум 2 символа",
+        "haircut_counter не может быть отрицательным",
+    ]
+    assert report.errors[2] == ["discount должен быть в диапазоне от 0 до 100"]
+    assert report.errors[3] == ["Некорректный JSON формат"]
+    assert "Отсутствуют обязательные поля" in report.errors[4][0]
+
+
+def test_import_clients_adds_only_valid_rows(tmp_path):
+    path = tmp_path / "clients.json"
+    path.write_text("[]", encoding="utf-8")
+    repo = ClientRepJson(str(path))
+    repo.add(Client(record("Петров", 2)))
+
+    report = import_clients(repo, [record("Иванов"), record("1"), record("Петров", 2)])
+
+    assert report.ids == [2]
+    assert report.duplicates == [2]
+    assert list(report.errors) == [1]
+    stored = ClientRepJson(str(path)).get_by_id(2)
+    assert stored == Client(record("Иванов")) and stored.get_id() == 2